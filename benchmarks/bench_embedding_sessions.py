@@ -0,0 +1,100 @@
+"""
+Benchmark memory and startup cost of per-session vs. shared embedding models.
+
+Each mode runs in its own subprocess so peak RSS is measured in isolation:
+- per-session: every simulated session loads its own HuggingFaceEmbeddings
+  (the old ChatAgent behaviour)
+- shared: all sessions use one SharedEmbeddings and embed concurrently
+
+Usage:
+    python benchmarks/bench_embedding_sessions.py [--sessions 1 4 8] [--chunks 20]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+
+def _session_chunks(session, chunk_count):
+    from config.sample_data import SAMPLE_REPORT
+
+    lines = [line for line in SAMPLE_REPORT.splitlines() if line.strip()]
+    return [f"{lines[(session + i) % len(lines)]} (session {session}, chunk {i})" for i in range(chunk_count)]
+
+
+def _run_sessions(embedders, chunk_count):
+    threads = [
+        threading.Thread(target=embedder.embed_documents, args=(_session_chunks(i, chunk_count),))
+        for i, embedder in enumerate(embedders)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_mode(mode, sessions, chunk_count):
+    """Run one mode in the current process and return its measurements."""
+    from config.app_config import EMBEDDING_MODEL_NAME
+
+    start = time.perf_counter()
+    if mode == "per-session":
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        embedders = [HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME) for _ in range(sessions)]
+    else:
+        from services.embedding_service import SharedEmbeddings
+
+        shared = SharedEmbeddings()
+        embedders = [shared] * sessions
+    startup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _run_sessions(embedders, chunk_count)
+    embed_time = time.perf_counter() - start
+
+    # ru_maxrss is KiB on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {"startup": startup, "embed": embed_time, "peak_rss_mb": peak_rss_mb}
+
+
+def measure(mode, sessions, chunk_count):
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", mode, "--sessions", str(sessions), "--chunks", str(chunk_count)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--chunks", type=int, default=20, help="chunks embedded per session")
+    parser.add_argument("--child", choices=["per-session", "shared"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(args.child, args.sessions[0], args.chunks)))
+        return
+
+    print(f"{'sessions':>8} {'mode':>12} {'startup s':>10} {'embed s':>9} {'peak RSS MB':>12}")
+    for sessions in args.sessions:
+        for mode in ("per-session", "shared"):
+            result = measure(mode, sessions, args.chunks)
+            print(
+                f"{sessions:>8} {mode:>12} {result['startup']:>10.2f} "
+                f"{result['embed']:>9.2f} {result['peak_rss_mb']:>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark serial vs. process-pool PDF extraction on synthetic lab reports.
+
+Usage:
+    python benchmarks/bench_pdf_extraction.py [--pages 10 25 50] [--repeat 3]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from config.sample_data import SAMPLE_REPORT  # noqa: E402
+from utils.pdf_extractor import _extract_and_validate  # noqa: E402
+
+
+def build_synthetic_pdf(page_count, lines_per_page=45):
+    """Build a minimal multi-page PDF whose pages repeat sample report lines."""
+    report_lines = [line for line in SAMPLE_REPORT.splitlines() if line.strip()]
+
+    objects = []
+    page_ids = []
+    font_id = 3
+    objects.append(None)  # 1: catalog, filled in below
+    objects.append(None)  # 2: pages tree, filled in below
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    for page_number in range(page_count):
+        lines = [f"Page {page_number + 1} of {page_count}"]
+        lines += [report_lines[(page_number + i) % len(report_lines)] for i in range(lines_per_page)]
+
+        stream = ["BT", "/F1 9 Tf", "11 TL", "40 800 Td"]
+        for line in lines:
+            safe = line.encode("latin-1", "replace").decode("latin-1")
+            safe = safe.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            stream.append(f"({safe}) '")
+        stream.append("ET")
+        content = "\n".join(stream).encode("latin-1")
+
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (font_id, content_id)
+        )
+        page_ids.append(len(objects))
+
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % page_count
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for index, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % index + body + b"\nendobj\n"
+
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref_offset,
+    )
+    return bytes(output)
+
+
+def time_mode(pdf_bytes, mode, repeat):
+    """Return per-run wall-clock timings (seconds) for one extraction mode."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = _extract_and_validate(pdf_bytes, mode)
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 25, 50])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # Warm the process pool so its start-up cost is not charged to the first run
+    time_mode(build_synthetic_pdf(8), "parallel", 1)
+
+    print(f"{'pages':>6} {'serial (s)':>12} {'parallel (s)':>13} {'speedup':>8}")
+    for page_count in args.pages:
+        pdf_bytes = build_synthetic_pdf(page_count)
+        serial, serial_text = time_mode(pdf_bytes, "serial", args.repeat)
+        parallel, parallel_text = time_mode(pdf_bytes, "parallel", args.repeat)
+
+        if serial_text != parallel_text:
+            raise SystemExit(f"Output mismatch between modes at {page_count} pages")
+
+        serial_median = statistics.median(serial)
+        parallel_median = statistics.median(parallel)
+        print(
+            f"{page_count:>6} {serial_median:>12.3f} {parallel_median:>13.3f} "
+            f"{serial_median / parallel_median:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
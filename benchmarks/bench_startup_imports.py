@@ -0,0 +1,95 @@
+"""
+Profile the import cost of the app's startup path with `python -X importtime`.
+
+Imports every module main.py imports (main.py itself is not executed, since
+it renders the page and needs Streamlit secrets), then reports the total
+import time, the slowest top-level packages, and whether any part of the
+heavy chat stack was pulled in at startup. Pass --modules to profile
+something else, e.g. the chat stack itself:
+
+    python benchmarks/bench_startup_imports.py
+    python benchmarks/bench_startup_imports.py --modules agents.chat_agent
+"""
+import argparse
+import ast
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+# Should only ever be imported once a user starts chatting
+CHAT_STACK = (
+    "agents.chat_agent",
+    "langchain_community",
+    "langchain_huggingface",
+    "sentence_transformers",
+    "torch",
+    "faiss",
+)
+
+_LINE_PATTERN = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def main_imports():
+    """Return the modules imported at the top of src/main.py."""
+    with open(os.path.join(SRC_DIR, "main.py"), "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules.append(node.module)
+    return modules
+
+
+def profile(modules):
+    """Return [(self_us, cumulative_us, depth, module)] for one cold interpreter."""
+    code = "; ".join(f"import {module}" for module in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _LINE_PATTERN.match(line)
+        if match:
+            depth = (len(match.group(3)) - 1) // 2
+            rows.append((int(match.group(1)), int(match.group(2)), depth, match.group(4)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", help="modules to import (default: main.py's imports)")
+    parser.add_argument("--top", type=int, default=15, help="number of packages to list")
+    args = parser.parse_args()
+
+    modules = args.modules or main_imports()
+    rows = profile(modules)
+
+    total_us = sum(cumulative for _, cumulative, depth, _ in rows if depth == 0)
+    by_package = defaultdict(int)
+    for self_us, _, _, module in rows:
+        by_package[module.split(".")[0]] += self_us
+
+    print(f"Imported: {', '.join(modules)}")
+    print(f"Total import time: {total_us / 1000:.1f} ms ({len(rows)} modules)\n")
+    print(f"{'package':<30} {'self ms':>9}")
+    for package, self_us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[: args.top]:
+        print(f"{package:<30} {self_us / 1000:>9.1f}")
+
+    loaded = {module for _, _, _, module in rows}
+    heavy = [name for name in CHAT_STACK if any(m == name or m.startswith(name + ".") for m in loaded)]
+    print(f"\nChat stack imported: {', '.join(heavy) if heavy else 'none'}")
+
+
+if __name__ == "__main__":
+    main()
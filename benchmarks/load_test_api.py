@@ -0,0 +1,188 @@
+"""
+Load-test the headless API (src/api/server.py) against a local fake Groq server.
+
+Starts a fake OpenAI-compatible Groq endpoint with a configurable latency,
+starts the API with uvicorn pointed at it (GROQ_BASE_URL), then fires
+analysis and chat requests at a fixed concurrency and reports throughput
+and latency percentiles. The response cache is disabled and chat uses
+lexical retrieval, so no real model, embedding model or API key is needed.
+
+Usage:
+    python benchmarks/load_test_api.py [--requests 200] [--concurrency 20]
+        [--workers 1] [--groq-latency 0.5] [--chat-ratio 0.5]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+
+def fake_groq_app(latency):
+    """Starlette app answering /openai/v1/chat/completions after `latency` seconds."""
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    async def completions(request):
+        body = await request.json()
+        await asyncio.sleep(latency * random.uniform(0.5, 1.5))
+        return JSONResponse(
+            {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "All values are within range."},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {"prompt_tokens": 100, "completion_tokens": 8, "total_tokens": 108},
+            }
+        )
+
+    return Starlette(routes=[Route("/openai/v1/chat/completions", completions, methods=["POST"])])
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args, cwd, env):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", *args, "--host", "127.0.0.1", "--log-level", "warning", "--no-access-log"],
+        cwd=cwd,
+        env=env,
+    )
+    return process
+
+
+async def wait_until_up(client, url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await client.get(url)
+            return
+        except Exception:
+            await asyncio.sleep(0.2)
+    raise SystemExit(f"Server at {url} did not start")
+
+
+async def run_load(base_url, total, concurrency, chat_ratio):
+    import httpx
+    from config.sample_data import SAMPLE_REPORT
+
+    latencies = {"analysis": [], "chat": []}
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(timeout=120, limits=httpx.Limits(max_connections=concurrency)) as client:
+        await wait_until_up(client, f"{base_url}/healthz")
+
+        async def one(i):
+            nonlocal errors
+            kind = "chat" if random.random() < chat_ratio else "analysis"
+            if kind == "chat":
+                url, payload = f"{base_url}/v1/chat", {"query": "Is my LDL ok?", "context": SAMPLE_REPORT}
+            else:
+                # Vary age so requests are distinct
+                url, payload = f"{base_url}/v1/analysis", {"report": SAMPLE_REPORT, "age": 20 + i % 60, "gender": "Female"}
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(url, json=payload)
+                latencies[kind].append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+
+    return latencies, errors, elapsed
+
+
+def percentile(values, p):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes for the API")
+    parser.add_argument("--groq-latency", type=float, default=0.5, help="mean fake model latency (s)")
+    parser.add_argument("--chat-ratio", type=float, default=0.5, help="fraction of chat requests")
+    parser.add_argument("--serve-fake-groq", type=float, help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_fake_groq is not None:
+        import uvicorn
+
+        uvicorn.run(fake_groq_app(args.serve_fake_groq), host="127.0.0.1", port=args.port, log_level="warning", access_log=False)
+        return
+
+    groq_port, api_port = free_port(), free_port()
+    with tempfile.TemporaryDirectory() as workdir:
+        # The API reads its key through st.secrets, relative to the working directory
+        os.makedirs(os.path.join(workdir, ".streamlit"))
+        with open(os.path.join(workdir, ".streamlit", "secrets.toml"), "w") as f:
+            f.write('GROQ_API_KEY = "fake-key"\n')
+
+        env = dict(
+            os.environ,
+            PYTHONPATH=SRC_DIR,
+            GROQ_BASE_URL=f"http://127.0.0.1:{groq_port}",
+            HIA_RESPONSE_CACHE_BACKEND="none",
+            HIA_CHAT_RETRIEVAL_MODE="lexical",
+        )
+        fake_groq = subprocess.Popen(
+            [sys.executable, __file__, "--serve-fake-groq", str(args.groq_latency), "--port", str(groq_port)]
+        )
+        api = start_server(
+            ["api.server:app", "--port", str(api_port), "--workers", str(args.workers)], workdir, env
+        )
+        try:
+            latencies, errors, elapsed = asyncio.run(
+                run_load(f"http://127.0.0.1:{api_port}", args.requests, args.concurrency, args.chat_ratio)
+            )
+        finally:
+            api.terminate()
+            fake_groq.terminate()
+            api.wait()
+            fake_groq.wait()
+
+    print(
+        f"{args.requests} requests, concurrency {args.concurrency}, {args.workers} worker(s), "
+        f"fake Groq latency {args.groq_latency}s"
+    )
+    print(f"throughput: {args.requests / elapsed:.1f} req/s, errors: {errors}")
+    print(f"{'endpoint':<10} {'count':>6} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'mean s':>7}")
+    for kind, values in latencies.items():
+        if values:
+            print(
+                f"{kind:<10} {len(values):>6} {percentile(values, 50):>7.3f} {percentile(values, 95):>7.3f} "
+                f"{percentile(values, 99):>7.3f} {statistics.mean(values):>7.3f}"
+            )
+    print(json.dumps({"elapsed_seconds": round(elapsed, 3)}))
+
+
+if __name__ == "__main__":
+    main()
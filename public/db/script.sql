@@ -22,12 +22,27 @@ CREATE TABLE chat_messages (
     content TEXT,
     role TEXT,
     created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    seq BIGINT GENERATED ALWAYS AS IDENTITY,  -- insert order; chat history pages by it
     FOREIGN KEY (session_id) REFERENCES chat_sessions(id)
 );
+-- Existing databases:
+-- ALTER TABLE chat_messages ADD COLUMN seq BIGINT GENERATED ALWAYS AS IDENTITY;
+
+-- Create session_reports table (report text kept out of chat_messages)
+CREATE TABLE session_reports (
+    session_id UUID PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    report_zlib TEXT NOT NULL,  -- base64 of the zlib-compressed report text
+    analytes JSONB,
+    text_length INTEGER,
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (session_id) REFERENCES chat_sessions(id) ON DELETE CASCADE
+);
 
 -- Add indexes to improve query performance
 CREATE INDEX idx_chat_sessions_user_id ON chat_sessions(user_id);
 CREATE INDEX idx_chat_messages_session_id ON chat_messages(session_id);
+CREATE INDEX idx_chat_messages_session_seq ON chat_messages(session_id, seq);
 
 -- Add unique constraint to prevent duplicate emails
 ALTER TABLE users ADD CONSTRAINT unique_email UNIQUE (email);
\ No newline at end of file
@@ -1,6 +1,10 @@
+import copy
 from datetime import datetime, timedelta
 import streamlit as st
-from agents.model_manager import ModelManager
+from agents.model_manager import AnalysisStream, ModelManager
+from agents.prompt_compactor import fit_to_budget
+from utils.lab_parser import parse_lab_report
+from utils.state_store import as_state_store
 
 class AnalysisAgent:
     """
@@ -8,38 +12,43 @@ class AnalysisAgent:
     and implementing in-context learning from previous analyses.
     """
     
-    def __init__(self):
+    def __init__(self, state=None):
+        """
+        Args:
+            state: State store (utils.state_store) or plain mapping holding the
+                counters and knowledge base; defaults to st.session_state
+                (pass a dict to run outside Streamlit)
+        """
         self.model_manager = ModelManager()
+        self.state = as_state_store(st.session_state if state is None else state)
         self._init_state()
         
     def _init_state(self):
         """Initialize analysis-related session state variables."""
-        if 'analysis_count' not in st.session_state:
-            st.session_state.analysis_count = 0
-        if 'last_analysis' not in st.session_state:
-            st.session_state.last_analysis = datetime.now()
-        if 'analysis_limit' not in st.session_state:
-            st.session_state.analysis_limit = 15
-        if 'models_used' not in st.session_state:
-            st.session_state.models_used = {}
-        if 'knowledge_base' not in st.session_state:
-            st.session_state.knowledge_base = {}
+        self.state.setdefault('analysis_count', 0)
+        # Stored as a timestamp so JSON-backed stores can hold it
+        self.state.setdefault('last_analysis', datetime.now().timestamp())
+        self.state.setdefault('analysis_limit', 15)
+        self.state.setdefault('models_used', {})
+        self.state.setdefault('knowledge_base', {})
+        self.state.setdefault('tokens_saved', 0)
             
     def check_rate_limit(self):
         """Check if user has reached their analysis limit."""
         # Calculate time until reset
-        time_until_reset = timedelta(days=1) - (datetime.now() - st.session_state.last_analysis)
+        last_analysis = datetime.fromtimestamp(self.state.get("last_analysis"))
+        time_until_reset = timedelta(days=1) - (datetime.now() - last_analysis)
         hours, remainder = divmod(time_until_reset.seconds, 3600)
         minutes, _ = divmod(remainder, 60)
         
         # Reset counter after 24 hours
         if time_until_reset.days < 0:
-            st.session_state.analysis_count = 0
-            st.session_state.last_analysis = datetime.now()
+            self.state.set("analysis_count", 0)
+            self.state.set("last_analysis", datetime.now().timestamp())
             return True, None
         
         # Check if limit reached
-        if st.session_state.analysis_count >= st.session_state.analysis_limit:
+        if self.state.get("analysis_count", 0) >= self.state.get("analysis_limit"):
             error_msg = f"Daily limit reached. Reset in {hours}h {minutes}m"
             return False, error_msg
         return True, None
@@ -61,35 +70,74 @@ class AnalysisAgent:
         if check_only:
             return can_analyze, error_msg
         
+        request = self.prepare_request(data, system_prompt, chat_history)
+        
+        # Generate analysis using model manager
+        result = self.model_manager.generate_analysis(request["data"], request["prompt"])
+        self.record_result(request, result)
+        return result
+    
+    def stream_report(self, data, system_prompt, chat_history=None):
+        """
+        Stream an analysis of report data.
+        Returns an AnalysisStream; analytics and the knowledge base are
+        updated once the stream has been fully consumed.
+        """
+        can_analyze, error_msg = self.check_rate_limit()
+        if not can_analyze:
+            return AnalysisStream.failed(error_msg)
+        
+        request = self.prepare_request(data, system_prompt, chat_history)
+        stream = self.model_manager.stream_analysis(request["data"], request["prompt"])
+        return stream.on_complete(lambda result: self.record_result(request, result))
+    
+    def prepare_request(self, data, system_prompt, chat_history=None):
+        """
+        Preprocess, parse, enhance and compact a request for the model.
+        The returned dict carries what record_result needs afterwards.
+        """
         # Process data before sending to model
         processed_data = self._preprocess_data(data)
+        lab_table = parse_lab_report(processed_data.get("report", "")) if isinstance(processed_data, dict) else None
         
         # Enhance prompt with in-context learning (only if chat_history is provided)
         enhanced_prompt = self._build_enhanced_prompt(system_prompt, processed_data, chat_history) if chat_history else system_prompt
         
-        # Generate analysis using model manager
-        result = self.model_manager.generate_analysis(processed_data, enhanced_prompt)
-        
+        # Compact prompt and report to fit the primary model's token budget
+        compact_data, compact_prompt, token_usage = fit_to_budget(
+            processed_data, enhanced_prompt, self.model_manager.input_token_budget(), lab_table
+        )
+        return {
+            "processed_data": processed_data,
+            "lab_table": lab_table,
+            "data": compact_data,
+            "prompt": compact_prompt,
+            "token_usage": token_usage,
+        }
+    
+    def record_result(self, request, result):
+        """Attach token usage and, on success, update analytics and learning systems."""
+        result["token_usage"] = request["token_usage"]
         if result["success"]:
-            # Update analytics and learning systems
             self._update_analytics(result)
-            self._update_knowledge_base(processed_data, result["content"])
-        
-        return result
+            self._update_knowledge_base(request["processed_data"], result["content"], request["lab_table"])
     
     def _update_analytics(self, result):
         """Update analytics after successful analysis."""
-        st.session_state.analysis_count += 1
-        st.session_state.last_analysis = datetime.now()
+        self.state.incr("analysis_count")
+        self.state.set("last_analysis", datetime.now().timestamp())
+        self.state.incr("tokens_saved", result.get("token_usage", {}).get("saved_tokens", 0))
         
         # Track which models are being used
         model_used = result.get("model_used", "unknown")
-        if model_used in st.session_state.models_used:
-            st.session_state.models_used[model_used] += 1
-        else:
-            st.session_state.models_used[model_used] = 1
+        if result.get("cache_hit"):
+            model_used = f"{model_used} (cached)"
+        # Copied before updating: other threads may be reading the stored one
+        models_used = dict(self.state.get("models_used", {}))
+        models_used[model_used] = models_used.get(model_used, 0) + 1
+        self.state.set("models_used", models_used)
     
-    def _update_knowledge_base(self, data, analysis):
+    def _update_knowledge_base(self, data, analysis, lab_table=None):
         """
         Update knowledge base with new analysis results for in-context learning.
         Maps key health indicators to analysis patterns.
@@ -97,9 +145,9 @@ class AnalysisAgent:
         if not isinstance(data, dict) or 'report' not in data:
             return
             
-        # Extract key health indicators and map them to analysis outcomes
-        # This basic implementation can be expanded with more sophisticated extraction
-        report_text = data['report'].lower()
+        # Extract key health indicators from the parsed analytes
+        if lab_table is None:
+            lab_table = parse_lab_report(data['report'])
         patient_profile = f"{data.get('age', 'unknown')}-{data.get('gender', 'unknown')}"
         
         # Look for key health indicators in the report
@@ -108,26 +156,42 @@ class AnalysisAgent:
             "hdl", "ldl", "wbc", "rbc", "platelet", "creatinine"
         ]
         
+        # Read, update a copy and write it back, so remote state stores see the
+        # change and threads sharing a local state never see it half-updated
+        knowledge_base = copy.deepcopy(self.state.get("knowledge_base", {}))
+        
         # Store snippets of analysis associated with key health indicators
         for indicator in key_indicators:
-            if indicator in report_text:
+            if self._report_mentions(data['report'], lab_table, indicator):
                 # Find any mentions of this indicator in the analysis
                 if indicator in analysis.lower():
                     # Store this learning in knowledge base
-                    if indicator not in st.session_state.knowledge_base:
-                        st.session_state.knowledge_base[indicator] = {}
+                    if indicator not in knowledge_base:
+                        knowledge_base[indicator] = {}
                     
-                    if patient_profile not in st.session_state.knowledge_base[indicator]:
-                        st.session_state.knowledge_base[indicator][patient_profile] = []
+                    if patient_profile not in knowledge_base[indicator]:
+                        knowledge_base[indicator][patient_profile] = []
                     
                     # Extract the relevant section from analysis (simple approach)
                     lines = analysis.split('\n')
                     relevant_lines = [l for l in lines if indicator in l.lower()]
                     if relevant_lines:
                         # Limit knowledge base size to prevent overflow
-                        if len(st.session_state.knowledge_base[indicator][patient_profile]) >= 3:
-                            st.session_state.knowledge_base[indicator][patient_profile].pop(0)
-                        st.session_state.knowledge_base[indicator][patient_profile].append(relevant_lines[0])
+                        if len(knowledge_base[indicator][patient_profile]) >= 3:
+                            knowledge_base[indicator][patient_profile].pop(0)
+                        knowledge_base[indicator][patient_profile].append(relevant_lines[0])
+        
+        self.state.set("knowledge_base", knowledge_base)
+    
+    def _report_mentions(self, report_text, lab_table, indicator):
+        """
+        Check whether a health indicator is present in the report.
+        Uses the parsed analyte columns, falling back to a text scan for
+        report layouts the lab parser does not recognise.
+        """
+        if lab_table is not None and len(lab_table):
+            return lab_table.mentions(indicator)
+        return indicator in report_text.lower()
     
     def _build_enhanced_prompt(self, system_prompt, data, chat_history):
         """
@@ -153,17 +217,19 @@ class AnalysisAgent:
     
     def _get_knowledge_base_context(self, data):
         """Extract relevant context from knowledge base."""
-        if 'knowledge_base' not in st.session_state or not st.session_state.knowledge_base:
+        knowledge_base = self.state.get("knowledge_base")
+        if not knowledge_base:
             return ""
             
-        report_text = data.get('report', '').lower()
+        report_text = data.get('report', '')
+        lab_table = parse_lab_report(report_text)
         patient_profile = f"{data.get('age', 'unknown')}-{data.get('gender', 'unknown')}"
         
         context_items = []
         
         # Find relevant knowledge from previous analyses
-        for indicator, profiles in st.session_state.knowledge_base.items():
-            if indicator in report_text:
+        for indicator, profiles in knowledge_base.items():
+            if self._report_mentions(report_text, lab_table, indicator):
                 # Get insights from similar patient profiles first
                 if patient_profile in profiles:
                     for insight in profiles[patient_profile]:
@@ -1,22 +1,64 @@
+import re
+import time
 import streamlit as st
 from groq import Groq
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
+from config.app_config import CHAT_RETRIEVAL_K, CHAT_RETRIEVAL_MODE, EMBEDDING_MODEL_NAME
+from services.embedding_service import get_embeddings
+from utils.bm25 import build_bm25_index, reciprocal_rank_fusion
+from utils.cache import LRUCache
+from utils.lab_index import build_lab_index
+from utils.vector_store_cache import load_vector_store, save_vector_store, vector_store_key
 import os
 
+# Words that usually point back at an earlier turn ("is it normal?", "what about those?")
+_REFERENCE_WORDS = {
+    "it", "its", "that", "this", "these", "those", "they", "them", "their",
+    "he", "she", "him", "her", "one", "ones", "same", "above", "previous",
+    "earlier", "else", "former", "latter",
+}
+# Openers of elliptical follow-ups ("and my LDL?", "what about sodium?")
+_ELLIPSIS_PREFIXES = (
+    "and ", "but ", "so ", "also ", "or ", "then ", "what about", "how about",
+    "and what", "what else", "anything else", "same for",
+)
+_WORD_PATTERN = re.compile(r"[a-z']+")
+
 
 class ChatAgent:
     def __init__(self):
-        self.embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+        self.retrieval_mode = CHAT_RETRIEVAL_MODE
+        # One model per process, shared by every session's ChatAgent;
+        # lexical mode never loads it
+        self.embeddings = None if self.retrieval_mode == "lexical" else get_embeddings()
+        self.chunk_size = 1000
+        self.chunk_overlap = 200
         self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000, chunk_overlap=200
+            chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap
         )
         self.client = Groq(api_key=st.secrets["GROQ_API_KEY"])
         self.model_name = "llama-3.3-70b-versatile"
+        # Used when streaming fails before the first token arrives
+        self.fallback_model_name = "llama-3.1-8b-instant"
+        # Lexical indexes of the report behind the current vector store
+        self.lab_index = None
+        self.bm25_index = None
+        # ChatAgent lives in session state, so this cache is per session
+        self._contextualized_queries = LRUCache(max_entries=64)
+        self.contextualize_stats = {
+            "queries": 0,
+            "skipped": 0,
+            "cached": 0,
+            "rewritten": 0,
+            "rewrite_seconds": 0.0,
+        }
 
     def initialize_vector_store(self, text_content):
-        """Create vector store from text content."""
+        """
+        Create vector store from text content.
+        The analyte and BM25 indexes are built alongside; in lexical mode
+        they are all that is built and None is returned.
+        """
         if not text_content or text_content.strip() == "":
             # Create a minimal vector store with a placeholder
             text_content = "No report context available."
@@ -26,7 +68,23 @@ class ChatAgent:
             # If splitting results in empty list, add at least one text
             texts = [text_content]
 
+        self.lab_index = build_lab_index(text_content)
+        self.bm25_index = build_bm25_index(tuple(texts))
+        if self.retrieval_mode == "lexical":
+            return None
+
+        # Reopened sessions and repeat uploads load the saved index instead of re-embedding
+        cache_key = vector_store_key(
+            text_content, EMBEDDING_MODEL_NAME, self.chunk_size, self.chunk_overlap
+        )
+        cached = load_vector_store(cache_key, self.embeddings)
+        if cached is not None:
+            return cached
+
+        from langchain_community.vectorstores import FAISS
+
         vectorstore = FAISS.from_texts(texts, self.embeddings)
+        save_vector_store(cache_key, vectorstore)
         return vectorstore
 
     def _format_chat_history(self, chat_history):
@@ -36,13 +94,52 @@ class ChatAgent:
             messages.append({"role": msg["role"], "content": msg["content"]})
         return messages
 
+    def needs_contextualization(self, query, chat_history):
+        """
+        Cheap local check for whether a query depends on earlier turns.
+        Pronouns and demonstratives, elliptical openers and very short
+        questions are sent for a rewrite; anything else is used as is.
+        """
+        if not chat_history:
+            return False
+
+        normalized = query.strip().lower()
+        words = _WORD_PATTERN.findall(normalized)
+        if len(words) <= 3:
+            return True
+        if normalized.startswith(_ELLIPSIS_PREFIXES):
+            return True
+        return any(word in _REFERENCE_WORDS for word in words)
+
+    def contextualization_stats(self):
+        """Return how often the rewrite call was avoided and the time that saved."""
+        stats = dict(self.contextualize_stats)
+        rewritten = stats["rewritten"]
+        average = stats["rewrite_seconds"] / rewritten if rewritten else 0.0
+        avoided = stats["skipped"] + stats["cached"]
+        stats["skip_rate"] = avoided / stats["queries"] if stats["queries"] else 0.0
+        # Estimated from the average latency of the rewrites that did run
+        stats["seconds_saved"] = avoided * average
+        return stats
+
     def _contextualize_query(self, query, chat_history):
         """Reformulate query considering chat history."""
         if not chat_history:
             return query
 
-        # Build context from recent chat history
+        self.contextualize_stats["queries"] += 1
+        if not self.needs_contextualization(query, chat_history):
+            self.contextualize_stats["skipped"] += 1
+            return query
+
         recent_history = chat_history[-4:]  # Last 2 exchanges
+        cache_key = (query, tuple(msg["content"] for msg in recent_history))
+        cached = self._contextualized_queries.get(cache_key)
+        if cached is not None:
+            self.contextualize_stats["cached"] += 1
+            return cached
+
+        # Build context from recent chat history
         history_text = "\n".join(
             [
                 f"{'User' if msg['role'] == 'user' else 'Assistant'}: {msg['content']}"
@@ -60,6 +157,7 @@ Latest User Question: {query}
 Standalone Question:"""
 
         try:
+            start = time.perf_counter()
             response = self.client.chat.completions.create(
                 model=self.model_name,
                 messages=[
@@ -72,12 +170,69 @@ Standalone Question:"""
                 temperature=0.1,
                 max_tokens=200,
             )
-            return response.choices[0].message.content.strip()
+            self.contextualize_stats["rewritten"] += 1
+            self.contextualize_stats["rewrite_seconds"] += time.perf_counter() - start
+            standalone = response.choices[0].message.content.strip()
+            self._contextualized_queries.set(cache_key, standalone)
+            return standalone
         except Exception:
             return query  # Fallback to original query
 
     def get_response(self, query, vectorstore, chat_history=None):
-        """Get response using RAG."""
+        """
+        Get response using RAG.
+
+        Returns:
+            (True, answer) on success, or (False, error_message)
+        """
+        messages = self._build_messages(query, vectorstore, chat_history)
+
+        # 4. Get response from Groq
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model_name,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=500,
+            )
+            return True, response.choices[0].message.content
+        except Exception as e:
+            return False, f"Error generating response: {str(e)}"
+
+    def stream_response(self, query, vectorstore, chat_history=None):
+        """
+        Get response using RAG, yielding text deltas as they arrive.
+        Falls back to a second model if the first fails before any output.
+        """
+        messages = self._build_messages(query, vectorstore, chat_history)
+
+        error = None
+        for model_name in (self.model_name, self.fallback_model_name):
+            received = False
+            try:
+                chunks = self.client.chat.completions.create(
+                    model=model_name,
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=500,
+                    stream=True,
+                )
+                for chunk in chunks:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        received = True
+                        yield delta
+                return
+            except Exception as e:
+                error = e
+                if received:
+                    yield f"\n\nError generating response: {str(e)}"
+                    return
+
+        yield f"Error generating response: {str(error)}"
+
+    def _build_messages(self, query, vectorstore, chat_history):
+        """Contextualize the query, retrieve report context and build the Groq messages."""
         if chat_history is None:
             chat_history = []
 
@@ -85,17 +240,7 @@ Standalone Question:"""
         contextualized_query = self._contextualize_query(query, chat_history)
 
         # 2. Retrieve relevant documents
-        try:
-            retriever = vectorstore.as_retriever(search_kwargs={"k": 3})
-            docs = retriever.get_relevant_documents(contextualized_query)
-            context = "\n\n".join([doc.page_content for doc in docs])
-
-            # If context is just placeholder text, set to empty
-            if context.strip() == "No report context available.":
-                context = ""
-        except Exception:
-            # If retrieval fails, proceed without context
-            context = ""
+        context = self._retrieve_context(contextualized_query, vectorstore)
 
         # 3. Build prompt with context and chat history
         qa_system_prompt = (
@@ -126,15 +271,37 @@ Standalone Question:"""
             # No report context available, rely on chat history only
             user_message = f"Question: {query}\n\nNote: No report context is available. Please answer based on the chat history."
         messages.append({"role": "user", "content": user_message})
+        return messages
 
-        # 4. Get response from Groq
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=messages,
-                temperature=0.7,
-                max_tokens=500,
+    def _retrieve_context(self, query, vectorstore):
+        """
+        Return report context for a query.
+        Questions naming an analyte or panel get the exact report rows
+        (structured and lexical modes); otherwise chunks are ranked by BM25,
+        dense search or both fused, depending on the retrieval mode.
+        """
+        if self.retrieval_mode in ("structured", "lexical") and self.lab_index:
+            rows = self.lab_index.lookup(query)
+            if rows:
+                return self.lab_index.format_rows(rows)
+
+        rankings = []
+        if self.retrieval_mode != "dense" and self.bm25_index:
+            rankings.append(
+                [self.bm25_index.texts[doc] for doc, _ in self.bm25_index.search(query, CHAT_RETRIEVAL_K * 2)]
             )
-            return response.choices[0].message.content
-        except Exception as e:
-            return f"Error generating response: {str(e)}"
+        if self.retrieval_mode != "lexical" and vectorstore is not None:
+            try:
+                docs = vectorstore.similarity_search(query, k=CHAT_RETRIEVAL_K * 2)
+                rankings.append([doc.page_content for doc in docs])
+            except Exception:
+                # If dense retrieval fails, proceed with what lexical search found
+                pass
+
+        chunks = reciprocal_rank_fusion(rankings, k=CHAT_RETRIEVAL_K)
+        context = "\n\n".join(chunks)
+
+        # If context is just placeholder text, set to empty
+        if context.strip() == "No report context available.":
+            context = ""
+        return context
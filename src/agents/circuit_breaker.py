@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import deque
+from config.app_config import (
+    CIRCUIT_BREAKER_COOLDOWN_SECONDS,
+    CIRCUIT_BREAKER_FAILURE_RATE,
+    CIRCUIT_BREAKER_MIN_CALLS,
+    CIRCUIT_BREAKER_PROBE_TIMEOUT_SECONDS,
+    CIRCUIT_BREAKER_WINDOW_SECONDS,
+)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+class CircuitBreaker:
+    """
+    Per-model circuit breaker over a rolling window of call outcomes.
+
+    CLOSED: calls flow; the breaker opens when the error rate over the
+    window reaches failure_rate (after at least min_calls calls), or
+    immediately on a rate-limit error.
+    OPEN: calls are refused until the cooldown expires.
+    HALF_OPEN: a single probe call is let through; success closes the
+    breaker, failure re-opens it for another cooldown. A probe that is
+    cancelled, or does not report back within probe_timeout_seconds, is
+    released so the next call can probe instead.
+    """
+
+    def __init__(
+        self,
+        name,
+        window_seconds=CIRCUIT_BREAKER_WINDOW_SECONDS,
+        min_calls=CIRCUIT_BREAKER_MIN_CALLS,
+        failure_rate=CIRCUIT_BREAKER_FAILURE_RATE,
+        cooldown_seconds=CIRCUIT_BREAKER_COOLDOWN_SECONDS,
+        probe_timeout_seconds=CIRCUIT_BREAKER_PROBE_TIMEOUT_SECONDS,
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.cooldown_seconds = cooldown_seconds
+        self.probe_timeout_seconds = probe_timeout_seconds
+        self.state = CLOSED
+        self._outcomes = deque()
+        self._open_until = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """Return True if a call may be made to this model now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+
+            now = time.monotonic()
+            if self.state == OPEN:
+                if now < self._open_until:
+                    return False
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+
+            # HALF_OPEN: let exactly one probe through
+            if self._probe_in_flight and now - self._probe_started < self.probe_timeout_seconds:
+                return False
+            self._probe_in_flight = True
+            self._probe_started = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.state = CLOSED
+                self._outcomes.clear()
+                self._probe_in_flight = False
+            self._record(True)
+
+    def record_cancelled(self):
+        """The call was abandoned before it succeeded or failed; release the probe if it was one."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+
+    def record_failure(self, rate_limited=False, retry_after=None):
+        with self._lock:
+            self._record(False)
+            if self.state == HALF_OPEN or rate_limited:
+                self._open(retry_after)
+                return
+
+            calls = len(self._outcomes)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            if calls >= self.min_calls and failures / calls >= self.failure_rate:
+                self._open(retry_after)
+
+    def snapshot(self):
+        """Return the breaker's current state and window statistics."""
+        with self._lock:
+            self._trim(time.monotonic())
+            calls = len(self._outcomes)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            return {
+                "name": self.name,
+                "state": self.state,
+                "calls": calls,
+                "error_rate": (failures / calls) if calls else 0.0,
+                "open_for_seconds": max(self._open_until - time.monotonic(), 0.0),
+            }
+
+    def _open(self, retry_after=None):
+        self.state = OPEN
+        self._probe_in_flight = False
+        self._open_until = time.monotonic() + max(retry_after or 0, self.cooldown_seconds)
+
+    def _record(self, ok):
+        now = time.monotonic()
+        self._outcomes.append((now, ok))
+        self._trim(now)
+
+    def _trim(self, now):
+        cutoff = now - self.window_seconds
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            self._outcomes.popleft()
+
+
+def get_breaker(name):
+    """Return the process-wide breaker for a model, shared by all sessions."""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def breaker_snapshots():
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [breaker.snapshot() for breaker in breakers]
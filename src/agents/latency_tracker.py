@@ -0,0 +1,63 @@
+import bisect
+import threading
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram for one model tier.
+    Bucket bounds grow by 25% from 100ms, so percentiles are accurate to
+    within a bucket; counts are halved once max_samples is reached so the
+    histogram keeps tracking recent behaviour.
+    """
+
+    def __init__(self, min_seconds=0.1, max_seconds=300.0, growth=1.25, max_samples=1000):
+        self.bounds = []
+        bound = min_seconds
+        while bound < max_seconds:
+            self.bounds.append(bound)
+            bound *= growth
+        self.bounds.append(max_seconds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.max_samples = max_samples
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+            self.total += 1
+            if self.total >= self.max_samples:
+                self.counts = [count // 2 for count in self.counts]
+                self.total = sum(self.counts)
+
+    def percentile(self, p):
+        """Return the upper bound (seconds) of the bucket holding the p-th percentile."""
+        with self._lock:
+            if not self.total:
+                return None
+            target = self.total * p / 100.0
+            cumulative = 0
+            for i, count in enumerate(self.counts):
+                cumulative += count
+                if cumulative >= target:
+                    return self.bounds[min(i, len(self.bounds) - 1)]
+            return self.bounds[-1]
+
+    def snapshot(self):
+        return {
+            "samples": self.total,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+        }
+
+
+def get_histogram(name):
+    """Return the process-wide latency histogram for a model tier."""
+    with _histograms_lock:
+        if name not in _histograms:
+            _histograms[name] = LatencyHistogram()
+        return _histograms[name]
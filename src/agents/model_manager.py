@@ -2,16 +2,90 @@ import groq
 import streamlit as st
 from enum import Enum
 import logging
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from agents.circuit_breaker import get_breaker
+from agents.latency_tracker import get_histogram
+from agents.prompt_compactor import fit_to_budget, render_analysis_input
+from agents.response_cache import get_response_cache
+from config.app_config import (
+    HEDGE_DEFAULT_DELAY_SECONDS,
+    HEDGE_MAX_WORKERS,
+    HEDGE_MIN_DELAY_SECONDS,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_PERCENTILE,
+    HEDGING_ENABLED,
+)
 
 logger = logging.getLogger(__name__)
 
+# Shared by all sessions and created on first hedged call; a hedged request
+# occupies at most two workers
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+
+
+def _get_hedge_executor():
+    global _hedge_executor
+    with _hedge_executor_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="model-hedge")
+        return _hedge_executor
+
 class ModelTier(Enum):
     PRIMARY = "primary"
     SECONDARY = "secondary" 
     TERTIARY = "tertiary"
     FALLBACK = "fallback"
 
+class AnalysisStream:
+    """
+    Iterable of analysis text deltas.
+    success, content, model_used and error are filled in once the stream
+    has been consumed; on_complete callbacks then run with the final result.
+    """
+    
+    def __init__(self, deltas=None, error=None):
+        self._deltas = deltas if deltas is not None else iter(())
+        self.success = False
+        self.content = ""
+        self.model_used = None
+        self.cache_hit = False
+        self.error = error
+        self._callbacks = []
+    
+    @classmethod
+    def failed(cls, error):
+        return cls(error=error)
+    
+    def on_complete(self, callback):
+        self._callbacks.append(callback)
+        return self
+    
+    def __iter__(self):
+        try:
+            for delta in self._deltas:
+                self.content += delta
+                yield delta
+        finally:
+            # Propagate an abandoned iteration to the model stream so it can
+            # record the outcome with the circuit breaker
+            close = getattr(self._deltas, "close", None)
+            if close:
+                close()
+        for callback in self._callbacks:
+            callback(self.as_result())
+    
+    def as_result(self):
+        """Return the outcome in the same shape as generate_analysis()."""
+        if not self.success:
+            return {"success": False, "error": self.error or "Analysis failed with all available models"}
+        result = {"success": True, "content": self.content, "model_used": self.model_used}
+        if self.cache_hit:
+            result["cache_hit"] = True
+        return result
+
 class ModelManager:
     """
     Manages AI model selection, fallback, and rate limits.
@@ -23,30 +97,35 @@ class ModelManager:
             "provider": "groq",
             "model": "meta-llama/llama-4-maverick-17b-128e-instruct",
             "max_tokens": 2000,
-            "temperature": 0.7
+            "temperature": 0.7,
+            "input_token_budget": 4000
         },
         ModelTier.SECONDARY: {
             "provider": "groq", 
             "model": "llama-3.3-70b-versatile",
             "max_tokens": 2000,
-            "temperature": 0.7
+            "temperature": 0.7,
+            "input_token_budget": 4000
         },
         ModelTier.TERTIARY: {
             "provider": "groq",
             "model": "llama-3.1-8b-instant",
             "max_tokens": 2000, 
-            "temperature": 0.7
+            "temperature": 0.7,
+            "input_token_budget": 3000
         },
         ModelTier.FALLBACK: {
             "provider": "groq",
             "model": "llama3-70b-8192",
             "max_tokens": 2000,
-            "temperature": 0.7
+            "temperature": 0.7,
+            "input_token_budget": 3000
         }
     }
     
     def __init__(self):
         self.clients = {}
+        self.response_cache = get_response_cache()
         self._initialize_clients()
 
     def _initialize_clients(self):
@@ -56,64 +135,295 @@ class ModelManager:
         except Exception as e:
             logger.error(f"Failed to initialize Groq client: {str(e)}")
 
-    def generate_analysis(self, data, system_prompt, retry_count=0):
+    def input_token_budget(self, tier=ModelTier.PRIMARY):
+        """Return the prompt-plus-report token budget for a model tier."""
+        return self.MODEL_CONFIG[tier]["input_token_budget"]
+
+    def generate_analysis(self, data, system_prompt):
         """
         Generate analysis using the best available model with automatic fallback.
-        Implements agent-based decision making for model selection.
+        Tiers are tried in order, skipping any whose circuit breaker is open,
+        so requests go straight to a healthy model. With hedging enabled, a
+        slow tier is raced against the next healthy one (stream_analysis
+        is never hedged).
         """
-        if retry_count > 3:
-            return {"success": False, "error": "All models failed after multiple retries"}
-
-        # Determine which model tier to use based on retry count
-        if retry_count == 0:
-            tier = ModelTier.PRIMARY
-        elif retry_count == 1:
-            tier = ModelTier.SECONDARY
-        elif retry_count == 2:
-            tier = ModelTier.TERTIARY
-        else:
-            tier = ModelTier.FALLBACK
+        tiers = list(ModelTier)
+        attempted = False
+        index = 0
+        
+        while index < len(tiers):
+            tier = tiers[index]
+            index += 1
+            request = self._prepare_request(tier, data, system_prompt)
+            
+            # Serve identical requests from the response cache
+            cached = self._get_cached_response(request["data"], request["prompt"], tier)
+            if cached:
+                return cached
+            
+            if not self._is_available(request):
+                continue
             
+            attempted = True
+            if not HEDGING_ENABLED:
+                result = self._attempt(request)
+            else:
+                # The next tier with a client serves as the hedge; it is only
+                # consumed from the fallback order if the hedge was sent
+                hedge_index = index
+                while hedge_index < len(tiers) and self.MODEL_CONFIG[tiers[hedge_index]]["provider"] not in self.clients:
+                    hedge_index += 1
+                hedge = self._prepare_request(tiers[hedge_index], data, system_prompt) if hedge_index < len(tiers) else None
+                result, hedge_sent = self._attempt_hedged(request, hedge)
+                if hedge_sent:
+                    index = hedge_index + 1
+            
+            if result:
+                return result
+        
+        if not attempted:
+            return {
+                "success": False,
+                "error": "All models are temporarily unavailable. Please try again in a minute."
+            }
+        return {"success": False, "error": "Analysis failed with all available models"}
+
+    def _prepare_request(self, tier, data, system_prompt):
+        """Fit the request to a tier's token budget and bundle what a call needs."""
         model_config = self.MODEL_CONFIG[tier]
-        provider = model_config["provider"]
-        model = model_config["model"]
         
+        # Smaller tiers get a tighter budget; this is a no-op when the
+        # request was already compacted to fit
+        tier_data, tier_prompt, _ = fit_to_budget(
+            data, system_prompt, model_config["input_token_budget"]
+        )
+        return {
+            "tier": tier,
+            "config": model_config,
+            "provider": model_config["provider"],
+            "model": model_config["model"],
+            "data": tier_data,
+            "prompt": tier_prompt,
+            "breaker": get_breaker(f"{model_config['provider']}/{model_config['model']}"),
+        }
+
+    def _is_available(self, request):
+        """Check for a client and a closed (or probing) circuit breaker."""
         # Check if we have a client for this provider
-        if provider not in self.clients:
-            logger.error(f"No client available for provider: {provider}")
-            return self.generate_analysis(data, system_prompt, retry_count + 1)
-            
+        if request["provider"] not in self.clients:
+            logger.error(f"No client available for provider: {request['provider']}")
+            return False
+        
+        breaker = request["breaker"]
+        if not breaker.allow_request():
+            logger.info(f"Skipping {request['model']}: circuit breaker is {breaker.state}")
+            return False
+        return True
+
+    def _attempt(self, request):
+        """
+        Make one call, recording latency and breaker outcome.
+        Returns the result dict, or None if the model failed.
+        """
         try:
-            client = self.clients[provider]
-            logger.info(f"Attempting generation with {provider} model: {model}")
-            
-            if provider == "groq":
-                completion = client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": str(data)}
-                    ],
-                    temperature=model_config["temperature"],
-                    max_tokens=model_config["max_tokens"]
-                )
-                
-                return {
-                    "success": True,
-                    "content": completion.choices[0].message.content,
-                    "model_used": f"{provider}/{model}"
-                }
-                
+            logger.info(f"Attempting generation with {request['provider']} model: {request['model']}")
+            started = time.monotonic()
+            result = self._complete(request["provider"], request["config"], request["data"], request["prompt"])
         except Exception as e:
-            error_message = str(e).lower()
-            logger.warning(f"Model {model} failed: {error_message}")
+            self._record_failure(request, e)
+            return None
+        
+        self._record_success(request, result, time.monotonic() - started)
+        return result
+
+    def _record_success(self, request, result, latency):
+        get_histogram(request["tier"].value).record(latency)
+        request["breaker"].record_success()
+        self._set_cached_response(request["data"], request["prompt"], request["tier"], result)
+
+    def _record_failure(self, request, error):
+        error_message = str(error).lower()
+        logger.warning(f"Model {request['model']} failed: {error_message}")
+        
+        # Rate limits open the breaker straight away instead of sleeping
+        rate_limited = "rate limit" in error_message or "quota" in error_message
+        request["breaker"].record_failure(rate_limited=rate_limited, retry_after=_retry_after(error))
+
+    def _attempt_hedged(self, request, hedge):
+        """
+        Race a request against a hedge on the next tier.
+        The hedge is only sent if the first call has not finished within the
+        tier's latency percentile; the first successful answer wins and the
+        other call is cancelled (or, if already running, abandoned).
+
+        Returns:
+            (result or None, whether the hedge request was sent)
+        """
+        executor = _get_hedge_executor()
+        primary = executor.submit(self._attempt, request)
+        delay = self._hedge_delay(request["tier"])
+        done, _ = wait([primary], timeout=delay)
+        if done or hedge is None or not self._is_available(hedge):
+            return primary.result(), False
+        
+        logger.info(f"{request['model']} slower than {delay:.1f}s, hedging with {hedge['model']}")
+        pending = {primary, executor.submit(self._attempt, hedge)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if result:
+                    for loser in pending:
+                        loser.cancel()
+                    return dict(result, hedged=True), True
+        return None, True
+
+    def _hedge_delay(self, tier):
+        """Hedge delay from the tier's observed latency percentile."""
+        histogram = get_histogram(tier.value)
+        if histogram.total < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY_SECONDS
+        return max(histogram.percentile(HEDGE_PERCENTILE), HEDGE_MIN_DELAY_SECONDS)
+
+    def _complete(self, provider, model_config, data, system_prompt):
+        """Run a single completion against one model."""
+        client = self.clients[provider]
+        model = model_config["model"]
+        
+        if provider == "groq":
+            completion = client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": render_analysis_input(data)}
+                ],
+                temperature=model_config["temperature"],
+                max_tokens=model_config["max_tokens"]
+            )
             
-            # Check for rate limit errors
-            if "rate limit" in error_message or "quota" in error_message:
-                # Wait briefly before retrying with a different model
-                time.sleep(2)
+            return {
+                "success": True,
+                "content": completion.choices[0].message.content,
+                "model_used": f"{provider}/{model}"
+            }
+        
+        raise ValueError(f"Unsupported provider: {provider}")
+
+    def stream_analysis(self, data, system_prompt):
+        """
+        Stream analysis text as it is generated.
+        Fallback to the next tier is still possible until the first token
+        arrives; after that, a failure ends the stream with an error.
+        Streams are not hedged: a second stream would double token usage
+        for every slow answer.
+        """
+        stream = AnalysisStream()
+        stream._deltas = self._stream_deltas(stream, data, system_prompt)
+        return stream
+
+    def _stream_deltas(self, stream, data, system_prompt):
+        attempted = False
+        
+        for tier in ModelTier:
+            request = self._prepare_request(tier, data, system_prompt)
             
-            # Try next model in hierarchy
-            return self.generate_analysis(data, system_prompt, retry_count + 1)
+            # Serve identical requests from the response cache in one chunk
+            cached = self._get_cached_response(request["data"], request["prompt"], tier)
+            if cached:
+                stream.success = True
+                stream.cache_hit = True
+                stream.model_used = cached["model_used"]
+                yield cached["content"]
+                return
             
-        return {"success": False, "error": "Analysis failed with all available models"}
+            if not self._is_available(request):
+                continue
+            
+            attempted = True
+            model = request["model"]
+            received = []
+            finished = False
+            try:
+                logger.info(f"Streaming generation with {request['provider']} model: {model}")
+                started = time.monotonic()
+                for delta in self._complete_stream(request):
+                    received.append(delta)
+                    yield delta
+                finished = True
+            except Exception as e:
+                finished = True
+                self._record_failure(request, e)
+                if received:
+                    # Tokens are already on screen; switching models now would garble the answer
+                    stream.error = f"Analysis was interrupted: {str(e)}"
+                    return
+                continue
+            finally:
+                if not finished:
+                    # The consumer went away mid-stream (GeneratorExit, e.g. a
+                    # Streamlit rerun): release the breaker's probe, if this was one
+                    request["breaker"].record_cancelled()
+            
+            stream.success = True
+            stream.model_used = f"{request['provider']}/{model}"
+            self._record_success(request, stream.as_result(), time.monotonic() - started)
+            return
+        
+        if not attempted:
+            stream.error = "All models are temporarily unavailable. Please try again in a minute."
+
+    def _complete_stream(self, request):
+        """Yield text deltas from a streaming completion."""
+        client = self.clients[request["provider"]]
+        model_config = request["config"]
+        
+        if request["provider"] == "groq":
+            chunks = client.chat.completions.create(
+                model=model_config["model"],
+                messages=[
+                    {"role": "system", "content": request["prompt"]},
+                    {"role": "user", "content": render_analysis_input(request["data"])}
+                ],
+                temperature=model_config["temperature"],
+                max_tokens=model_config["max_tokens"],
+                stream=True
+            )
+            for chunk in chunks:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    yield delta
+            return
+        
+        raise ValueError(f"Unsupported provider: {request['provider']}")
+
+    def _get_cached_response(self, data, system_prompt, tier):
+        """Return a cached result for this tier, marked as a cache hit."""
+        if not self.response_cache:
+            return None
+        try:
+            cached = self.response_cache.get(data, system_prompt, tier)
+        except Exception as e:
+            logger.warning(f"Response cache lookup failed: {str(e)}")
+            return None
+        if cached:
+            logger.info(f"Response cache hit for {tier.value} tier")
+            return dict(cached, cache_hit=True)
+        return None
+
+    def _set_cached_response(self, data, system_prompt, tier, result):
+        if not self.response_cache:
+            return
+        try:
+            self.response_cache.set(data, system_prompt, tier, dict(result))
+        except Exception as e:
+            logger.warning(f"Response cache write failed: {str(e)}")
+
+
+def _retry_after(error):
+    """Read a Retry-After hint (seconds) from an API error, if present."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
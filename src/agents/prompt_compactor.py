@@ -0,0 +1,182 @@
+import re
+from utils.lab_parser import FLAG_HIGH, FLAG_LOW, FLAG_NORMAL, parse_lab_report
+
+# Lines that carry no clinical information (letterheads, footers, signatures)
+BOILERPLATE_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in [
+        r"^page\s+\d+(\s+of\s+\d+)?$",
+        r"^(date|laboratory|lab|address|phone|tel|fax|e-?mail|website)\s*:",
+        r"^(www\.|https?://)",
+        r"^(printed|generated|reported|registered|received|collected)\s+(on|at)\b",
+        r"^(verified|approved|authori[sz]ed|checked)\s+by\b",
+        r"^(dr\.\s|pathologist\b|signature\b)",
+        r"^this is a computer[- ]generated",
+        r"end of report",
+        r"^[-=_*~.]{3,}$",
+    ]
+]
+
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+_PROMPT_INDENT = re.compile(r"\n {4}")
+TRUNCATION_MARKER = "[... report truncated to fit token budget ...]"
+
+
+def count_tokens(text):
+    """
+    Approximate the model's token count locally.
+    Words cost one token per ~6 letters and numbers one per 3 digits,
+    which tracks Llama-family BPE closely enough for budgeting.
+    """
+    if not text:
+        return 0
+    tokens = 0
+    for piece in _TOKEN_PATTERN.findall(text):
+        if piece[0].isdigit():
+            tokens += (len(piece) + 2) // 3
+        elif piece[0].isalpha():
+            tokens += (len(piece) + 5) // 6
+        else:
+            tokens += 1
+    return tokens
+
+
+def render_analysis_input(data):
+    """Render analysis data as plain lines instead of str(dict)."""
+    if not isinstance(data, dict):
+        return str(data)
+
+    lines = []
+    for key in ("age", "gender"):
+        if data.get(key) not in (None, ""):
+            lines.append(f"{key.capitalize()}: {data[key]}")
+    lines.append("")
+    lines.append("Report:")
+    lines.append(data.get("report", ""))
+    return "\n".join(lines)
+
+
+def compact_prompt(system_prompt):
+    """Strip the source-code indentation the prompt templates carry on every line."""
+    return _PROMPT_INDENT.sub("\n", system_prompt).strip()
+
+
+def compact_report(report_text, lab_table=None, names_only=False):
+    """
+    Drop boilerplate lines and collapse in-range analytes into a summary.
+    Out-of-range results are listed first, in full, so later truncation
+    never removes them.
+    """
+    if lab_table is None:
+        lab_table = parse_lab_report(report_text)
+
+    rows = list(lab_table)
+    parsed_lines = set(lab_table.line_numbers)
+    panels = set(lab_table.panels)
+
+    other_lines = []
+    for line_number, line in enumerate(report_text.splitlines()):
+        line = " ".join(line.split())
+        if not line or line_number in parsed_lines or line in panels or _is_boilerplate(line):
+            continue
+        other_lines.append(line)
+
+    sections = []
+    abnormal = [row for row in rows if row.flag in (FLAG_LOW, FLAG_HIGH)]
+    if abnormal:
+        sections.append("Out-of-range results:")
+        sections.extend(f"- {_format_row(row)} [{row.flag}]" for row in abnormal)
+
+    unflagged = [row for row in rows if row.flag not in (FLAG_LOW, FLAG_HIGH, FLAG_NORMAL)]
+    if unflagged:
+        sections.append("Results without reference range:")
+        sections.extend(f"- {_format_value(row)}" for row in unflagged)
+
+    in_range_by_panel = {}
+    for row in rows:
+        if row.flag == FLAG_NORMAL:
+            entry = row.analyte if names_only else _format_value(row)
+            in_range_by_panel.setdefault(row.panel or "Other", []).append(entry)
+    if in_range_by_panel:
+        sections.append("Within reference range:")
+        sections.extend(f"- {panel}: {', '.join(entries)}" for panel, entries in in_range_by_panel.items())
+
+    if other_lines:
+        if sections:
+            sections.append("Other report lines:")
+        sections.extend(other_lines)
+
+    return "\n".join(sections)
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Keep whole lines from the start of text until max_tokens is reached."""
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    budget = max_tokens - count_tokens(TRUNCATION_MARKER)
+    kept = []
+    used = 0
+    for line in text.splitlines():
+        cost = count_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    kept.append(TRUNCATION_MARKER)
+    return "\n".join(kept)
+
+
+def fit_to_budget(data, system_prompt, budget, lab_table=None):
+    """
+    Fit system prompt plus analysis input into a token budget.
+
+    Returns:
+        (data, system_prompt, usage) where usage reports the token counts
+        before and after compaction.
+    """
+    original_tokens = count_tokens(system_prompt) + count_tokens(render_analysis_input(data))
+    system_prompt = compact_prompt(system_prompt)
+
+    if isinstance(data, dict) and data.get("report"):
+        report = data["report"]
+        compacted = compact_report(report, lab_table)
+
+        def total(report_text):
+            return count_tokens(system_prompt) + count_tokens(
+                render_analysis_input(dict(data, report=report_text))
+            )
+
+        if total(compacted) > budget:
+            compacted = compact_report(report, lab_table, names_only=True)
+        if total(compacted) > budget:
+            overhead = total("")
+            compacted = truncate_to_tokens(compacted, max(budget - overhead, 0))
+        data = dict(data, report=compacted)
+
+    compacted_tokens = count_tokens(system_prompt) + count_tokens(render_analysis_input(data))
+    usage = {
+        "budget": budget,
+        "original_tokens": original_tokens,
+        "compacted_tokens": compacted_tokens,
+        "saved_tokens": max(original_tokens - compacted_tokens, 0),
+    }
+    return data, system_prompt, usage
+
+
+def _is_boilerplate(line):
+    return any(pattern.search(line) for pattern in BOILERPLATE_PATTERNS)
+
+
+def _format_value(row):
+    return f"{row.analyte} {row.value:g} {row.unit}".rstrip()
+
+
+def _format_row(row):
+    if row.ref_low is not None and row.ref_high is not None:
+        ref = f"{row.ref_low:g}-{row.ref_high:g}"
+    elif row.ref_high is not None:
+        ref = f"<{row.ref_high:g}"
+    else:
+        ref = f">{row.ref_low:g}"
+    return f"{_format_value(row)} (ref {ref})"
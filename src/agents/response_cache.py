@@ -0,0 +1,74 @@
+import hashlib
+import json
+import threading
+from config.app_config import (
+    RESPONSE_CACHE_BACKEND,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_REDIS_URL,
+    RESPONSE_CACHE_SQLITE_PATH,
+    RESPONSE_CACHE_TTL_SECONDS,
+)
+from utils.kv_store import create_store
+
+_instance = None
+_instance_lock = threading.Lock()
+
+
+class ResponseCache:
+    """
+    Cache of successful analysis responses.
+    Keys combine the normalized report, patient profile, a hash of the
+    system prompt (its version) and the model tier, so any change to what
+    the model would see produces a new key.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    @staticmethod
+    def make_key(data, system_prompt, tier):
+        if isinstance(data, dict):
+            payload = {
+                "report": _normalize(data.get("report", "")),
+                "age": str(data.get("age", "")),
+                "gender": str(data.get("gender", "")).lower(),
+            }
+        else:
+            payload = {"report": _normalize(str(data))}
+        payload["prompt_version"] = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+        payload["tier"] = tier.value
+
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, data, system_prompt, tier):
+        """Return the cached result dict for this request, or None."""
+        return self.store.get(self.make_key(data, system_prompt, tier))
+
+    def set(self, data, system_prompt, tier, result):
+        self.store.set(self.make_key(data, system_prompt, tier), result)
+
+    def stats(self):
+        return dict(self.store.stats(), backend=type(self.store).__name__)
+
+
+def get_response_cache():
+    """Return the process-wide response cache, or None if caching is disabled."""
+    global _instance
+    with _instance_lock:
+        if _instance is None:
+            store = create_store(
+                RESPONSE_CACHE_BACKEND,
+                max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+                ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+                sqlite_path=RESPONSE_CACHE_SQLITE_PATH,
+                redis_url=RESPONSE_CACHE_REDIS_URL,
+                namespace="responses",
+            )
+            _instance = ResponseCache(store) if store is not None else False
+        return _instance or None
+
+
+def _normalize(text):
+    """Collapse whitespace and case so trivially different extractions share a key."""
+    return " ".join(text.lower().split())
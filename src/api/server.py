@@ -0,0 +1,140 @@
+"""
+Headless JSON API around the analysis and chat services.
+
+Run from src/ (secrets are read from .streamlit/secrets.toml in the
+working directory, as for the Streamlit app):
+    uvicorn api.server:app --host 0.0.0.0 --port 8000 --workers 4
+
+Endpoints:
+    POST /v1/analysis  {"report", "patient_name"?, "age"?, "gender"?, "prompt"?}
+    POST /v1/chat      {"query", "context"?, "chat_history"?}
+    GET  /healthz
+
+No per-user state lives in the process: analysis caches and circuit
+breakers are process-wide, and chat agents are cached per report content,
+so replicas can sit behind any load balancer. Per-user rate limiting is
+left to the gateway in front of the service.
+"""
+import contextlib
+import math
+import threading
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from agents.circuit_breaker import breaker_snapshots
+from config.app_config import API_CHAT_STATE_ENTRIES
+from config.prompts import SPECIALIST_PROMPTS
+from services import ai_service
+from utils.cache import LRUCache
+from utils.vector_store_cache import content_hash
+
+# One analysis agent per worker process, so model clients and their
+# connection pools are reused across requests; built at startup so
+# concurrent requests never race to create it
+_analysis_state = {"analysis_limit": math.inf}
+
+# Chat state (agent, vector store, analyte index) per report, so follow-up
+# questions on the same report skip the setup; each entry has a lock that
+# is held while it is being set up
+_chat_states = LRUCache(max_entries=API_CHAT_STATE_ENTRIES)
+_chat_states_lock = threading.Lock()
+
+
+async def analysis(request):
+    body, error = await _read_json(request)
+    if error:
+        return error
+
+    report = body.get("report")
+    if not isinstance(report, str) or not report.strip():
+        return _error("'report' must be a non-empty string", 400)
+    prompt_name = body.get("prompt", "comprehensive_analyst")
+    if prompt_name not in SPECIALIST_PROMPTS:
+        return _error(f"Unknown prompt '{prompt_name}'", 400)
+
+    data = {
+        "patient_name": body.get("patient_name", ""),
+        "age": body.get("age", ""),
+        "gender": body.get("gender", ""),
+        "report": report,
+    }
+    result = await run_in_threadpool(
+        ai_service.generate_analysis, data, SPECIALIST_PROMPTS[prompt_name], state=_analysis_state
+    )
+    return JSONResponse(result, status_code=200 if result.get("success") else 502)
+
+
+async def chat(request):
+    body, error = await _read_json(request)
+    if error:
+        return error
+
+    query = body.get("query")
+    if not isinstance(query, str) or not query.strip():
+        return _error("'query' must be a non-empty string", 400)
+    chat_history = body.get("chat_history") or []
+    if not isinstance(chat_history, list) or not all(
+        isinstance(msg, dict) and "role" in msg and "content" in msg for msg in chat_history
+    ):
+        return _error("'chat_history' must be a list of {role, content} messages", 400)
+
+    # Keyed by the resolved context (an empty one falls back to the history),
+    # so each state's agent and indexes only ever hold one report
+    context = ai_service.resolve_chat_context(body.get("context") or "", chat_history)
+    key = content_hash(context)
+    state, lock = _chat_state(key)
+    success, answer = await run_in_threadpool(
+        ai_service.get_chat_response, query, context, chat_history, state=state, lock=lock
+    )
+    if not success:
+        if state.get("chat_agent") is None:
+            # Setup failed: try again on the next request rather than caching the failure
+            _chat_states.delete(key)
+        return _error(answer, 502)
+    return JSONResponse({"answer": answer})
+
+
+async def healthz(request):
+    return JSONResponse({"status": "ok", "breakers": breaker_snapshots()})
+
+
+def _chat_state(key):
+    """Return the (state, lock) pair for a report's content hash, creating it on first use."""
+    with _chat_states_lock:
+        entry = _chat_states.get(key)
+        if entry is None:
+            entry = ({}, threading.Lock())
+            _chat_states.set(key, entry)
+    return entry
+
+
+async def _read_json(request):
+    """Return (body, None) or (None, error_response)."""
+    try:
+        body = await request.json()
+    except ValueError:
+        return None, _error("Request body must be JSON", 400)
+    if not isinstance(body, dict):
+        return None, _error("Request body must be a JSON object", 400)
+    return body, None
+
+
+def _error(message, status_code):
+    return JSONResponse({"success": False, "error": message}, status_code=status_code)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    await run_in_threadpool(ai_service.init_analysis_state, _analysis_state)
+    yield
+
+
+app = Starlette(
+    lifespan=lifespan,
+    routes=[
+        Route("/v1/analysis", analysis, methods=["POST"]),
+        Route("/v1/chat", chat, methods=["POST"]),
+        Route("/healthz", healthz, methods=["GET"]),
+    ]
+)
@@ -1,7 +1,23 @@
+import asyncio
+import logging
 import streamlit as st
-from supabase import create_client
+from supabase import create_client, acreate_client
 from datetime import datetime
 import re
+import time
+from auth.token_verifier import TokenVerifier
+from services.chat_history import ChatHistory
+from services.report_store import ReportStore
+from config.app_config import (
+    AUTH_CACHE_LIST_TTL_SECONDS,
+    AUTH_CACHE_TOKEN_TTL_SECONDS,
+    AUTH_CACHE_USER_TTL_SECONDS,
+    AUTH_REMOTE_CHECK_BEFORE_EXPIRY_SECONDS,
+    AUTH_REMOTE_CHECK_INTERVAL_SECONDS,
+)
+from utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
 
 
 class AuthService:
@@ -9,14 +25,37 @@ class AuthService:
     # ---------------- INIT ---------------- #
     def __init__(self):
         try:
-            self.supabase = create_client(
-                st.secrets["SUPABASE_URL"],
-                st.secrets["SUPABASE_KEY"]
-            )
+            self._supabase_url = st.secrets["SUPABASE_URL"]
+            self._supabase_key = st.secrets["SUPABASE_KEY"]
+            self.supabase = create_client(self._supabase_url, self._supabase_key)
         except Exception as e:
             st.error(f"Failed to initialize Supabase: {str(e)}")
             raise e
 
+        # Async client is created lazily on the shared event loop
+        self._async_supabase = None
+        self._async_lock = None
+        self.access_token = None
+
+        self._token_verifier = TokenVerifier(
+            self._supabase_url, st.secrets.get("SUPABASE_JWT_SECRET")
+        )
+        self._last_remote_check = 0.0
+
+        # Read-through caches; AuthService lives in session state, so these
+        # persist across reruns of one browser session
+        self._read_caches = {
+            "token": LRUCache(max_entries=8, ttl_seconds=AUTH_CACHE_TOKEN_TTL_SECONDS),
+            "user": LRUCache(max_entries=32, ttl_seconds=AUTH_CACHE_USER_TTL_SECONDS),
+            "sessions": LRUCache(max_entries=8, ttl_seconds=AUTH_CACHE_LIST_TTL_SECONDS),
+            # Incrementally loaded ChatHistory per session id
+            "history": LRUCache(max_entries=8),
+        }
+        self.reports = ReportStore(self.supabase)
+        self._rerun_stats = self._empty_stats()
+        self.last_rerun_stats = self._empty_stats()
+        self.total_stats = self._empty_stats()
+
         self.try_restore_session()
 
     # ---------------- RESTORE SESSION ---------------- #
@@ -27,15 +66,13 @@ class AuthService:
             session = self.supabase.auth.get_session()
 
             if session and session.access_token:
-                user = self.supabase.auth.get_user()
-
-                if user and user.user:
-                    user_data = self.get_user_data(user.user.id)
+                user_data = self._session_user_data(session.access_token)
 
-                    if user_data:
-                        st.session_state.auth_token = session.access_token
-                        st.session_state.refresh_token = session.refresh_token
-                        st.session_state.user = user_data
+                if user_data:
+                    self.access_token = session.access_token
+                    st.session_state.auth_token = session.access_token
+                    st.session_state.refresh_token = session.refresh_token
+                    st.session_state.user = user_data
 
         except Exception:
             pass
@@ -50,16 +87,45 @@ class AuthService:
             if not session or not session.access_token:
                 return None
 
-            user = self.supabase.auth.get_user()
+            return self._session_user_data(session.access_token)
 
-            if not user or not user.user:
-                return None
+        except Exception:
+            return None
 
-            return self.get_user_data(user.user.id)
+    def _session_user_data(self, access_token):
+        """
+        Return the user row for an access token, verifying the token locally
+        when possible and with Supabase near expiry or once per interval.
+        """
+        claims = self._token_verifier.verify(access_token)
 
-        except Exception:
+        if claims is False:
             return None
 
+        if claims is None:
+            # No local verification: get_user plus the users select, cached briefly
+            return self._read_through("token", access_token, self._fetch_validated_user, 2)
+
+        now = time.time()
+        if (
+            claims["exp"] - now > AUTH_REMOTE_CHECK_BEFORE_EXPIRY_SECONDS
+            and now - self._last_remote_check < AUTH_REMOTE_CHECK_INTERVAL_SECONDS
+        ):
+            # Counted as one read: a cached users row skips get_user and the select
+            return self._read_through("user", claims["sub"], self._fetch_user_data, 2)
+
+        # Remote check also catches sessions revoked server-side
+        return self._fetch_validated_user(access_token)
+
+    def _fetch_validated_user(self, access_token):
+        user = self.supabase.auth.get_user()
+
+        if not user or not user.user:
+            return None
+
+        self._last_remote_check = time.time()
+        return self.get_user_data(user.user.id)
+
     # ---------------- SIGN UP ---------------- #
     def sign_up(self, email, password, name):
 
@@ -101,6 +167,7 @@ class AuthService:
 
             user_data = self.get_user_data(auth_response.user.id)
 
+            self.access_token = auth_response.session.access_token
             st.session_state.auth_token = auth_response.session.access_token
             st.session_state.refresh_token = auth_response.session.refresh_token
             st.session_state.user = user_data
@@ -113,103 +180,108 @@ class AuthService:
     # ---------------- SIGN OUT ---------------- #
     def sign_out(self):
 
+        for cache in self._read_caches.values():
+            cache.clear()
+        self.reports = ReportStore(self.supabase)
+
         try:
             self.supabase.auth.sign_out()
         except Exception:
             pass
 
     # ---------------- CREATE SESSION ---------------- #
-def create_session(self, user_id, title=None):
-    try:
-        from datetime import datetime
+    def create_session(self, user_id, title=None):
+        try:
+            from datetime import datetime
 
-        now = datetime.now()
-        default_title = f"{now.strftime('%d-%m-%Y')} | {now.strftime('%H:%M:%S')}"
+            now = datetime.now()
+            default_title = f"{now.strftime('%d-%m-%Y')} | {now.strftime('%H:%M:%S')}"
 
-        data = {
-            "user_id": user_id,
-            "title": title or default_title
-        }
+            data = {
+                "user_id": user_id,
+                "title": title or default_title
+            }
 
-        print("Creating session with:", data)   # DEBUG
+            logger.debug(f"Creating session with: {data}")
 
-        response = (
-            self.supabase
-            .table("chat_sessions")
-            .insert(data)
-            .execute()
-        )
+            response = (
+                self.supabase
+                .table("chat_sessions")
+                .insert(data)
+                .execute()
+            )
 
-        print("Supabase response:", response)   # DEBUG
+            logger.debug(f"Supabase response: {response}")
 
-        if response.data:
-            return True, response.data[0]
+            if response.data:
+                self._read_caches["sessions"].delete(user_id)
+                return True, response.data[0]
 
-        return False, "No data returned"
+            return False, "No data returned"
 
-    except Exception as e:
-        print("CREATE SESSION ERROR:", e)   # 👈 REAL ERROR
-        return False, str(e)
+        except Exception as e:
+            logger.error(f"Creating session for user {user_id} failed: {e}")
+            return False, str(e)
 
 
     # ---------------- GET USER SESSIONS ---------------- #
     def get_user_sessions(self, user_id):
 
         try:
-            response = (
-                self.supabase
-                .table("chat_sessions")
-                .select("*")
-                .eq("user_id", user_id)
-                .order("created_at", desc=True)
-                .execute()
-            )
-
-            return True, response.data
+            sessions = self._read_through("sessions", user_id, self._fetch_user_sessions)
+            return True, list(sessions)
 
         except Exception as e:
             return False, str(e)
 
-    # ---------------- SAVE MESSAGE ---------------- #
-    def save_chat_message(self, session_id, content, role="user"):
+    def _fetch_user_sessions(self, user_id):
+        response = (
+            self.supabase
+            .table("chat_sessions")
+            .select("*")
+            .eq("user_id", user_id)
+            .order("created_at", desc=True)
+            .execute()
+        )
+        return response.data
 
-        try:
-            data = {
-                "session_id": session_id,
-                "content": content,
-                "role": role
-            }
+    # ---------------- CHAT HISTORY ---------------- #
+    def get_chat_history(self, session_id):
+        """Return (True, ChatHistory) with new messages fetched, or (False, error)."""
 
-            response = (
-                self.supabase
-                .table("chat_messages")
-                .insert(data)
-                .execute()
-            )
+        try:
+            history = self._read_caches["history"].get(session_id)
+            if history is None:
+                history = ChatHistory(self.supabase, session_id)
+                self._read_caches["history"].set(session_id, history)
 
-            return True, response.data[0]
+            history.refresh()
+            return True, history
 
         except Exception as e:
             return False, str(e)
 
-    # ---------------- GET MESSAGES ---------------- #
-    def get_session_messages(self, session_id):
+    # ---------------- SESSION REPORT ---------------- #
+    def get_report(self, session_id):
+        """Return (True, StoredReport or None) for a session, or (False, error)."""
 
         try:
-            response = (
-                self.supabase
-                .table("chat_messages")
-                .select("*")
-                .eq("session_id", session_id)
-                .order("created_at")
-                .execute()
-            )
-
-            return True, response.data
+            return True, self.reports.get(session_id)
 
         except Exception as e:
             return False, str(e)
 
+    def add_local_messages(self, session_id, rows):
+        """Add rows queued by the message writer to the session's cached history."""
+        history = self._read_caches["history"].get(session_id)
+        if history is not None:
+            history.append_local(rows)
+
+    def _invalidate_messages(self, session_id):
+        history = self._read_caches["history"].get(session_id)
+        if history is not None:
+            history.mark_stale()
+
     # ---------------- DELETE SESSION ---------------- #
     def delete_session(self, session_id):
 
@@ -224,6 +296,11 @@ def create_session(self, user_id, title=None):
                 .eq("id", session_id) \
                 .execute()
 
+            self._read_caches["history"].delete(session_id)
+            # The session_reports row goes with the session (ON DELETE CASCADE)
+            self.reports.forget(session_id)
+            # The owning user is not known here, so drop all cached session lists
+            self._read_caches["sessions"].clear()
             return True, None
 
         except Exception as e:
@@ -233,16 +310,124 @@ def create_session(self, user_id, title=None):
     def get_user_data(self, user_id):
 
         try:
-            response = (
-                self.supabase
-                .table("users")
-                .select("*")
-                .eq("id", user_id)
-                .single()
+            return self._read_through("user", user_id, self._fetch_user_data)
+
+        except Exception:
+            return None
+
+    def _fetch_user_data(self, user_id):
+        response = (
+            self.supabase
+            .table("users")
+            .select("*")
+            .eq("id", user_id)
+            .single()
+            .execute()
+        )
+        return response.data
+
+    # ---------------- READ CACHE ---------------- #
+    def start_rerun(self):
+        """Roll the per-rerun cache counters; call once at the top of each script run."""
+        self.last_rerun_stats = self._rerun_stats
+        self._rerun_stats = self._empty_stats()
+
+    def cache_stats(self):
+        """Return read-cache counters for the current rerun, the previous one and in total."""
+        return {
+            "this_rerun": dict(self._rerun_stats),
+            "last_rerun": dict(self.last_rerun_stats),
+            "total": dict(self.total_stats),
+        }
+
+    def _read_through(self, kind, key, loader, round_trips=1):
+        """
+        Return the cached value for (kind, key), or call loader(key) and cache
+        a non-empty result. round_trips is the number of network calls a hit saves.
+        """
+        value = self._read_caches[kind].get(key)
+        hit = value is not None
+        if not hit:
+            value = loader(key)
+            if value is not None:
+                self._read_caches[kind].set(key, value)
+
+        self._record_read(hit, round_trips)
+        return value
+
+    def _record_read(self, hit, round_trips=1):
+        for stats in (self._rerun_stats, self.total_stats):
+            if hit:
+                stats["hits"] += 1
+                stats["round_trips_saved"] += round_trips
+            else:
+                stats["misses"] += 1
+
+    @staticmethod
+    def _empty_stats():
+        return {"hits": 0, "misses": 0, "round_trips_saved": 0}
+
+    # ---------------- ASYNC CLIENT ---------------- #
+    async def _get_async_client(self):
+        """
+        Create the async Supabase client on first use, authorised as the
+        current user. The token is read from the sync client's session on
+        every call, so writes keep working after it is refreshed.
+        """
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+
+        async with self._async_lock:
+            if self._async_supabase is None:
+                self._async_supabase = await acreate_client(
+                    self._supabase_url, self._supabase_key
+                )
+
+        # get_session refreshes an expired token, which is a network call
+        session = await asyncio.to_thread(self.supabase.auth.get_session)
+        if session and session.access_token:
+            self.access_token = session.access_token
+        if self.access_token:
+            self._async_supabase.postgrest.auth(self.access_token)
+        return self._async_supabase
+
+    # ---------------- ASYNC SAVE MESSAGES (BULK) ---------------- #
+    async def asave_chat_messages(self, rows):
+        """Insert prepared rows in one request; rows whose id already exists are skipped."""
+
+        try:
+            if not rows:
+                return True, []
+
+            client = await self._get_async_client()
+
+            response = await (
+                client
+                .table("chat_messages")
+                .upsert(rows, ignore_duplicates=True)
                 .execute()
             )
 
-            return response.data
+            for session_id in {row["session_id"] for row in rows}:
+                self._invalidate_messages(session_id)
+            return True, response.data
 
-        except Exception:
-            return None
+        except Exception as e:
+            return False, str(e)
+
+    # ---------------- ASYNC SAVE REPORT ---------------- #
+    async def asave_report(self, session_id, report_text):
+
+        try:
+            row = self.reports.build_row(session_id, report_text)
+            if row is None:
+                return True, None
+
+            client = await self._get_async_client()
+            await client.table("session_reports").upsert(row).execute()
+
+            self.reports.remember(row, report_text)
+            return True, None
+
+        except Exception as e:
+            return False, str(e)
@@ -19,6 +19,8 @@ class SessionManager:
             from auth.auth_service import AuthService
             st.session_state.auth_service = AuthService()
 
+        st.session_state.auth_service.start_rerun()
+
         # ---- Session timeout check ---- #
         if 'last_activity' in st.session_state:
             idle_time = datetime.now() - st.session_state.last_activity
@@ -0,0 +1,79 @@
+import logging
+import threading
+from config.app_config import AUTH_JWKS_CACHE_SECONDS, AUTH_JWT_LEEWAY_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# JWKS clients are shared by all sessions in the process, so signing keys
+# are fetched once per AUTH_JWKS_CACHE_SECONDS rather than once per session
+_jwks_clients = {}
+_jwks_lock = threading.Lock()
+
+
+class TokenVerifier:
+    """
+    Verifies Supabase access tokens locally (signature, expiry, audience).
+
+    HS256 tokens are checked against the project's JWT secret; asymmetric
+    tokens (RS256/ES256) against the project's JWKS. Needs PyJWT, which is
+    imported lazily: without it, or without a key for the token's algorithm,
+    verification is reported as unavailable and callers fall back to a
+    remote check.
+    """
+
+    def __init__(self, supabase_url, jwt_secret=None):
+        self.jwks_url = f"{supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json"
+        self.jwt_secret = jwt_secret
+
+    def verify(self, token):
+        """
+        Verify an access token.
+
+        Returns:
+            The token's claims if it is valid, False if it is invalid or
+            expired, or None if it cannot be verified locally.
+        """
+        try:
+            import jwt
+        except ImportError:
+            return None
+
+        try:
+            alg = jwt.get_unverified_header(token).get("alg")
+        except jwt.InvalidTokenError:
+            return False
+
+        if alg == "HS256":
+            if not self.jwt_secret:
+                return None
+            key = self.jwt_secret
+        elif alg in ("RS256", "ES256", "EdDSA"):
+            try:
+                key = self._jwks_client(jwt).get_signing_key_from_jwt(token).key
+            except Exception as e:
+                # JWKS unreachable or key unknown: let the server decide
+                logger.warning(f"JWKS lookup failed: {e}")
+                return None
+        else:
+            return None
+
+        try:
+            return jwt.decode(
+                token,
+                key,
+                algorithms=[alg],
+                audience="authenticated",
+                leeway=AUTH_JWT_LEEWAY_SECONDS,
+                options={"require": ["exp", "sub"]},
+            )
+        except jwt.InvalidTokenError as e:
+            logger.info(f"Access token rejected locally: {e}")
+            return False
+
+    def _jwks_client(self, jwt):
+        with _jwks_lock:
+            client = _jwks_clients.get(self.jwks_url)
+            if client is None:
+                client = jwt.PyJWKClient(self.jwks_url, lifespan=AUTH_JWKS_CACHE_SECONDS, timeout=5)
+                _jwks_clients[self.jwks_url] = client
+            return client
@@ -86,7 +86,9 @@ def handle_form_submission(patient_name, age, gender, pdf_contents):
         return
 
     # Check rate limit first, outside of spinner
-    from services.ai_service import generate_analysis
+    from services.ai_service import generate_analysis, stream_analysis
+    from utils.message_format import format_analysis_message
+    from services.message_writer import get_message_writer
 
     can_analyze, error_msg = generate_analysis(None, None, check_only=True)
     if not can_analyze:
@@ -94,45 +96,39 @@ def handle_form_submission(patient_name, age, gender, pdf_contents):
         st.stop()
         return
 
-    with st.spinner("Analyzing report..."):
-        # Save report content for follow-up chat (session state for immediate use)
-        st.session_state.current_report_text = pdf_contents
+    # Save report content for follow-up chat (session state for immediate use)
+    st.session_state.current_report_text = pdf_contents
 
-        # Save user message and proceed with analysis
-        st.session_state.auth_service.save_chat_message(
-            st.session_state.current_session["id"],
-            f"Analyzing report for patient: {patient_name}",
-        )
+    session_id = st.session_state.current_session["id"]
+    writer = get_message_writer()
+    # Save the user notice while the analysis streams
+    notice_saved = writer.write_soon(
+        session_id, [(f"Analyzing report for patient: {patient_name}", "user")]
+    )
 
-        # Generate analysis
-        result = generate_analysis(
-            {
-                "patient_name": patient_name,
-                "age": age,
-                "gender": gender,
-                "report": pdf_contents,
-            },
-            SPECIALIST_PROMPTS["comprehensive_analyst"],
+    # Stream the analysis so tokens render as they are generated
+    stream = stream_analysis(
+        {
+            "patient_name": patient_name,
+            "age": age,
+            "gender": gender,
+            "report": pdf_contents,
+        },
+        SPECIALIST_PROMPTS["comprehensive_analyst"],
+    )
+    st.write_stream(stream)
+
+    if stream.success:
+        # Save the full answer together with the report (so it survives a
+        # page refresh) once streaming has finished, after the notice
+        writer.write(
+            session_id,
+            [(format_analysis_message(stream.content, stream.model_used), "assistant")],
+            report_text=pdf_contents,
+            after=notice_saved,
         )
-
-        if result["success"]:
-            # Store report text as a system message for persistence
-            # This allows us to retrieve it later even after page refresh
-            report_metadata = f"__REPORT_TEXT__\n{pdf_contents}\n__END_REPORT_TEXT__"
-            st.session_state.auth_service.save_chat_message(
-                st.session_state.current_session["id"], report_metadata, role="system"
-            )
-
-            # Add model used information if available
-            content = result["content"]
-            if "model_used" in result:
-                model_info = f"\n\n*Analysis generated using {result['model_used']}*"
-                content += model_info
-
-            st.session_state.auth_service.save_chat_message(
-                st.session_state.current_session["id"], content, role="assistant"
-            )
-            st.rerun()
-        else:
-            st.error(result["error"])
-            st.stop()
+        st.rerun()
+    else:
+        notice_saved.result()
+        st.error(stream.error)
+        st.stop()
@@ -2,6 +2,7 @@ import streamlit as st
 from auth.session_manager import SessionManager
 from components.footer import show_footer
 from config.app_config import ANALYSIS_DAILY_LIMIT
+from services.ai_service import get_analysis_count
 
 def show_sidebar():
     with st.sidebar:
@@ -21,10 +22,7 @@ def show_sidebar():
                 st.rerun()
 
         # Add analysis counter
-        if 'analysis_count' not in st.session_state:
-            st.session_state.analysis_count = 0
-        
-        remaining = ANALYSIS_DAILY_LIMIT - st.session_state.analysis_count
+        remaining = ANALYSIS_DAILY_LIMIT - get_analysis_count()
         st.markdown(
             f"""
             <div style='
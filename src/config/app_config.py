@@ -1,3 +1,5 @@
+import os
+
 APP_NAME = "HIA"
 APP_DESCRIPTION = "Your Personal Health Insights Agent"
 APP_ICON = "🩺"
@@ -9,6 +11,114 @@ MAX_PDF_PAGES = 50
 SESSION_TIMEOUT_MINUTES = 30
 ANALYSIS_DAILY_LIMIT = 15
 
+# PDF extraction cache (keyed by a hash of the uploaded bytes)
+PDF_CACHE_MAX_ENTRIES = 64
+PDF_CACHE_DIR = os.environ.get("HIA_PDF_CACHE_DIR")  # unset disables the on-disk tier
+
+# PDF extraction mode: "serial" or "parallel" (page ranges split across a process pool).
+# Serial by default: benchmarks/bench_pdf_extraction.py measured 0.89x at 10 pages
+# and 1.05x at 50, so the pool only pays off on hosts with spare cores
+PDF_EXTRACTION_MODE = os.environ.get("HIA_PDF_EXTRACTION_MODE", "serial")
+PDF_EXTRACTION_WORKERS = min(4, os.cpu_count() or 1)
+PDF_PARALLEL_MIN_PAGES = 8  # smaller documents are not worth the pool overhead
+# Opt-in early rejection once this many pages lack enough medical terms; unset (0)
+# reads the whole document first, so terms that only appear on later pages still count
+PDF_VALIDATION_REJECT_PAGES = int(os.environ.get("HIA_PDF_VALIDATION_REJECT_PAGES", "0")) or None
+
+# Batch analysis (services/batch_service.py): reports processed concurrently
+BATCH_MAX_WORKERS = 4
+
+# Analysis response cache: "memory", "sqlite", "redis" or "none"
+RESPONSE_CACHE_BACKEND = os.environ.get("HIA_RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_TTL_SECONDS = 24 * 60 * 60
+RESPONSE_CACHE_MAX_ENTRIES = 256
+RESPONSE_CACHE_SQLITE_PATH = os.environ.get("HIA_RESPONSE_CACHE_PATH", ".cache/responses.sqlite3")
+RESPONSE_CACHE_REDIS_URL = os.environ.get("HIA_REDIS_URL", "redis://localhost:6379/0")
+
+# Shared per-user state (analysis counters, knowledge base): "session" keeps it
+# in st.session_state; "memory", "sqlite" or "redis" share it across sessions,
+# and with sqlite/redis across app replicas
+STATE_STORE_BACKEND = os.environ.get("HIA_STATE_BACKEND", "session")
+STATE_STORE_MAX_ENTRIES = 100_000
+STATE_STORE_SQLITE_PATH = os.environ.get("HIA_STATE_PATH", ".cache/state.sqlite3")
+STATE_STORE_REDIS_URL = os.environ.get("HIA_REDIS_URL", "redis://localhost:6379/0")
+
+# Supabase read cache in AuthService (per session, survives reruns; writes invalidate)
+AUTH_CACHE_TOKEN_TTL_SECONDS = 60  # validated user per access token
+AUTH_CACHE_USER_TTL_SECONDS = 300  # users table row
+AUTH_CACHE_LIST_TTL_SECONDS = 30  # session list
+CHAT_HISTORY_PAGE_SIZE = 50  # messages per history page
+CHAT_HISTORY_REFRESH_SECONDS = 30  # re-check for messages written by other tabs
+
+# Session report store (session_reports table; report text stays out of chat_messages)
+REPORT_STORE_MEMORY_ENTRIES = 8
+REPORT_STORE_MISS_TTL_SECONDS = 30  # sessions without a report are not looked up again for this long
+REPORT_COMPRESSION_LEVEL = 6
+
+# Local access-token verification; Supabase get_user is only called near
+# expiry or once per interval (SUPABASE_JWT_SECRET in secrets for HS256 projects)
+AUTH_JWT_LEEWAY_SECONDS = 10
+AUTH_JWKS_CACHE_SECONDS = 600
+AUTH_REMOTE_CHECK_INTERVAL_SECONDS = int(os.environ.get("HIA_AUTH_REMOTE_CHECK_INTERVAL", "300"))
+AUTH_REMOTE_CHECK_BEFORE_EXPIRY_SECONDS = 60
+
+# Chat message persistence: one bulk insert per write; with write-behind the
+# insert runs in a background flusher (retried on failure) instead of blocking the UI
+MESSAGE_WRITE_BEHIND = os.environ.get("HIA_MESSAGE_WRITE_BEHIND", "false").lower() == "true"
+MESSAGE_WRITER_MAX_ATTEMPTS = 5
+MESSAGE_WRITER_RETRY_SECONDS = 1.0  # doubled after each failed attempt
+
+# Model circuit breakers (shared by all sessions in the process)
+CIRCUIT_BREAKER_WINDOW_SECONDS = 60
+CIRCUIT_BREAKER_MIN_CALLS = 3
+CIRCUIT_BREAKER_FAILURE_RATE = 0.5
+CIRCUIT_BREAKER_COOLDOWN_SECONDS = 30
+CIRCUIT_BREAKER_PROBE_TIMEOUT_SECONDS = 120  # a probe that never reports back is replaced after this
+
+# Hedged requests: if PRIMARY has not answered within its latency percentile,
+# send the same request to the next healthy tier and keep the first answer.
+# Only non-streaming calls are hedged (generate_analysis: the JSON API and batch
+# runs); the Streamlit UI streams its answers and is not affected.
+HEDGING_ENABLED = os.environ.get("HIA_HEDGING_ENABLED", "false").lower() == "true"
+HEDGE_MAX_WORKERS = int(os.environ.get("HIA_HEDGE_MAX_WORKERS", "32"))  # concurrent hedged model calls per process
+HEDGE_PERCENTILE = 90
+HEDGE_MIN_SAMPLES = 20  # below this, HEDGE_DEFAULT_DELAY_SECONDS is used
+HEDGE_DEFAULT_DELAY_SECONDS = 8.0
+HEDGE_MIN_DELAY_SECONDS = 1.0
+
+# Embeddings (one model per process, shared by all sessions)
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+EMBEDDING_BATCH_WINDOW_MS = 5  # how long to wait for other sessions' texts before running a batch
+EMBEDDING_MAX_BATCH_SIZE = 64
+
+# Chunk embedding cache, keyed by a hash of the model name and chunk text (unset path keeps it in memory)
+EMBEDDING_CACHE_PATH = os.environ.get("HIA_EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3")
+EMBEDDING_CACHE_DTYPE = "float16"  # or "float32"
+EMBEDDING_CACHE_MEMORY_ENTRIES = 4096
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.environ.get("HIA_EMBEDDING_CACHE_MAX_ENTRIES", "200000"))  # ~150 MB at float16
+
+# Report vector stores, keyed by a hash of the report text. The disk tier keeps
+# chunk text (health data) at rest, so it is opt-in; unset disables it
+VECTOR_STORE_CACHE_DIR = os.environ.get("HIA_VECTOR_STORE_DIR")
+VECTOR_STORE_MEMORY_ENTRIES = 32
+VECTOR_STORE_DISK_MAX_BYTES = int(os.environ.get("HIA_VECTOR_STORE_MAX_BYTES", str(512 * 1024 * 1024)))
+VECTOR_STORE_DISK_MAX_AGE_SECONDS = 7 * 24 * 60 * 60  # entries not read for this long are deleted
+
+# Chat retrieval mode:
+#   "structured": look questions up by parsed analyte/panel, else fall back to hybrid
+#   "hybrid": BM25 and dense results fused by reciprocal rank
+#   "dense": vector store only
+#   "lexical": analyte lookup and BM25 only; the embedding model is never loaded
+CHAT_RETRIEVAL_MODE = os.environ.get("HIA_CHAT_RETRIEVAL_MODE", "structured")
+CHAT_RETRIEVAL_K = 3
+
+# The chat stack loads on the first chat message; with warm-up enabled it is
+# imported (and the embedding model loaded) in a background thread after startup
+CHAT_WARMUP_ENABLED = os.environ.get("HIA_CHAT_WARMUP", "false").lower() == "true"
+
+# JSON API (api/server.py): chat agents and indexes kept per report (content hash)
+API_CHAT_STATE_ENTRIES = 32
+
 # UI Settings
 PRIMARY_COLOR = "#64B5F6"
 SECONDARY_COLOR = "#1976D2"
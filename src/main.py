@@ -5,7 +5,8 @@ from components.sidebar import show_sidebar
 from components.analysis_form import show_analysis_form
 from components.footer import show_footer
 from config.app_config import APP_NAME, APP_TAGLINE, APP_DESCRIPTION, APP_ICON
-from services.ai_service import get_chat_response
+from services.ai_service import stream_chat_response
+from services.message_writer import get_message_writer, show_write_errors
 
 # Must be the first Streamlit command
 st.set_page_config(
@@ -56,20 +57,23 @@ def show_welcome_screen():
 
 
 def show_chat_history():
-    success, messages = st.session_state.auth_service.get_session_messages(
+    # Writes run before a rerun, so their failures are reported here
+    show_write_errors()
+
+    # Only new messages are fetched; system rows (report text) are left out
+    success, history = st.session_state.auth_service.get_chat_history(
         st.session_state.current_session["id"]
     )
 
     if success:
-        for msg in messages:
-            # Skip system messages (they contain report text metadata)
-            if msg.get("role") == "system":
-                continue
+        if history.has_older and st.button("Load earlier messages"):
+            history.load_older()
+        for msg in history.messages:
             if msg["role"] == "user":
                 st.info(msg["content"])
             else:
                 st.success(msg["content"])
-        return messages
+        return history.messages
     return []
 
 
@@ -78,44 +82,35 @@ def handle_chat_input(messages):
         # Display user message immediately
         st.info(prompt)
 
-        # Save user message
-        st.session_state.auth_service.save_chat_message(
-            st.session_state.current_session["id"], prompt, role="user"
-        )
-
         # Get context (report text)
         # We try to get it from session state first (for immediate use)
         context_text = st.session_state.get("current_report_text", "")
 
-        # If not in session state, try to retrieve from stored system message
-        if not context_text and messages:
-            for msg in messages:
-                if msg.get("role") == "system" and "__REPORT_TEXT__" in msg.get(
-                    "content", ""
-                ):
-                    # Extract report text from system message
-                    content = msg.get("content", "")
-                    start_idx = content.find("__REPORT_TEXT__\n") + len(
-                        "__REPORT_TEXT__\n"
-                    )
-                    end_idx = content.find("\n__END_REPORT_TEXT__")
-                    if start_idx > len("__REPORT_TEXT__\n") - 1 and end_idx > start_idx:
-                        context_text = content[start_idx:end_idx]
-                        # Also restore to session state for future use
-                        st.session_state.current_report_text = context_text
-                        break
-
-        with st.spinner("Thinking..."):
-            response = get_chat_response(prompt, context_text, messages)
-
-            st.success(response)
-
-            # Save AI response
-            st.session_state.auth_service.save_chat_message(
-                st.session_state.current_session["id"], response, role="assistant"
+        # If not in session state, look it up in the report store
+        if not context_text:
+            success, report = st.session_state.auth_service.get_report(
+                st.session_state.current_session["id"]
             )
-            # Rerun to update history display properly
-            st.rerun()
+            if success and report:
+                context_text = report.text
+                # Also restore to session state for future use
+                st.session_state.current_report_text = context_text
+
+        # Save the question while the answer streams (queued instead when
+        # write-behind is enabled)
+        writer = get_message_writer()
+        session_id = st.session_state.current_session["id"]
+        prompt_saved = writer.write_soon(session_id, [(prompt, "user")])
+
+        # Render the answer progressively as tokens arrive
+        response = st.write_stream(
+            stream_chat_response(prompt, context_text, messages)
+        )
+
+        # Save the answer once streaming has finished, after the question
+        writer.write(session_id, [(response, "assistant")], after=prompt_saved)
+        # Rerun to update history display properly
+        st.rerun()
 
 
 def show_user_greeting():
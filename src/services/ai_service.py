@@ -1,135 +1,270 @@
+import contextlib
+import logging
+import threading
 import streamlit as st
 from agents.analysis_agent import AnalysisAgent
-# from agents.chat_agent import ChatAgent
+from config.app_config import CHAT_RETRIEVAL_MODE, CHAT_WARMUP_ENABLED
+from utils.state_store import as_state_store, create_state_store
+from utils.vector_store_cache import content_hash
 
+logger = logging.getLogger(__name__)
 
-def init_analysis_state():
+_warmup_thread = None
+_warmup_lock = threading.Lock()
+
+
+def init_analysis_state(state=None):
     """Initialize analysis-related session state variables."""
-    if "analysis_agent" not in st.session_state:
-        st.session_state.analysis_agent = AnalysisAgent()
+    state = _resolve_state(state)
+    if "analysis_agent" not in state:
+        state["analysis_agent"] = AnalysisAgent(state=_shared_state(state))
+
+    if CHAT_WARMUP_ENABLED:
+        warm_up_chat_stack()
+
 
-    if "chat_agent" not in st.session_state:
+def init_chat_state(state=None):
+    """
+    Initialize the chat agent on first use.
+    Kept separate from init_analysis_state so sessions that never ask a
+    follow-up never import langchain or load the embedding model.
+    """
+    state = _resolve_state(state)
+    if "chat_agent" not in state:
         try:
             from agents.chat_agent import ChatAgent
 
             # Check if GROQ_API_KEY exists before initializing
             if "GROQ_API_KEY" not in st.secrets:
-                st.session_state.chat_agent = None
-                st.session_state.chat_agent_error = "GROQ_API_KEY not found in secrets. Please add it to .streamlit/secrets.toml"
+                state["chat_agent"] = None
+                state["chat_agent_error"] = "GROQ_API_KEY not found in secrets. Please add it to .streamlit/secrets.toml"
             else:
-                st.session_state.chat_agent = ChatAgent()
-                st.session_state.chat_agent_error = None
+                state["chat_agent"] = ChatAgent()
+                state["chat_agent_error"] = None
         except KeyError as e:
             # Missing secret key
-            st.session_state.chat_agent = None
-            st.session_state.chat_agent_error = f"Missing configuration: {str(e)}. Please check your .streamlit/secrets.toml file."
+            state["chat_agent"] = None
+            state["chat_agent_error"] = f"Missing configuration: {str(e)}. Please check your .streamlit/secrets.toml file."
         except ImportError as e:
             # Import error (missing dependencies)
-            st.session_state.chat_agent = None
-            st.session_state.chat_agent_error = (
+            state["chat_agent"] = None
+            state["chat_agent_error"] = (
                 f"Missing dependencies: {str(e)}. Please install required packages."
             )
         except Exception as e:
             # Other initialization errors
-            st.session_state.chat_agent = None
+            state["chat_agent"] = None
             import traceback
 
             error_details = traceback.format_exc()
-            st.session_state.chat_agent_error = f"Failed to initialize chat agent: {str(e)}\n\nDetails: {error_details[:500]}"
+            state["chat_agent_error"] = f"Failed to initialize chat agent: {str(e)}\n\nDetails: {error_details[:500]}"
+
+
+def warm_up_chat_stack():
+    """Import the chat stack and load the shared embedding model in the background (once per process)."""
+    global _warmup_thread
+    with _warmup_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=_warm_up, name="chat-warmup", daemon=True)
+            _warmup_thread.start()
+
 
+def _warm_up():
+    try:
+        import agents.chat_agent  # noqa: F401
 
-def check_rate_limit():
+        if CHAT_RETRIEVAL_MODE != "lexical":
+            from services.embedding_service import get_embeddings
+
+            get_embeddings()
+    except Exception as e:
+        # The first chat message will surface the error to the user
+        logger.warning(f"Chat warm-up failed: {str(e)}")
+
+
+def check_rate_limit(state=None):
+    state = _resolve_state(state)
     # Ensure analysis agent is initialized
-    init_analysis_state()
-    return st.session_state.analysis_agent.check_rate_limit()
+    init_analysis_state(state)
+    return state["analysis_agent"].check_rate_limit()
 
 
-def generate_analysis(data, system_prompt, check_only=False, session_id=None):
-    """Generate analysis if within rate limits."""
+def generate_analysis(data, system_prompt, check_only=False, session_id=None, state=None):
+    """
+    Generate analysis if within rate limits.
+    Pass state (any mutable mapping) to run without a Streamlit session.
+    """
+    state = _resolve_state(state)
     # Ensure analysis agent is initialized
-    init_analysis_state()
+    init_analysis_state(state)
 
     # For check_only, we just need to check rate limits
     if check_only:
-        return st.session_state.analysis_agent.check_rate_limit()
+        return state["analysis_agent"].check_rate_limit()
 
     # Call analyze_report without the chat_history parameter
-    return st.session_state.analysis_agent.analyze_report(
+    return state["analysis_agent"].analyze_report(
         data=data, system_prompt=system_prompt, check_only=False
     )
 
 
-def get_chat_response(query, context_text, chat_history):
-    """Generate chat response using RAG."""
-    init_analysis_state()
+def stream_analysis(data, system_prompt, state=None):
+    """Stream an analysis if within rate limits; returns an AnalysisStream."""
+    state = _resolve_state(state)
+    # Ensure analysis agent is initialized
+    init_analysis_state(state)
 
-    # Check if chat agent was successfully initialized
-    if st.session_state.chat_agent is None:
-        error_msg = st.session_state.get(
-            "chat_agent_error",
-            "Chat functionality is currently unavailable. Please check your GROQ_API_KEY configuration in .streamlit/secrets.toml",
-        )
-        return f"Error: {error_msg}"
+    return state["analysis_agent"].stream_report(
+        data=data, system_prompt=system_prompt
+    )
 
-    # Handle empty context - try to extract from chat history if available
-    if not context_text and chat_history:
-        # First, try to find the stored report text in system messages
-        for msg in chat_history:
-            if msg.get("role") == "system" and "__REPORT_TEXT__" in msg.get(
-                "content", ""
-            ):
-                # Extract report text from system message
-                content = msg.get("content", "")
-                start_idx = content.find("__REPORT_TEXT__\n") + len("__REPORT_TEXT__\n")
-                end_idx = content.find("\n__END_REPORT_TEXT__")
-                if start_idx > len("__REPORT_TEXT__\n") - 1 and end_idx > start_idx:
-                    context_text = content[start_idx:end_idx]
-                    break
-
-        # If still no context, try to extract from the first analysis message
-        if not context_text:
-            for msg in reversed(chat_history):
-                if msg["role"] == "assistant" and len(msg.get("content", "")) > 100:
-                    # This might be the analysis - use it as partial context
-                    # But we'll still work without vector store if needed
-                    context_text = msg["content"][:5000]  # Limit context size
-                    break
 
-    # We need to persist/retrieve the vector store.
-    # Since FAISS is in-memory, we can rebuild it for the session context or cache it.
-    # For efficiency with Streamlit, we can cache the vector store in session_state.
+def get_chat_response(query, context_text, chat_history, state=None, lock=None):
+    """
+    Generate chat response using RAG.
+    Pass state (any mutable mapping) to run without a Streamlit session, and
+    a lock if other threads share that state: it is held while the chat
+    agent and vector store are set up, not during the model call.
+
+    Returns:
+        (True, answer) on success, or (False, error_message)
+    """
+    state = _resolve_state(state)
+    with lock or contextlib.nullcontext():
+        vector_store, error = _prepare_chat_context(context_text, chat_history, state)
+        chat_agent = state["chat_agent"]
+    if error:
+        return False, error
+
+    return chat_agent.get_response(
+        query, vector_store, chat_history
+    )
+
+
+def stream_chat_response(query, context_text, chat_history, state=None):
+    """Generate chat response using RAG, yielding text deltas."""
+    state = _resolve_state(state)
+    vector_store, error = _prepare_chat_context(context_text, chat_history, state)
+    if error:
+        yield error
+        return
+
+    yield from state["chat_agent"].stream_response(
+        query, vector_store, chat_history
+    )
+
+
+def resolve_chat_context(context_text, chat_history):
+    """
+    Return the text chat answers are grounded in: the report if given, else
+    the analysis message in the chat history, else a placeholder.
+    """
+    # Handle empty context - callers resolve the report from the report
+    # store, so fall back to the analysis message in the chat history
+    if not context_text and chat_history:
+        for msg in reversed(chat_history):
+            if msg["role"] == "assistant" and len(msg.get("content", "")) > 100:
+                # This might be the analysis - use it as partial context
+                # But we'll still work without vector store if needed
+                context_text = msg["content"][:5000]  # Limit context size
+                break
 
     # Handle empty context_text - create a minimal vector store or skip RAG
     if not context_text:
         # If no context, we'll use chat history only
         # Create a dummy vector store with minimal content to avoid errors
         context_text = "No report context available. Relying on chat history only."
+    return context_text
+
 
-    if "vector_store" not in st.session_state or st.session_state.get(
+def _prepare_chat_context(context_text, chat_history, state):
+    """
+    Resolve the report context and make sure its vector store is built.
+    Progress and warnings are shown in the UI only for the Streamlit session.
+
+    Returns:
+        (vector_store, None) on success, or (None, error_message)
+    """
+    init_chat_state(state)
+
+    # Check if chat agent was successfully initialized
+    if state["chat_agent"] is None:
+        error_msg = state.get(
+            "chat_agent_error",
+            "Chat functionality is currently unavailable. Please check your GROQ_API_KEY configuration in .streamlit/secrets.toml",
+        )
+        return None, f"Error: {error_msg}"
+
+    context_text = resolve_chat_context(context_text, chat_history)
+
+    # We need to persist/retrieve the vector store.
+    # Since FAISS is in-memory, we can rebuild it for the session context or cache it.
+    # For efficiency with Streamlit, we can cache the vector store in session_state.
+    in_session = state is st.session_state
+    context_key = content_hash(context_text)
+    if "vector_store" not in state or state.get(
         "vector_store_key"
-    ) != len(context_text):
+    ) != context_key:
         try:
-            with st.spinner("Processing context..."):
-                st.session_state.vector_store = (
-                    st.session_state.chat_agent.initialize_vector_store(context_text)
+            with st.spinner("Processing context...") if in_session else contextlib.nullcontext():
+                state["vector_store"] = (
+                    state["chat_agent"].initialize_vector_store(context_text)
                 )
-                st.session_state.vector_store_key = len(context_text)
+                state["vector_store_key"] = context_key
         except Exception as e:
             # If vector store creation fails, create a minimal one
-            st.warning(
-                f"Could not create vector store: {str(e)}. Using chat history only."
-            )
+            message = f"Could not create vector store: {str(e)}. Using chat history only."
+            if in_session:
+                st.warning(message)
+            else:
+                logger.warning(message)
             try:
-                st.session_state.vector_store = (
-                    st.session_state.chat_agent.initialize_vector_store(
+                state["vector_store"] = (
+                    state["chat_agent"].initialize_vector_store(
                         "No report context available."
                     )
                 )
-                st.session_state.vector_store_key = 0
+                state["vector_store_key"] = None
             except Exception:
                 # Last resort - return error
-                return f"Error: Could not initialize vector store. {str(e)}"
+                return None, f"Error: Could not initialize vector store. {str(e)}"
 
-    return st.session_state.chat_agent.get_response(
-        query, st.session_state.vector_store, chat_history
-    )
+    return state["vector_store"], None
+
+
+def get_analysis_count(state=None):
+    """Return today's analysis count without building the analysis agent."""
+    state = _resolve_state(state)
+    return as_state_store(_shared_state(state)).get("analysis_count", 0)
+
+
+def get_contextualization_stats(state=None):
+    """Return the chat agent's query-rewrite skip rate and estimated time saved."""
+    state = _resolve_state(state)
+    chat_agent = state.get("chat_agent")
+    if chat_agent is None:
+        return None
+    return chat_agent.contextualization_stats()
+
+
+def _resolve_state(state):
+    """Use the Streamlit session unless the caller supplies its own state mapping."""
+    return st.session_state if state is None else state
+
+
+def _shared_state(state):
+    """
+    Return where the analysis counters and knowledge base live.
+    Streamlit sessions use the configured state store (keyed by user, so
+    replicas sharing a SQLite or Redis backend share rate limits, and the
+    session itself is used while the backend is unreachable); callers
+    passing their own state keep it.
+    """
+    if state is st.session_state:
+        # Sign-in stores either the user row or the auth response around it
+        user = state.get("user") or {}
+        user_id = user.get("id") or (user.get("user") or {}).get("id") or "anonymous"
+        store = create_state_store(f"user:{user_id}", fallback=state)
+        if store is not None:
+            return store
+    return state
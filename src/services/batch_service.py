@@ -0,0 +1,264 @@
+"""
+Batch analysis of many reports outside the Streamlit UI.
+
+Usage (from src/):
+    python -m services.batch_service REPORT_DIR --output results.jsonl \
+        [--metadata patients.json] [--workers 4]
+
+patients.json maps PDF file names to {"patient_name", "age", "gender"}.
+Re-running with the same --output skips items already written, so an
+interrupted batch picks up where it stopped.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from config.app_config import BATCH_MAX_WORKERS, MAX_UPLOAD_SIZE_MB
+from config.prompts import SPECIALIST_PROMPTS
+from utils.pdf_extractor import extract_pdf_bytes
+
+logger = logging.getLogger(__name__)
+
+
+def iter_report_directory(directory, metadata=None):
+    """
+    Yield batch items for every PDF in a directory, in name order.
+
+    Args:
+        directory: Folder containing the PDF reports
+        metadata: Optional {file name: {"patient_name", "age", "gender"}}
+    """
+    metadata = metadata or {}
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(".pdf"):
+            item = {"id": name, "path": os.path.join(directory, name)}
+            item.update(metadata.get(name, {}))
+            yield item
+
+
+def analyze_batch(items, output_path, system_prompt=None, max_workers=BATCH_MAX_WORKERS,
+                  retry_failed=False, agent=None):
+    """
+    Analyze many reports concurrently, appending one JSON line per report.
+
+    Args:
+        items: Iterable of PDF paths or dicts with "path" (or "report" text),
+            optional "id", "patient_name", "age" and "gender"
+        output_path: JSONL results file; items already in it are skipped
+        system_prompt: Defaults to the comprehensive analyst prompt
+        max_workers: Reports processed at once (extraction and model call)
+        retry_failed: Also re-run items whose earlier result was a failure
+        agent: AnalysisAgent to use; by default one with its own, unlimited state
+
+    Returns:
+        Summary dict with total, succeeded, failed, skipped and seconds
+    """
+    if agent is None:
+        from agents.analysis_agent import AnalysisAgent
+
+        # Batch runs are not subject to the per-session daily limit
+        agent = AnalysisAgent(state={"analysis_limit": math.inf})
+
+    system_prompt = system_prompt or SPECIALIST_PROMPTS["comprehensive_analyst"]
+    # Trim first: a record cut off before its newline is re-run, not counted as done
+    _truncate_torn_line(output_path)
+    done = _load_finished_ids(output_path, retry_failed)
+    summary = {"total": 0, "succeeded": 0, "failed": 0, "skipped": 0}
+    state_lock = threading.Lock()
+    write_lock = threading.Lock()
+    started = time.perf_counter()
+
+    with open(output_path, "a", encoding="utf-8") as output, ThreadPoolExecutor(max_workers) as pool:
+
+        def run(item):
+            record = _analyze_item(agent, item, system_prompt, state_lock)
+            with write_lock:
+                output.write(json.dumps(record) + "\n")
+                # Flush each line so a crash loses at most the in-flight items
+                output.flush()
+                os.fsync(output.fileno())
+            return record
+
+        pending = set()
+        for item in items:
+            item = _normalize_item(item)
+            summary["total"] += 1
+            if item["id"] in done:
+                summary["skipped"] += 1
+                continue
+
+            # Bound the number of queued items so large batches are never fully in memory
+            if len(pending) >= max_workers * 2:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                _tally(summary, finished)
+            pending.add(pool.submit(run, item))
+
+        finished, _ = wait(pending)
+        _tally(summary, finished)
+
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def _analyze_item(agent, item, system_prompt, state_lock):
+    """Extract, validate and analyze one report; never raises."""
+    record = {"id": item["id"], "source": item.get("path"), "success": False}
+    timings = {}
+    started = time.perf_counter()
+
+    try:
+        report = item.get("report")
+        if report is None:
+            report, error = _extract(item["path"], timings)
+            if error:
+                record["error"] = error
+                return _finish(record, timings, started)
+
+        data = {
+            "patient_name": item.get("patient_name", ""),
+            "age": item.get("age", ""),
+            "gender": item.get("gender", ""),
+            "report": report,
+        }
+
+        # Same steps as AnalysisAgent.analyze_report, but only the shared
+        # counters and knowledge base are touched under the lock; model calls
+        # run concurrently
+        with state_lock:
+            can_analyze, error_msg = agent.check_rate_limit()
+            if not can_analyze:
+                record["error"] = error_msg
+                return _finish(record, timings, started)
+            request = agent.prepare_request(data, system_prompt)
+
+        analysis_started = time.perf_counter()
+        result = agent.model_manager.generate_analysis(request["data"], request["prompt"])
+        timings["analysis_seconds"] = round(time.perf_counter() - analysis_started, 3)
+
+        with state_lock:
+            agent.record_result(request, result)
+
+        record.update(
+            success=result["success"],
+            content=result.get("content"),
+            error=result.get("error"),
+            model_used=result.get("model_used"),
+            cache_hit=result.get("cache_hit", False),
+            token_usage=result.get("token_usage"),
+        )
+    except Exception as e:
+        logger.exception(f"Batch item {item['id']} failed")
+        record["error"] = f"Unexpected error: {str(e)}"
+
+    return _finish(record, timings, started)
+
+
+def _extract(path, timings):
+    """Read and extract a PDF; returns (text, None) or (None, error)."""
+    extract_started = time.perf_counter()
+    if os.path.getsize(path) > MAX_UPLOAD_SIZE_MB * 1024 * 1024:
+        return None, f"File exceeds the {MAX_UPLOAD_SIZE_MB}MB limit"
+
+    with open(path, "rb") as f:
+        pdf_bytes = f.read()
+    try:
+        success, result = extract_pdf_bytes(pdf_bytes)
+    except Exception as e:
+        success, result = False, f"Error extracting text from PDF: {str(e)}"
+    timings["extract_seconds"] = round(time.perf_counter() - extract_started, 3)
+    return (result, None) if success else (None, result)
+
+
+def _finish(record, timings, started):
+    timings["total_seconds"] = round(time.perf_counter() - started, 3)
+    record["timings"] = timings
+    record["finished_at"] = datetime.now().isoformat()
+    return record
+
+
+def _normalize_item(item):
+    if isinstance(item, (str, os.PathLike)):
+        item = {"path": os.fspath(item)}
+    else:
+        item = dict(item)
+    item.setdefault("id", item.get("path"))
+    if item["id"] is None:
+        raise ValueError("Batch items without a path need an 'id'")
+    return item
+
+
+def _load_finished_ids(output_path, retry_failed):
+    """Return ids already recorded in output_path (successes only if retry_failed)."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Unparseable line (e.g. edited by hand); the item is simply re-run
+                continue
+            if record.get("success") or not retry_failed:
+                done.add(record["id"])
+    return done
+
+
+def _truncate_torn_line(output_path):
+    """Cut a half-written last line left by a crash, so appended records start on their own line."""
+    if not os.path.exists(output_path):
+        return
+
+    with open(output_path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - 4096)
+            f.seek(start)
+            chunk = f.read(position - start)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                position = start + newline + 1
+                break
+            position = start
+        if position < end:
+            logger.warning(f"Dropping a torn last line from {output_path}")
+            f.truncate(position)
+
+
+def _tally(summary, futures):
+    for future in futures:
+        summary["succeeded" if future.result()["success"] else "failed"] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="folder of PDF reports")
+    parser.add_argument("--output", required=True, help="JSONL results file (appended to)")
+    parser.add_argument("--metadata", help="JSON file mapping PDF names to patient details")
+    parser.add_argument("--workers", type=int, default=BATCH_MAX_WORKERS)
+    parser.add_argument("--retry-failed", action="store_true", help="re-run items that failed before")
+    args = parser.parse_args()
+
+    metadata = None
+    if args.metadata:
+        with open(args.metadata, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+
+    summary = analyze_batch(
+        iter_report_directory(args.directory, metadata),
+        args.output,
+        max_workers=args.workers,
+        retry_failed=args.retry_failed,
+    )
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
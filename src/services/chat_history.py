@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+from config.app_config import CHAT_HISTORY_PAGE_SIZE, CHAT_HISTORY_REFRESH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Legacy system rows carry the full report text and are never part of the history
+HISTORY_COLUMNS = "id, role, content, created_at, seq"
+
+
+class ChatHistory:
+    """
+    Local cache of one chat session's visible messages, loaded incrementally.
+
+    Rows are ordered by seq, which the database assigns on insert, so
+    client clock skew cannot hide rows from a refresh. The first refresh
+    fetches the newest page; later refreshes only fetch rows after the
+    newest fetched seq, and older pages are fetched on demand with
+    load_older(). Writers call mark_stale() so the next refresh picks up
+    their rows without waiting for the interval.
+    """
+
+    def __init__(self, supabase, session_id, page_size=CHAT_HISTORY_PAGE_SIZE):
+        self.supabase = supabase
+        self.session_id = session_id
+        self.page_size = page_size
+        self.messages = []
+        self.has_older = False
+        self._by_id = {}
+        self._loaded = False
+        self._stale = True
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+
+    def mark_stale(self):
+        self._stale = True
+
+    def refresh(self):
+        """Fetch new messages if marked stale or the refresh interval has passed."""
+        with self._lock:
+            if not self._stale and time.monotonic() - self._refreshed_at < CHAT_HISTORY_REFRESH_SECONDS:
+                return self.messages
+
+            self._stale = False
+            self._refreshed_at = time.monotonic()
+
+            if not self._loaded:
+                rows = self._query().order("seq", desc=True).limit(self.page_size).execute().data
+                self._loaded = True
+                self.has_older = len(rows) == self.page_size
+                self._add(reversed(rows), append=True)
+            else:
+                # Rows queued locally have no seq until a refresh fetches them
+                last_seq = self._last_seq()
+                if last_seq is None:
+                    rows = self._query().order("seq").limit(self.page_size).execute().data
+                else:
+                    rows = self._query().gt("seq", last_seq).order("seq").execute().data
+                self._add(rows, append=True)
+
+            return self.messages
+
+    def append_local(self, rows):
+        """Show rows that are queued for insert; the refresh that fetches them matches them by id."""
+        with self._lock:
+            if self._loaded:
+                self._add(rows, append=True)
+
+    def load_older(self):
+        """Prepend the page of messages before the oldest cached one; returns how many were added."""
+        with self._lock:
+            first_seq = next((row["seq"] for row in self.messages if row.get("seq") is not None), None)
+            if first_seq is None:
+                return 0
+
+            rows = (
+                self._query()
+                .lt("seq", first_seq)
+                .order("seq", desc=True)
+                .limit(self.page_size)
+                .execute()
+                .data
+            )
+            added = self._add(reversed(rows), append=False)
+            self.has_older = len(rows) == self.page_size
+            return added
+
+    def _last_seq(self):
+        return next((row["seq"] for row in reversed(self.messages) if row.get("seq") is not None), None)
+
+    def _query(self):
+        return (
+            self.supabase
+            .table("chat_messages")
+            .select(HISTORY_COLUMNS)
+            .eq("session_id", self.session_id)
+            .neq("role", "system")
+        )
+
+    def _add(self, rows, append):
+        new = []
+        for row in rows:
+            known = self._by_id.get(row["id"])
+            if known is None:
+                self._by_id[row["id"]] = row
+                new.append(row)
+            else:
+                # A locally queued row has been saved: take its server-assigned seq
+                known.update(row)
+        if append:
+            self.messages.extend(new)
+        else:
+            self.messages[:0] = new
+        if new:
+            logger.debug(f"Chat history {self.session_id}: {len(new)} new message(s)")
+        return len(new)
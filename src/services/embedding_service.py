@@ -0,0 +1,123 @@
+import queue
+import threading
+from concurrent.futures import Future
+import streamlit as st
+from langchain_core.embeddings import Embeddings
+from config.app_config import (
+    EMBEDDING_BATCH_WINDOW_MS,
+    EMBEDDING_CACHE_DTYPE,
+    EMBEDDING_CACHE_MAX_ENTRIES,
+    EMBEDDING_CACHE_MEMORY_ENTRIES,
+    EMBEDDING_CACHE_PATH,
+    EMBEDDING_MAX_BATCH_SIZE,
+    EMBEDDING_MODEL_NAME,
+)
+from utils.embedding_cache import ChunkEmbeddingCache
+
+
+class SharedEmbeddings(Embeddings):
+    """
+    Process-wide embedding model shared by every session.
+    Calls from any thread are queued and a single worker runs them through
+    the model in batches, coalescing texts that arrive within a short
+    window so concurrent sessions share forward passes. Document chunks
+    already seen (by this or any earlier process) come from the chunk cache
+    and are not run through the model again.
+    """
+
+    def __init__(self, model_name=EMBEDDING_MODEL_NAME, batch_window_ms=EMBEDDING_BATCH_WINDOW_MS,
+                 max_batch_size=EMBEDDING_MAX_BATCH_SIZE, model=None, chunk_cache=None):
+        if model is None:
+            from langchain_huggingface import HuggingFaceEmbeddings
+
+            model = HuggingFaceEmbeddings(model_name=model_name)
+        self.model_name = model_name
+        self.model = model
+        self.chunk_cache = chunk_cache
+        self.batch_window = batch_window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.batches_run = 0
+        self.texts_embedded = 0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def embed_documents(self, texts):
+        if not texts or self.chunk_cache is None:
+            return self._embed(texts)
+
+        vectors = self.chunk_cache.get_many(texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            # Rounded like the cached vectors, so results do not depend on cache state
+            computed = self.chunk_cache.set_many(missing_texts, self._embed(missing_texts))
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text):
+        # Queries are rarely repeated verbatim, so they skip the chunk cache
+        return self._embed([text])[0]
+
+    def stats(self):
+        stats = {
+            "model": self.model_name,
+            "batches_run": self.batches_run,
+            "texts_embedded": self.texts_embedded,
+        }
+        if self.chunk_cache is not None:
+            stats["chunk_cache"] = self.chunk_cache.stats()
+        return stats
+
+    def _embed(self, texts):
+        if not texts:
+            return []
+        future = Future()
+        self._queue.put((list(texts), future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            jobs = [self._queue.get()]
+            size = len(jobs[0][0])
+
+            # Give other sessions a moment to add their texts to this batch
+            while size < self.max_batch_size:
+                try:
+                    job = self._queue.get(timeout=self.batch_window)
+                except queue.Empty:
+                    break
+                jobs.append(job)
+                size += len(job[0])
+
+            self._embed_jobs(jobs)
+
+    def _embed_jobs(self, jobs):
+        texts = [text for job_texts, _ in jobs for text in job_texts]
+        try:
+            vectors = self.model.embed_documents(texts)
+        except Exception as e:
+            for _, future in jobs:
+                future.set_exception(e)
+            return
+
+        self.batches_run += 1
+        self.texts_embedded += len(texts)
+        offset = 0
+        for job_texts, future in jobs:
+            future.set_result(vectors[offset:offset + len(job_texts)])
+            offset += len(job_texts)
+
+
+@st.cache_resource(show_spinner=False)
+def get_embeddings():
+    """Return the shared embedding model, loading it once per process."""
+    chunk_cache = ChunkEmbeddingCache(
+        EMBEDDING_MODEL_NAME,
+        path=EMBEDDING_CACHE_PATH,
+        dtype=EMBEDDING_CACHE_DTYPE,
+        memory_entries=EMBEDDING_CACHE_MEMORY_ENTRIES,
+        max_entries=EMBEDDING_CACHE_MAX_ENTRIES,
+    )
+    return SharedEmbeddings(chunk_cache=chunk_cache)
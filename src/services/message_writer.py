@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+import streamlit as st
+from config.app_config import (
+    MESSAGE_WRITE_BEHIND,
+    MESSAGE_WRITER_MAX_ATTEMPTS,
+    MESSAGE_WRITER_RETRY_SECONDS,
+)
+from utils.async_runner import run_sync, submit
+
+logger = logging.getLogger(__name__)
+
+
+def build_message_rows(session_id, messages):
+    """
+    Build chat_messages rows for (content, role) pairs.
+    Ids are set client-side, so re-sending rows that already landed is a
+    no-op; created_at and seq are left to the database, which assigns seq
+    in row order within one bulk insert.
+    """
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "session_id": session_id,
+            "content": content,
+            "role": role,
+        }
+        for content, role in messages
+    ]
+
+
+class MessageWriter:
+    """
+    Persists chat messages (and optionally the session report) with one
+    bulk insert per write.
+
+    With write-behind enabled, writes are queued and return immediately;
+    a background flusher coalesces everything queued into one request and
+    retries failures with exponential backoff. The writer lives in session
+    state, so queued rows survive reruns, and the flusher thread exits once
+    the queue is empty. write_soon starts a write without waiting for it,
+    so a user's message is saved while the answer streams. Failed blocking
+    writes and dropped rows are kept as notices for the UI (see
+    show_write_errors).
+    """
+
+    def __init__(self, auth_service, write_behind=MESSAGE_WRITE_BEHIND):
+        self.auth_service = auth_service
+        self.write_behind = write_behind
+        self._pending = []  # [(rows, reports, attempts)]
+        self._inflight = 0
+        self._thread = None
+        self._cond = threading.Condition()
+        self.counters = {"rows": 0, "requests": 0, "retries": 0, "dropped": 0}
+        self._errors = []
+
+    def write(self, session_id, messages, report_text=None, after=None):
+        """
+        Save (content, role) messages for a session, plus its report if given.
+        Pass the future from an earlier write_soon as after to save these
+        rows once that write has finished, so the rows keep their order.
+
+        Returns:
+            (True, None) once saved, or queued in write-behind mode;
+            (False, error) if a blocking write failed.
+        """
+        rows = build_message_rows(session_id, messages)
+        reports = [(session_id, report_text)] if report_text else []
+
+        if not self.write_behind:
+            if after is not None:
+                after.result()
+            result = self._save(rows, reports)
+            self._note_result(result)
+            return result
+
+        # Show queued rows in the history before they reach the database
+        self.auth_service.add_local_messages(session_id, rows)
+        with self._cond:
+            self._pending.append((rows, reports, 0))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="message-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+        return True, None
+
+    def write_soon(self, session_id, messages):
+        """
+        Start saving messages without waiting for the insert, e.g. the
+        user's message while the answer streams.
+
+        Returns:
+            A concurrent.futures.Future resolving to (success, error)
+        """
+        if self.write_behind:
+            future = Future()
+            future.set_result(self.write(session_id, messages))
+            return future
+
+        return submit(self._asave_noted(build_message_rows(session_id, messages)))
+
+    def flush(self, timeout=None):
+        """Wait until queued writes are saved or dropped; False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._inflight, timeout)
+
+    def stats(self):
+        with self._cond:
+            pending = sum(len(rows) for rows, _, _ in self._pending)
+            return dict(self.counters, pending=pending)
+
+    def take_errors(self):
+        """Return and clear the notices about writes that failed or were dropped."""
+        with self._cond:
+            errors, self._errors = self._errors, []
+        return errors
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._pending:
+                    self._thread = None
+                    self._cond.notify_all()
+                    return
+                # Coalesce everything queued into one request
+                rows = [row for job_rows, _, _ in self._pending for row in job_rows]
+                reports = [report for _, job_reports, _ in self._pending for report in job_reports]
+                attempts = max(job_attempts for _, _, job_attempts in self._pending)
+                self._pending = []
+                self._inflight += 1
+
+            success, error = self._save(rows, reports)
+
+            with self._cond:
+                self._inflight -= 1
+                if not success:
+                    attempts += 1
+                    if attempts >= MESSAGE_WRITER_MAX_ATTEMPTS:
+                        self.counters["dropped"] += len(rows)
+                        self._errors.append(f"{len(rows)} chat message(s) could not be saved: {error}")
+                        logger.error(f"Dropping {len(rows)} chat message(s) after {attempts} attempts: {error}")
+                    else:
+                        self.counters["retries"] += 1
+                        self._pending.insert(0, (rows, reports, attempts))
+                self._cond.notify_all()
+
+            if not success and attempts < MESSAGE_WRITER_MAX_ATTEMPTS:
+                delay = MESSAGE_WRITER_RETRY_SECONDS * 2 ** (attempts - 1)
+                logger.warning(f"Saving chat messages failed ({error}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    async def _asave(self, rows, reports):
+        """Insert rows in one request, concurrently with any report upserts."""
+        results = await asyncio.gather(
+            self.auth_service.asave_chat_messages(rows),
+            *(self.auth_service.asave_report(session_id, text) for session_id, text in reports),
+        )
+        failed = [error for success, error in results if not success]
+        with self._cond:
+            self.counters["requests"] += 1
+            if not failed:
+                self.counters["rows"] += len(rows)
+        return (False, failed[0]) if failed else (True, None)
+
+    async def _asave_noted(self, rows):
+        # Noted before the future resolves, so callers waiting on it see the notice
+        result = await self._asave(rows, [])
+        self._note_result(result)
+        return result
+
+    def _save(self, rows, reports):
+        return run_sync(self._asave(rows, reports))
+
+    def _note_result(self, result):
+        """Keep a notice for the UI if a blocking write failed."""
+        success, error = result
+        if not success:
+            with self._cond:
+                self._errors.append(f"Your messages could not be saved: {error}")
+
+
+def get_message_writer():
+    """Return this session's MessageWriter, kept in session state across reruns."""
+    if "message_writer" not in st.session_state:
+        st.session_state.message_writer = MessageWriter(st.session_state.auth_service)
+    return st.session_state.message_writer
+
+
+def show_write_errors():
+    """Warn about messages this session failed to save since the last call."""
+    writer = st.session_state.get("message_writer")
+    if writer is not None:
+        for error in writer.take_errors():
+            st.warning(error)
@@ -0,0 +1,144 @@
+import base64
+import logging
+import math
+import zlib
+from collections import namedtuple
+from config.app_config import (
+    REPORT_COMPRESSION_LEVEL,
+    REPORT_STORE_MEMORY_ENTRIES,
+    REPORT_STORE_MISS_TTL_SECONDS,
+)
+from utils.cache import LRUCache
+from utils.lab_parser import parse_lab_report
+from utils.message_format import parse_report_metadata
+from utils.vector_store_cache import content_hash
+
+logger = logging.getLogger(__name__)
+
+StoredReport = namedtuple("StoredReport", ["text", "analytes", "content_hash"])
+
+
+def compress_report(text):
+    """zlib-compress report text and base64 it for a TEXT column."""
+    return base64.b64encode(zlib.compress(text.encode("utf-8"), REPORT_COMPRESSION_LEVEL)).decode("ascii")
+
+
+def decompress_report(payload):
+    return zlib.decompress(base64.b64decode(payload)).decode("utf-8")
+
+
+def serialize_analytes(report_text):
+    """Parsed lab rows as JSON-ready dicts (NaN becomes None)."""
+    return [
+        {
+            key: None if isinstance(value, float) and math.isnan(value) else value
+            for key, value in row._asdict().items()
+        }
+        for row in parse_lab_report(report_text)
+    ]
+
+
+class ReportStore:
+    """
+    Report text for each chat session, kept in the session_reports table
+    rather than in chat_messages, so history queries never carry it.
+
+    Rows are keyed by session id (the primary key), hold the compressed
+    text, the parsed analytes and a content hash, and are cached in memory
+    after the first lookup. Sessions found to have no report (in either
+    table) are remembered for REPORT_STORE_MISS_TTL_SECONDS.
+    """
+
+    def __init__(self, supabase, memory_entries=REPORT_STORE_MEMORY_ENTRIES):
+        self.supabase = supabase
+        self._cache = LRUCache(max_entries=memory_entries)
+        self._missing = LRUCache(max_entries=memory_entries * 4, ttl_seconds=REPORT_STORE_MISS_TTL_SECONDS)
+
+    def build_row(self, session_id, report_text):
+        """Return the session_reports row for a report, or None if it is already stored."""
+        digest = content_hash(report_text)
+        cached = self._cache.get(session_id)
+        if cached is not None and cached.content_hash == digest:
+            return None
+
+        return {
+            "session_id": session_id,
+            "content_hash": digest,
+            "report_zlib": compress_report(report_text),
+            "analytes": serialize_analytes(report_text),
+            "text_length": len(report_text),
+        }
+
+    def remember(self, row, report_text):
+        """Cache a row that has been written."""
+        self._missing.delete(row["session_id"])
+        self._cache.set(
+            row["session_id"], StoredReport(report_text, row["analytes"], row["content_hash"])
+        )
+
+    def save(self, session_id, report_text):
+        """Upsert the report for a session; returns (success, None or error)."""
+        row = self.build_row(session_id, report_text)
+        if row is None:
+            return True, None
+
+        try:
+            self.supabase.table("session_reports").upsert(row).execute()
+        except Exception as e:
+            logger.warning(f"Saving report for session {session_id} failed: {e}")
+            return False, str(e)
+
+        self.remember(row, report_text)
+        return True, None
+
+    def get(self, session_id):
+        """Return the session's StoredReport, or None if it has no report."""
+        report = self._cache.get(session_id)
+        if report is not None:
+            return report
+        if self._missing.get(session_id):
+            return None
+
+        rows = (
+            self.supabase
+            .table("session_reports")
+            .select("content_hash, report_zlib, analytes")
+            .eq("session_id", session_id)
+            .limit(1)
+            .execute()
+            .data
+        )
+        if rows:
+            row = rows[0]
+            report = StoredReport(decompress_report(row["report_zlib"]), row["analytes"], row["content_hash"])
+            self._cache.set(session_id, report)
+            return report
+
+        report = self._migrate_legacy(session_id)
+        if report is None:
+            self._missing.set(session_id, True)
+        return report
+
+    def forget(self, session_id):
+        self._cache.delete(session_id)
+        self._missing.delete(session_id)
+
+    def _migrate_legacy(self, session_id):
+        """Move a report stored as a __REPORT_TEXT__ system message into the store."""
+        rows = (
+            self.supabase
+            .table("chat_messages")
+            .select("content")
+            .eq("session_id", session_id)
+            .eq("role", "system")
+            .order("created_at", desc=True)
+            .limit(1)
+            .execute()
+            .data
+        )
+        report_text = parse_report_metadata(rows[0]["content"]) if rows else ""
+        if not report_text:
+            return None
+
+        self.save(session_id, report_text)
+        return self._cache.get(session_id) or StoredReport(report_text, serialize_analytes(report_text), content_hash(report_text))
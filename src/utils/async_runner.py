@@ -0,0 +1,30 @@
+import asyncio
+import threading
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_loop():
+    """
+    Return the process-wide event loop, running in a daemon thread.
+    Async clients (such as the async Supabase client) are bound to the
+    loop they were first used on, so all async I/O goes through this one.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name="async-io", daemon=True)
+            thread.start()
+        return _loop
+
+
+def submit(coro):
+    """Schedule a coroutine on the shared loop; returns a concurrent.futures.Future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run_sync(coro, timeout=None):
+    """Run a coroutine on the shared loop and block until it finishes."""
+    return submit(coro).result(timeout)
@@ -0,0 +1,75 @@
+import math
+import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+
+
+def tokenize(text):
+    """Lowercase word and number tokens ("LDL 100 mg/dL" -> ldl, 100, mg, dl)."""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed list of texts, held as an in-memory inverted
+    index (token -> {doc: term frequency}). Exact analyte names and numbers
+    score directly, which dense embeddings handle poorly.
+    """
+
+    def __init__(self, texts, k1=1.5, b=0.75):
+        self.texts = list(texts)
+        self.k1 = k1
+        self.b = b
+        self._postings = defaultdict(dict)
+        self._lengths = []
+
+        for doc, text in enumerate(self.texts):
+            counts = Counter(tokenize(text))
+            self._lengths.append(sum(counts.values()))
+            for token, tf in counts.items():
+                self._postings[token][doc] = tf
+
+        self._average_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        doc_count = len(self.texts)
+        self._idf = {
+            token: math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for token, docs in self._postings.items()
+        }
+
+    def __len__(self):
+        return len(self.texts)
+
+    def search(self, query, k=3):
+        """Return up to k (doc_index, score) pairs, best first; docs sharing no token are omitted."""
+        scores = defaultdict(float)
+        for token in set(tokenize(query)):
+            docs = self._postings.get(token)
+            if not docs:
+                continue
+            idf = self._idf[token]
+            for doc, tf in docs.items():
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc] / self._average_length)
+                scores[doc] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def reciprocal_rank_fusion(rankings, k=3, constant=60):
+    """
+    Fuse several best-first lists of doc ids into one.
+    Each list contributes 1 / (constant + rank), so a chunk that ranks well
+    in both BM25 and dense search beats one that tops only one of them.
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            scores[doc] += 1.0 / (constant + rank + 1)
+    return [doc for doc, _ in sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]]
+
+
+@lru_cache(maxsize=32)
+def build_bm25_index(texts):
+    """Return the BM25Index for a tuple of chunk texts (cached per distinct report)."""
+    return BM25Index(texts)
@@ -0,0 +1,151 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkEmbeddingCache:
+    """
+    Cache of chunk embeddings keyed by a hash of the model name and chunk text.
+    Vectors are kept as raw float16 (or float32) blobs in a local SQLite file,
+    with a small LRU of numpy arrays in the same dtype in front for chunks
+    repeated within the process. Vectors are returned as float lists, and
+    fresh ones are rounded to the cache dtype too, so a chunk embeds the
+    same whether or not it was cached. Pass path=None for a memory-only cache.
+
+    The SQLite store keeps at most about max_entries rows: like the kv_store
+    SQLite backend, the least recently read ones are evicted every few writes.
+    """
+
+    def __init__(self, model_name, path=None, dtype="float16", memory_entries=4096, max_entries=200_000):
+        self.model_name = model_name
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = LRUCache(max_entries=memory_entries)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._evict_every = max(1, max_entries // 20)
+        self._writes_since_evict = 0
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunk_embeddings "
+                "(key TEXT PRIMARY KEY, vector BLOB NOT NULL, accessed_at REAL NOT NULL DEFAULT 0)"
+            )
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(chunk_embeddings)")]
+            if "accessed_at" not in columns:
+                # Files written before eviction existed
+                self._conn.execute("ALTER TABLE chunk_embeddings ADD COLUMN accessed_at REAL NOT NULL DEFAULT 0")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS chunk_embeddings_accessed_at ON chunk_embeddings (accessed_at)"
+            )
+
+    def key(self, text):
+        # The dtype is part of the key so changing it never misreads old blobs
+        return hashlib.sha256(f"{self.model_name}\n{self.dtype.name}\n{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, texts):
+        """Return a list aligned with texts: the cached vector (a float list), or None on a miss."""
+        keys = [self.key(text) for text in texts]
+        vectors = [self._memory.get(key) for key in keys]
+
+        missing = [key for key, vector in zip(keys, vectors) if vector is None]
+        if missing and self._conn is not None:
+            found = self._load(missing)
+            for i, key in enumerate(keys):
+                if vectors[i] is None and key in found:
+                    vectors[i] = found[key]
+                    self._memory.set(key, vectors[i])
+
+        hits = sum(1 for vector in vectors if vector is not None)
+        self.hits += hits
+        self.misses += len(vectors) - hits
+        return [None if vector is None else _to_list(vector) for vector in vectors]
+
+    def set_many(self, texts, vectors):
+        """Cache vectors for texts; returns them rounded to the cache dtype, as float lists."""
+        rows = []
+        stored = []
+        now = time.time()
+        for text, vector in zip(texts, vectors):
+            key = self.key(text)
+            array = np.asarray(vector, dtype=self.dtype)
+            self._memory.set(key, array)
+            rows.append((key, array.tobytes(), now))
+            stored.append(_to_list(array))
+
+        if self._conn is None:
+            return stored
+        try:
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO chunk_embeddings (key, vector, accessed_at) VALUES (?, ?, ?)", rows
+                )
+                self._writes_since_evict += len(rows)
+                if self._writes_since_evict >= self._evict_every:
+                    self._writes_since_evict = 0
+                    self._evict()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to write chunk embeddings: {str(e)}")
+        return stored
+
+    def stats(self):
+        total = self.hits + self.misses
+        stats = {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "dtype": self.dtype.name,
+        }
+        if self._conn is not None:
+            with self._lock:
+                stats["entries"] = self._conn.execute("SELECT COUNT(*) FROM chunk_embeddings").fetchone()[0]
+        return stats
+
+    def _evict(self):
+        """Delete the least recently read rows beyond max_entries (walks the accessed_at index)."""
+        overflow = self._conn.execute("SELECT COUNT(*) FROM chunk_embeddings").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM chunk_embeddings WHERE key IN ("
+                "SELECT key FROM chunk_embeddings ORDER BY accessed_at LIMIT ?)",
+                (overflow,),
+            )
+
+    def _load(self, keys):
+        found = {}
+        now = time.time()
+        try:
+            with self._lock:
+                # Stay well under SQLite's bound-parameter limit
+                for start in range(0, len(keys), 500):
+                    batch = keys[start:start + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    for key, blob in self._conn.execute(
+                        f"SELECT key, vector FROM chunk_embeddings WHERE key IN ({placeholders})", batch
+                    ):
+                        found[key] = np.frombuffer(blob, dtype=self.dtype)
+                    self._conn.execute(
+                        f"UPDATE chunk_embeddings SET accessed_at = ? WHERE key IN ({placeholders})", [now, *batch]
+                    )
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to read chunk embeddings: {str(e)}")
+        return found
+
+
+def _to_list(array):
+    return array.astype(np.float32).tolist()
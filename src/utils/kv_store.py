@@ -0,0 +1,218 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryStore:
+    """In-process key-value store (bounded LRU with TTL)."""
+
+    def __init__(self, max_entries=256, ttl_seconds=None):
+        self._cache = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._incr_lock = threading.Lock()
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value, ttl_seconds=None):
+        self._cache.set(key, value, ttl_seconds)
+
+    def incr(self, key, amount=1):
+        """Add amount to a numeric value (missing counts as 0) and return the result."""
+        with self._incr_lock:
+            value = (self._cache.get(key) or 0) + amount
+            self._cache.set(key, value)
+        return value
+
+    def delete(self, key):
+        self._cache.delete(key)
+
+    def stats(self):
+        return self._cache.stats()
+
+
+class SQLiteStore:
+    """
+    Key-value store in a local SQLite file, shared by every process on the host.
+    Values are stored as JSON; the least recently read rows are evicted
+    once max_entries is exceeded. Eviction runs every few writes rather
+    than on each one, so the table may briefly hold up to about 5% more.
+    """
+
+    def __init__(self, path, max_entries=1024, ttl_seconds=None, table="kv"):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.table = table
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._evict_every = max(1, max_entries // 20)
+        self._writes_since_evict = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_accessed_at ON {table} (accessed_at)"
+        )
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] < now):
+                if row is not None:
+                    self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl_seconds=None):
+        now = time.time()
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        expires_at = now + ttl if ttl else None
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, now),
+            )
+            self._writes_since_evict += 1
+            if self._writes_since_evict >= self._evict_every:
+                self._writes_since_evict = 0
+                self._evict()
+
+    def incr(self, key, amount=1):
+        """
+        Add amount to a numeric value (missing counts as 0) and return the result.
+        Runs in an immediate transaction, so it is atomic across processes.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"SELECT value FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+                value = (json.loads(row[0]) if row else 0) + amount
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), None, now),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return value
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def _evict(self):
+        """Delete the least recently read rows beyond max_entries (walks the accessed_at index)."""
+        overflow = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?)",
+                (overflow,),
+            )
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
+
+
+class RedisStore:
+    """
+    Key-value store on any Redis-compatible server (Redis, KeyDB, Valkey,
+    or an in-process fakeredis client for local runs).
+    Eviction is left to the server's maxmemory-policy (e.g. allkeys-lru).
+    """
+
+    def __init__(self, url=None, client=None, prefix="hia:", ttl_seconds=None):
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value, ttl_seconds=None):
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        self.client.set(self.prefix + key, json.dumps(value), ex=int(ttl) if ttl else None)
+
+    def incr(self, key, amount=1):
+        """Atomically add an integer amount (missing counts as 0) and return the result."""
+        return self.client.incrby(self.prefix + key, amount)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
+
+
+def create_store(backend, max_entries=256, ttl_seconds=None, sqlite_path=None, redis_url=None, namespace="kv"):
+    """
+    Build a key-value store for the configured backend.
+    Returns None when the backend is "none" or cannot be initialised, so
+    callers can treat caching as best-effort.
+    """
+    try:
+        if backend == "memory":
+            return MemoryStore(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        if backend == "sqlite":
+            return SQLiteStore(sqlite_path, max_entries=max_entries, ttl_seconds=ttl_seconds, table=namespace)
+        if backend == "redis":
+            return RedisStore(url=redis_url, prefix=f"hia:{namespace}:", ttl_seconds=ttl_seconds)
+        if backend != "none":
+            logger.warning(f"Unknown store backend: {backend}")
+    except Exception as e:
+        logger.error(f"Failed to initialize {backend} store: {str(e)}")
+    return None
@@ -0,0 +1,116 @@
+import math
+import re
+from collections import defaultdict
+from functools import lru_cache
+from utils.bm25 import tokenize
+from utils.lab_parser import ANALYTE_ALIASES, FLAG_HIGH, FLAG_LOW, parse_lab_report
+
+# Everyday names for panels, mapped to a word that appears in the panel header
+PANEL_ALIASES = {
+    "cbc": "blood count",
+    "blood count": "blood count",
+    "lipid": "lipid",
+    "lipids": "lipid",
+    "cholesterol panel": "lipid",
+    "liver": "liver",
+    "lft": "liver",
+    "kidney": "metabolic",
+    "renal": "metabolic",
+    "metabolic": "metabolic",
+    "bmp": "metabolic",
+    "cmp": "metabolic",
+    "electrolytes": "metabolic",
+    "thyroid": "thyroid",
+    "tft": "thyroid",
+}
+
+# Questions about "anything abnormal" resolve to the flagged rows
+_ABNORMAL_PATTERN = re.compile(r"\b(?:abnormal|out of range|high|low|elevated|flagged|concern)")
+
+# Too common in questions and analyte names to identify a row on their own
+_STOPWORDS = {
+    "a", "about", "an", "and", "any", "are", "blood", "count", "do", "does", "for",
+    "how", "i", "in", "is", "level", "levels", "mean", "my", "of", "result",
+    "results", "test", "the", "to", "total", "value", "what", "whats", "with",
+}
+
+
+class LabIndex:
+    """
+    Inverted index from analyte/panel words to parsed report rows.
+    Lookups are dictionary hits, so a question naming an analyte or a panel
+    resolves to the exact report lines without touching the embedding model.
+    """
+
+    def __init__(self, report_text):
+        self.table = parse_lab_report(report_text)
+        self.lines = report_text.splitlines()
+        self._postings = defaultdict(set)
+        self._panels = defaultdict(list)
+
+        for i, name in enumerate(self.table.search_names()):
+            for token in set(tokenize(name)) - _STOPWORDS:
+                self._postings[token].add(i)
+            self._panels[self.table.panels[i]].append(i)
+
+    def __len__(self):
+        return len(self.table)
+
+    def lookup(self, query):
+        """
+        Return the row indices a query refers to, in report order.
+        Analyte words are weighted by rarity, so "LDL cholesterol" picks the
+        LDL row rather than every cholesterol row; panel names pull in the
+        whole panel. Returns [] when the query names nothing in the report.
+        """
+        normalized = query.lower()
+        tokens = [token for token in tokenize(normalized) if token not in _STOPWORDS]
+        # Full analyte names also match their abbreviations ("white blood cells" -> wbc)
+        for name, alias in ANALYTE_ALIASES.items():
+            if name in normalized:
+                tokens.append(alias)
+
+        scores = defaultdict(float)
+        for token in tokens:
+            rows = self._postings.get(token)
+            if rows:
+                weight = math.log(1 + len(self.table) / len(rows))
+                for i in rows:
+                    scores[i] += weight
+
+        selected = set()
+        if scores:
+            best = max(scores.values())
+            selected = {i for i, score in scores.items() if score >= best * 0.75}
+
+        for alias, header_word in PANEL_ALIASES.items():
+            if re.search(rf"\b{re.escape(alias)}\b", normalized):
+                for panel, rows in self._panels.items():
+                    if header_word in panel.lower():
+                        selected.update(rows)
+
+        if not selected and _ABNORMAL_PATTERN.search(normalized):
+            selected = {
+                i for i, flag in enumerate(self.table.flags) if chr(flag) in (FLAG_LOW, FLAG_HIGH)
+            }
+
+        return sorted(selected)
+
+    def format_rows(self, rows):
+        """Render rows as their original report lines, grouped under panel headers."""
+        sections = []
+        current_panel = None
+        for i in rows:
+            panel = self.table.panels[i]
+            if panel != current_panel:
+                if panel:
+                    sections.append(panel)
+                current_panel = panel
+            sections.append(self.lines[self.table.line_numbers[i]].strip())
+        return "\n".join(sections)
+
+
+@lru_cache(maxsize=32)
+def build_lab_index(report_text):
+    """Return the LabIndex for a report (cached per distinct text)."""
+    return LabIndex(report_text or "")
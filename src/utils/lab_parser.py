@@ -0,0 +1,200 @@
+import math
+import re
+from array import array
+from collections import namedtuple
+from functools import lru_cache
+
+FLAG_NORMAL = "N"
+FLAG_LOW = "L"
+FLAG_HIGH = "H"
+FLAG_UNKNOWN = "?"
+
+LabRow = namedtuple("LabRow", ["panel", "analyte", "value", "unit", "ref_low", "ref_high", "flag"])
+
+# Common abbreviations so lookups like "wbc" match "White Blood Cells"
+ANALYTE_ALIASES = {
+    "white blood cells": "wbc",
+    "red blood cells": "rbc",
+    "platelets": "platelet",
+    "hemoglobin": "hb",
+    "hematocrit": "hct",
+    "alkaline phosphatase": "alp",
+    "blood urea nitrogen": "bun",
+}
+
+_UNSIGNED = r"\d[\d,]*(?:\.\d+)?"
+_NUMBER = rf"[-+]?{_UNSIGNED}"
+
+# "Hemoglobin: 13.5 g/dL (Reference: 12.0-15.5)" and "LDL Cholesterol 160 mg/dL H 0 - 100"
+_ROW_PATTERN = re.compile(
+    rf"""^\s*
+    (?P<analyte>[A-Za-z][A-Za-z0-9 .,/()'+-]*?)\s*[:\-]?\s+
+    (?P<value>{_NUMBER})\s*
+    (?P<unit>%|[^\s(\d][^\s(]*)?\s*
+    (?P<flag>\b(?:H|L|High|Low)\b)?\s*
+    (?:\(?\s*(?:Reference|Ref(?:\.|erence)?\s*Range|Normal|Range)?\s*:?\s*
+        (?P<range>(?:[<>]=?\s*{_NUMBER}|{_NUMBER}\s*(?:-|–|to)\s*{_NUMBER})\s*%?)\s*\)?
+    )?\s*$""",
+    re.VERBOSE | re.IGNORECASE,
+)
+_PANEL_PATTERN = re.compile(r"^[A-Z][A-Z &/()\-]{3,}$")
+
+
+class LabTable:
+    """
+    Parsed lab report rows stored column-wise.
+    Numeric columns are array-backed (missing values are NaN) and flags are
+    single ASCII bytes, so a report costs a handful of compact buffers rather
+    than one dict per row.
+    """
+
+    def __init__(self):
+        self.panels = []
+        self.analytes = []
+        self.units = []
+        self.values = array("d")
+        self.ref_low = array("d")
+        self.ref_high = array("d")
+        self.flags = bytearray()
+        self.line_numbers = array("I")  # source line of each row in the report text
+        self._index = {}
+
+    def append(self, panel, analyte, value, unit, ref_low, ref_high, flag, line_number=0):
+        self._index.setdefault(analyte.lower(), len(self.analytes))
+        self.line_numbers.append(line_number)
+        self.panels.append(panel)
+        self.analytes.append(analyte)
+        self.units.append(unit)
+        self.values.append(value)
+        self.ref_low.append(ref_low)
+        self.ref_high.append(ref_high)
+        self.flags.append(ord(flag))
+
+    def __len__(self):
+        return len(self.analytes)
+
+    def __iter__(self):
+        return (self.row(i) for i in range(len(self)))
+
+    def row(self, i):
+        """Return row i as a LabRow (NaN bounds become None)."""
+        return LabRow(
+            self.panels[i],
+            self.analytes[i],
+            self.values[i],
+            self.units[i],
+            None if math.isnan(self.ref_low[i]) else self.ref_low[i],
+            None if math.isnan(self.ref_high[i]) else self.ref_high[i],
+            chr(self.flags[i]),
+        )
+
+    def find(self, analyte):
+        """Return the first row whose analyte name or alias matches, or None."""
+        key = analyte.lower()
+        if key in self._index:
+            return self.row(self._index[key])
+        for i, name in enumerate(self.search_names()):
+            if key in name:
+                return self.row(i)
+        return None
+
+    def search_names(self):
+        """Lowercase analyte names with known abbreviations appended."""
+        names = []
+        for analyte in self.analytes:
+            name = analyte.lower()
+            alias = ANALYTE_ALIASES.get(name)
+            names.append(f"{name} {alias}" if alias else name)
+        return names
+
+    def mentions(self, term):
+        """Check whether any parsed analyte matches term (substring, case-insensitive)."""
+        term = term.lower()
+        return any(term in name for name in self.search_names())
+
+    def rows_with_flag(self, *flags):
+        codes = {ord(flag) for flag in flags}
+        return [self.row(i) for i, code in enumerate(self.flags) if code in codes]
+
+    def abnormal_rows(self):
+        return self.rows_with_flag(FLAG_LOW, FLAG_HIGH)
+
+    def in_range_rows(self):
+        return self.rows_with_flag(FLAG_NORMAL)
+
+
+def parse_lab_report(text):
+    """Parse report text into a LabTable (cached per distinct text)."""
+    return _parse_lab_report(text or "")
+
+
+@lru_cache(maxsize=32)
+def _parse_lab_report(text):
+    table = LabTable()
+    panel = ""
+
+    for line_number, line in enumerate(text.splitlines()):
+        line = line.strip()
+        if not line:
+            continue
+
+        if _PANEL_PATTERN.match(line):
+            panel = line
+            continue
+
+        match = _ROW_PATTERN.match(line)
+        if not match:
+            continue
+
+        unit = (match.group("unit") or "").strip()
+        range_text = match.group("range")
+        # Without a reference range, only accept units that contain a letter
+        # or %, so lines like "Date: 15/03/2024" are not read as analytes.
+        if not range_text and not re.search(r"[A-Za-zµ%]", unit):
+            continue
+
+        value = _to_float(match.group("value"))
+        ref_low, ref_high, exclusive = _parse_range(range_text)
+        flag = _flag(value, ref_low, ref_high, match.group("flag"), exclusive)
+        table.append(
+            panel, match.group("analyte").strip(), value, unit, ref_low, ref_high, flag, line_number
+        )
+
+    return table
+
+
+def _to_float(text):
+    return float(text.replace(",", ""))
+
+
+def _parse_range(range_text):
+    """
+    Return (low, high, exclusive) bounds; NaN marks an open side.
+    exclusive is True for strict "<100" / ">40" limits, whose bound itself
+    is out of range.
+    """
+    if not range_text:
+        return math.nan, math.nan, False
+
+    range_text = range_text.replace("%", "").strip()
+    numbers = [_to_float(n) for n in re.findall(_UNSIGNED, range_text)]
+    exclusive = range_text[:1] in "<>" and range_text[1:2] != "="
+    if range_text.startswith("<"):
+        return math.nan, numbers[0], exclusive
+    if range_text.startswith(">"):
+        return numbers[0], math.nan, exclusive
+    return numbers[0], numbers[-1], False
+
+
+def _flag(value, ref_low, ref_high, explicit_flag, exclusive=False):
+    """Flag a value against its range; an explicit H/L on the line wins."""
+    if explicit_flag:
+        return FLAG_HIGH if explicit_flag[0].upper() == "H" else FLAG_LOW
+    if math.isnan(ref_low) and math.isnan(ref_high):
+        return FLAG_UNKNOWN
+    # "12.0-15.5" and "<=100" include their bounds; "<100" and ">40" do not
+    if not math.isnan(ref_low) and (value <= ref_low if exclusive else value < ref_low):
+        return FLAG_LOW
+    if not math.isnan(ref_high) and (value >= ref_high if exclusive else value > ref_high):
+        return FLAG_HIGH
+    return FLAG_NORMAL
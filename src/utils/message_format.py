@@ -0,0 +1,16 @@
+def parse_report_metadata(content):
+    """Return the report text from a legacy __REPORT_TEXT__ system message, or "" if absent."""
+    start_idx = content.find("__REPORT_TEXT__\n")
+    end_idx = content.find("\n__END_REPORT_TEXT__")
+    if start_idx == -1 or end_idx == -1:
+        return ""
+    start_idx += len("__REPORT_TEXT__\n")
+    return content[start_idx:end_idx] if end_idx >= start_idx else ""
+
+
+def format_analysis_message(content, model_used=None):
+    """Append the model attribution shown under each analysis."""
+    if model_used:
+        content += f"\n\n*Analysis generated using {model_used}*"
+    return content
+
@@ -1,32 +1,265 @@
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import pdfplumber
 import streamlit as st
-from config.app_config import MAX_PDF_PAGES
-from utils.validators import validate_pdf_file, validate_pdf_content
+from config.app_config import (
+    MAX_PDF_PAGES,
+    PDF_CACHE_MAX_ENTRIES,
+    PDF_CACHE_DIR,
+    PDF_EXTRACTION_MODE,
+    PDF_EXTRACTION_WORKERS,
+    PDF_PARALLEL_MIN_PAGES,
+    PDF_VALIDATION_REJECT_PAGES,
+)
+from utils.cache import LRUCache
+from utils.validators import validate_pdf_file, MedicalContentScorer
 
-def extract_text_from_pdf(pdf_file):
-    """Extract and validate text from PDF file."""
+logger = logging.getLogger(__name__)
+
+# Process-wide cache so re-uploads of the same PDF skip pdfplumber entirely,
+# across reruns, sessions and users.
+_memory_cache = LRUCache(max_entries=PDF_CACHE_MAX_ENTRIES)
+_disk_stats = {"hits": 0, "misses": 0, "writes": 0}
+
+# Lazily created and reused; spawning worker processes per upload would cost
+# more than the extraction itself.
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+SCANNED_PAGE_ERROR = "Could not extract text from PDF. Please ensure it's not a scanned document."
+
+
+def extract_text_from_pdf(pdf_file, mode=None):
+    """
+    Extract and validate text from PDF file.
+
+    Args:
+        pdf_file: Uploaded file-like object
+        mode: "serial" or "parallel"; defaults to PDF_EXTRACTION_MODE
+    """
     try:
         # Validate file first
         is_valid, error = validate_pdf_file(pdf_file)
         if not is_valid:
             return error
 
-        text = ""
-        with pdfplumber.open(pdf_file) as pdf:
-            if len(pdf.pages) > MAX_PDF_PAGES:
-                return f"PDF exceeds maximum page limit of {MAX_PDF_PAGES}"
-                
-            for page in pdf.pages:
-                extracted = page.extract_text()
-                if not extracted:
-                    return "Could not extract text from PDF. Please ensure it's not a scanned document."
-                text += extracted + "\n"
-        
-        # Validate extracted content
-        is_valid, error = validate_pdf_content(text)
-        if not is_valid:
-            return error
-            
-        return text
+        _, result = extract_pdf_bytes(_read_bytes(pdf_file), mode)
+        return result
     except Exception as e:
         return f"Error extracting text from PDF: {str(e)}"
+
+
+def extract_pdf_bytes(pdf_bytes, mode=None):
+    """
+    Extract and validate text from raw PDF bytes.
+
+    Returns:
+        (True, text) on success, or (False, error_message)
+    """
+    cache_key = hashlib.sha256(pdf_bytes).hexdigest()
+
+    cached = _get_cached(cache_key)
+    if cached is not None:
+        return cached
+
+    result = _extract_and_validate(pdf_bytes, mode or PDF_EXTRACTION_MODE)
+    _set_cached(cache_key, result)
+    return result
+
+
+def get_pdf_cache_stats():
+    """Return hit/miss counters for the memory and disk cache tiers."""
+    return {
+        "memory": _memory_cache.stats(),
+        "disk": dict(_disk_stats, enabled=bool(PDF_CACHE_DIR)),
+    }
+
+
+def clear_pdf_cache():
+    """Drop the in-memory tier (the disk tier is left untouched)."""
+    _memory_cache.clear()
+
+
+def iter_pdf_pages(pdf, start=0):
+    """Yield page texts one at a time so callers can stop reading early."""
+    for page in pdf.pages[start:]:
+        yield page.extract_text() or ""
+
+
+def _extract_and_validate(pdf_bytes, mode):
+    """
+    Run pdfplumber over the document and validate the extracted text.
+    Pages are scored as they stream in; once the document is accepted the
+    remaining pages go to the process pool in parallel mode. Rejection
+    needs the whole document unless PDF_VALIDATION_REJECT_PAGES opts in
+    to rejecting early.
+
+    Returns:
+        (True, text) on success, or (False, error_message)
+    """
+    scorer = MedicalContentScorer(reject_after_pages=PDF_VALIDATION_REJECT_PAGES)
+    page_texts = []
+
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        page_count = len(pdf.pages)
+        if page_count > MAX_PDF_PAGES:
+            return False, f"PDF exceeds maximum page limit of {MAX_PDF_PAGES}"
+
+        pages = iter_pdf_pages(pdf)
+        for extracted in pages:
+            if not extracted:
+                return False, SCANNED_PAGE_ERROR
+            page_texts.append(extracted)
+
+            verdict = scorer.feed(extracted)
+            if verdict == MedicalContentScorer.REJECT:
+                return scorer.result()
+            if verdict == MedicalContentScorer.ACCEPT:
+                break
+
+        # Validate extracted content
+        is_valid, error = scorer.result()
+        if not is_valid:
+            return False, error
+
+        remaining = page_count - len(page_texts)
+        use_pool = (
+            mode == "parallel"
+            and PDF_EXTRACTION_WORKERS > 1
+            and remaining >= PDF_PARALLEL_MIN_PAGES
+        )
+        if not use_pool:
+            for extracted in pages:
+                if not extracted:
+                    return False, SCANNED_PAGE_ERROR
+                page_texts.append(extracted)
+
+    if use_pool:
+        rest = extract_pages_parallel(pdf_bytes, len(page_texts), page_count)
+        if not all(rest):
+            return False, SCANNED_PAGE_ERROR
+        page_texts.extend(rest)
+
+    # Join once instead of growing the string page by page
+    return True, "\n".join(page_texts) + "\n"
+
+
+def extract_pages_parallel(pdf_bytes, start, end, workers=None):
+    """
+    Extract the texts of pages [start, end) across a process pool.
+    Pages are split into contiguous ranges, one task per range, and the
+    results are put back in page order. If the pool breaks (e.g. a worker
+    was killed for running out of memory), it is discarded so the next
+    call gets a fresh one, and this call falls back to serial extraction.
+    """
+    workers = workers or PDF_EXTRACTION_WORKERS
+    page_count = end - start
+    chunk_size = max(1, -(-page_count // workers))
+    ranges = [
+        (chunk_start, min(chunk_start + chunk_size, end))
+        for chunk_start in range(start, end, chunk_size)
+    ]
+
+    pool = _get_process_pool()
+    try:
+        futures = [pool.submit(_extract_page_range, pdf_bytes, s, e) for s, e in ranges]
+
+        page_texts = []
+        for future in futures:
+            page_texts.extend(future.result())
+        return page_texts
+    except BrokenProcessPool as e:
+        logger.warning(f"PDF extraction pool broke ({e}); falling back to serial extraction")
+        _discard_process_pool(pool)
+        return _extract_page_range(pdf_bytes, start, end)
+
+
+def _extract_page_range(pdf_bytes, start, end):
+    """Worker entry point: extract pages [start, end) from the raw PDF bytes."""
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        return [pdf.pages[i].extract_text() for i in range(start, end)]
+
+
+def _get_process_pool():
+    """Return the shared extraction process pool, creating it on first use."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            # The app process runs several threads (event loop, embedding
+            # batcher, message writer), so workers must not be forked from it
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _process_pool = ProcessPoolExecutor(
+                max_workers=PDF_EXTRACTION_WORKERS, mp_context=multiprocessing.get_context(method)
+            )
+        return _process_pool
+
+
+def _discard_process_pool(pool):
+    """Drop a broken pool so the next call creates a new one."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _read_bytes(pdf_file):
+    """Read the raw bytes of an uploaded file without consuming it."""
+    if hasattr(pdf_file, "getvalue"):
+        return pdf_file.getvalue()
+
+    position = pdf_file.tell()
+    pdf_file.seek(0)
+    data = pdf_file.read()
+    pdf_file.seek(position)
+    return data
+
+
+def _get_cached(cache_key):
+    """Look up an extraction result in memory first, then on disk."""
+    result = _memory_cache.get(cache_key)
+    if result is not None:
+        return result
+
+    if not PDF_CACHE_DIR:
+        return None
+
+    path = os.path.join(PDF_CACHE_DIR, f"{cache_key}.txt")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            result = (True, f.read())
+    except OSError:
+        _disk_stats["misses"] += 1
+        return None
+
+    _disk_stats["hits"] += 1
+    # Promote to the memory tier for subsequent reruns
+    _memory_cache.set(cache_key, result)
+    return result
+
+
+def _set_cached(cache_key, result):
+    """Store an extraction result in memory and, if enabled, on disk (successful ones only)."""
+    _memory_cache.set(cache_key, result)
+
+    success, text = result
+    if not success or not PDF_CACHE_DIR:
+        return
+
+    try:
+        os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+        # Write atomically so concurrent sessions never read a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=PDF_CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, os.path.join(PDF_CACHE_DIR, f"{cache_key}.txt"))
+        _disk_stats["writes"] += 1
+    except OSError as e:
+        logger.warning(f"Failed to write PDF cache entry: {str(e)}")
@@ -0,0 +1,121 @@
+import logging
+import threading
+from config.app_config import (
+    STATE_STORE_BACKEND,
+    STATE_STORE_MAX_ENTRIES,
+    STATE_STORE_REDIS_URL,
+    STATE_STORE_SQLITE_PATH,
+)
+from utils.kv_store import MemoryStore, create_store
+
+logger = logging.getLogger(__name__)
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class MappingStateStore:
+    """
+    State store over a plain mapping: a dict, or st.session_state.
+    Counters are only atomic within the process.
+    """
+
+    def __init__(self, mapping=None):
+        self.mapping = {} if mapping is None else mapping
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        return self.mapping.get(key, default)
+
+    def set(self, key, value):
+        self.mapping[key] = value
+
+    def setdefault(self, key, value):
+        if key not in self.mapping:
+            self.mapping[key] = value
+
+    def incr(self, key, amount=1):
+        with self._lock:
+            value = self.mapping.get(key, 0) + amount
+            self.mapping[key] = value
+        return value
+
+
+class KVStateStore:
+    """
+    State store over a kv_store backend (memory, SQLite or Redis-compatible),
+    with every key prefixed by a namespace such as a user id.
+    Values must be JSON-serializable; counters go through the backend's
+    atomic incr, so replicas sharing a backend share rate-limit counts.
+    Other values are read-modify-write, and the last writer wins.
+
+    If the backend fails (e.g. Redis is down), operations fall back to a
+    local store (the session state, when given) until it recovers.
+    """
+
+    def __init__(self, backend, namespace, fallback=None):
+        self.backend = backend
+        self.namespace = namespace
+        self.fallback = as_state_store({} if fallback is None else fallback)
+        self._degraded = False
+
+    def get(self, key, default=None):
+        value = self._call("get", self.fallback.get, key)
+        return default if value is None else value
+
+    def set(self, key, value):
+        self._call("set", self.fallback.set, key, value)
+
+    def setdefault(self, key, value):
+        if self.get(key) is None:
+            self.set(key, value)
+
+    def incr(self, key, amount=1):
+        return self._call("incr", self.fallback.incr, key, amount)
+
+    def _call(self, method, fallback, key, *args):
+        try:
+            result = getattr(self.backend, method)(self._key(key), *args)
+        except Exception as e:
+            if not self._degraded:
+                logger.warning(f"State store backend failed ({e}); using local state")
+                self._degraded = True
+            return fallback(key, *args)
+
+        if self._degraded:
+            logger.info("State store backend recovered")
+            self._degraded = False
+        return result
+
+    def _key(self, key):
+        return f"{self.namespace}:{key}"
+
+
+def as_state_store(state):
+    """Wrap a plain mapping (dict, st.session_state) as a state store; stores pass through."""
+    if hasattr(state, "incr"):
+        return state
+    return MappingStateStore(state)
+
+
+def create_state_store(namespace, backend=STATE_STORE_BACKEND, fallback=None):
+    """
+    Return the shared state store for a namespace (e.g. a user id), or None
+    when the backend is "session" (state stays in the Streamlit session).
+    Falls back to process memory if the backend cannot be initialised, and
+    to fallback (a mapping) for calls made while the backend is failing.
+    """
+    if backend == "session":
+        return None
+
+    with _stores_lock:
+        if backend not in _stores:
+            _stores[backend] = create_store(
+                backend,
+                max_entries=STATE_STORE_MAX_ENTRIES,
+                sqlite_path=STATE_STORE_SQLITE_PATH,
+                redis_url=STATE_STORE_REDIS_URL,
+                namespace="state",
+            ) or MemoryStore(max_entries=STATE_STORE_MAX_ENTRIES)
+        kv = _stores[backend]
+    return KVStateStore(kv, namespace, fallback)
@@ -53,22 +53,66 @@ def validate_pdf_file(file):
 
 def validate_pdf_content(text):
     """Validate if the PDF content appears to be a medical report."""
+    scorer = MedicalContentScorer()
+    scorer.feed(text)
+    return scorer.result()
+
+class MedicalContentScorer:
+    """
+    Incremental medical-report scorer over a stream of page texts.
+    feed() returns ACCEPT or REJECT as soon as the outcome is clear, so the
+    caller can stop reading pages; result() gives the final verdict.
+    """
+
+    ACCEPT = "accept"
+    REJECT = "reject"
+
     # Common medical report indicators
-    medical_terms = [
+    MEDICAL_TERMS = [
         'blood', 'test', 'report', 'laboratory', 'lab', 'patient', 'specimen',
         'reference range', 'analysis', 'results', 'medical', 'diagnostic',
         'hemoglobin', 'wbc', 'rbc', 'platelet', 'glucose', 'creatinine'
     ]
-    
-    # Validate minimum text length
-    if len(text.strip()) < 50:
-        return False, "Extracted text is too short. Please ensure the PDF contains valid text."
-    
-    # Check for medical terms
-    text_lower = text.lower()
-    term_matches = sum(1 for term in medical_terms if term in text_lower)
-    
-    if term_matches < 3:
-        return False, "The uploaded file doesn't appear to be a medical report. Please upload a valid medical report."
-    
-    return True, None
\ No newline at end of file
+    MIN_TEXT_LENGTH = 50
+    MIN_TERM_MATCHES = 3
+
+    def __init__(self, reject_after_pages=None):
+        self.reject_after_pages = reject_after_pages
+        self.pages_seen = 0
+        self.text_length = 0
+        self.matched_terms = set()
+        self._pending_terms = set(self.MEDICAL_TERMS)
+
+    def feed(self, page_text):
+        """Score one more page; return ACCEPT, REJECT or None if undecided."""
+        self.pages_seen += 1
+        self.text_length += len(page_text.strip())
+
+        page_lower = page_text.lower()
+        found = {term for term in self._pending_terms if term in page_lower}
+        self.matched_terms |= found
+        self._pending_terms -= found
+
+        if self.is_accepted():
+            return self.ACCEPT
+        if self.reject_after_pages and self.pages_seen >= self.reject_after_pages:
+            return self.REJECT
+        return None
+
+    def is_accepted(self):
+        return (
+            self.text_length >= self.MIN_TEXT_LENGTH
+            and len(self.matched_terms) >= self.MIN_TERM_MATCHES
+        )
+
+    def result(self):
+        """Return (is_valid, error) for the pages seen so far."""
+        # Validate minimum text length
+        if self.text_length < self.MIN_TEXT_LENGTH:
+            return False, "Extracted text is too short. Please ensure the PDF contains valid text."
+
+        # Check for medical terms
+        if len(self.matched_terms) < self.MIN_TERM_MATCHES:
+            return False, "The uploaded file doesn't appear to be a medical report. Please upload a valid medical report."
+
+        return True, None
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from config.app_config import (
+    VECTOR_STORE_CACHE_DIR,
+    VECTOR_STORE_DISK_MAX_AGE_SECONDS,
+    VECTOR_STORE_DISK_MAX_BYTES,
+    VECTOR_STORE_MEMORY_ENTRIES,
+)
+from utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Process-wide, so every session reopening the same report shares one index
+_memory_cache = LRUCache(max_entries=VECTOR_STORE_MEMORY_ENTRIES)
+_disk_stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+
+def content_hash(text):
+    """Return the hex sha256 of a report text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def vector_store_key(text, model_name, chunk_size, chunk_overlap):
+    """
+    Key a vector store by everything that determines its contents: the
+    report text, the embedding model and the chunking parameters.
+    """
+    return content_hash(f"{model_name}\n{chunk_size}\n{chunk_overlap}\n{text}")
+
+
+def load_vector_store(key, embeddings):
+    """
+    Return a cached FAISS store, or None.
+    Disk entries are an index file, memory-mapped rather than read into
+    memory, next to a JSON file holding the chunk texts. A hit refreshes
+    the entry's mtime, which eviction uses as its last-read time.
+    """
+    store = _memory_cache.get(key)
+    if store is not None:
+        return store
+
+    if not VECTOR_STORE_CACHE_DIR:
+        return None
+
+    # Imported here so content_hash stays cheap to import at app startup
+    import faiss
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.documents import Document
+
+    index_path, chunks_path = _entry_paths(key)
+    try:
+        with open(chunks_path, "r", encoding="utf-8") as f:
+            chunks = json.load(f)
+        index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP)
+    except (OSError, ValueError, RuntimeError):
+        _disk_stats["misses"] += 1
+        return None
+
+    if index.ntotal != len(chunks):
+        logger.warning(f"Discarding inconsistent vector store cache entry {key}")
+        _disk_stats["misses"] += 1
+        return None
+
+    try:
+        os.utime(chunks_path)
+    except OSError:
+        pass
+
+    ids = [str(i) for i in range(len(chunks))]
+    store = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore(
+            {doc_id: Document(page_content=chunk) for doc_id, chunk in zip(ids, chunks)}
+        ),
+        index_to_docstore_id=dict(enumerate(ids)),
+    )
+    _disk_stats["hits"] += 1
+    _memory_cache.set(key, store)
+    return store
+
+
+def save_vector_store(key, store):
+    """Store a FAISS store in memory and, if enabled, on disk (then prune the disk tier)."""
+    _memory_cache.set(key, store)
+
+    if not VECTOR_STORE_CACHE_DIR:
+        return
+
+    import faiss
+
+    chunks = [
+        store.docstore.search(store.index_to_docstore_id[i]).page_content
+        for i in range(store.index.ntotal)
+    ]
+    index_path, chunks_path = _entry_paths(key)
+    try:
+        os.makedirs(VECTOR_STORE_CACHE_DIR, exist_ok=True)
+        # Write both files atomically; the chunks file goes last, so a
+        # reader never sees it without its index
+        fd, tmp_path = tempfile.mkstemp(dir=VECTOR_STORE_CACHE_DIR, suffix=".tmp")
+        os.close(fd)
+        faiss.write_index(store.index, tmp_path)
+        os.replace(tmp_path, index_path)
+
+        fd, tmp_path = tempfile.mkstemp(dir=VECTOR_STORE_CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(chunks, f)
+        os.replace(tmp_path, chunks_path)
+        _disk_stats["writes"] += 1
+    except (OSError, RuntimeError) as e:
+        logger.warning(f"Failed to write vector store cache entry: {str(e)}")
+
+    prune_disk_cache()
+
+
+def prune_disk_cache(max_bytes=VECTOR_STORE_DISK_MAX_BYTES, max_age_seconds=VECTOR_STORE_DISK_MAX_AGE_SECONDS):
+    """
+    Delete disk entries not read within max_age_seconds, then the least
+    recently read ones until the tier fits in max_bytes.
+    """
+    if not VECTOR_STORE_CACHE_DIR:
+        return
+
+    entries = {}  # key -> [last read, bytes, paths]
+    try:
+        names = os.listdir(VECTOR_STORE_CACHE_DIR)
+    except OSError:
+        return
+    for name in names:
+        key, ext = os.path.splitext(name)
+        if ext not in (".faiss", ".json", ".tmp"):
+            continue
+        path = os.path.join(VECTOR_STORE_CACHE_DIR, name)
+        try:
+            info = os.stat(path)
+        except OSError:
+            continue
+        entry = entries.setdefault(key, [0.0, 0, []])
+        entry[0] = max(entry[0], info.st_mtime)
+        entry[1] += info.st_size
+        entry[2].append(path)
+
+    now = time.time()
+    total = sum(size for _, size, _ in entries.values())
+    for last_read, size, paths in sorted(entries.values(), key=lambda entry: entry[0]):
+        if now - last_read <= max_age_seconds and total <= max_bytes:
+            break
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        total -= size
+        _disk_stats["evictions"] += 1
+
+
+def get_vector_store_cache_stats():
+    """Return hit/miss counters for the memory and disk cache tiers."""
+    return {
+        "memory": _memory_cache.stats(),
+        "disk": dict(_disk_stats, enabled=bool(VECTOR_STORE_CACHE_DIR)),
+    }
+
+
+def _entry_paths(key):
+    base = os.path.join(VECTOR_STORE_CACHE_DIR, key)
+    return f"{base}.faiss", f"{base}.json"
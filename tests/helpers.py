@@ -0,0 +1,155 @@
+from types import SimpleNamespace
+
+
+def build_pdf(pages):
+    """Build a minimal text PDF; pages is a list of line lists, one per page."""
+    objects = [None, None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+
+    for lines in pages:
+        stream = ["BT", "/F1 9 Tf", "11 TL", "40 800 Td"]
+        for line in lines:
+            safe = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            stream.append(f"({safe}) '")
+        stream.append("ET")
+        content = "\n".join(stream).encode("latin-1")
+
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        page_ids.append(len(objects))
+
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(pages)
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for index, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % index + body + b"\nendobj\n"
+
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    return bytes(output)
+
+
+FILLER_PAGE = ["Lorem ipsum dolor sit amet, consectetur adipiscing elit."] * 5
+LAB_PAGE = [
+    "LABORATORY TEST REPORT",
+    "Patient: Jane Doe",
+    "Hemoglobin: 13.5 g/dL (Reference: 12.0-15.5)",
+    "Glucose: 92 mg/dL (Reference: 70-99)",
+]
+
+
+LAB_REPORT = """City Diagnostics Laboratory
+Date: 15/03/2024
+COMPLETE BLOOD COUNT
+Hemoglobin: 11.2 g/dL (Reference: 12.0-15.5)
+White Blood Cells 7,200 /uL 4,000 - 11,000
+Platelets 250 K/uL 150-400
+LIPID PANEL
+Total Cholesterol 210 mg/dL H <200
+LDL Cholesterol 160 mg/dL H 0 - 100
+HDL Cholesterol 55 mg/dL >40
+Vitamin D 32 ng/mL
+Page 1 of 1
+"""
+
+
+class FakeQuery:
+    """One Supabase query builder call chain against FakeSupabase's in-memory tables."""
+
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.filters = []
+        self.ordering = None
+        self.count = None
+        self.single_row = False
+        self.payload = None
+        self.data = None
+
+    def select(self, columns="*"):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def neq(self, column, value):
+        self.filters.append(lambda row: row.get(column) != value)
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda row: row[column] > value)
+        return self
+
+    def lt(self, column, value):
+        self.filters.append(lambda row: row[column] < value)
+        return self
+
+    def order(self, column, desc=False):
+        self.ordering = (column, desc)
+        return self
+
+    def limit(self, count):
+        self.count = count
+        return self
+
+    def single(self):
+        self.single_row = True
+        return self
+
+    def insert(self, row):
+        self.payload = row
+        return self
+
+    upsert = insert
+
+    def execute(self):
+        self.db.calls.append(self.table)
+        rows = self.db.tables.setdefault(self.table, [])
+        if self.payload is not None:
+            rows.append(self.payload)
+            self.data = [self.payload]
+            return self
+
+        rows = [row for row in rows if all(match(row) for match in self.filters)]
+        if self.ordering:
+            column, desc = self.ordering
+            rows.sort(key=lambda row: row[column], reverse=desc)
+        if self.count is not None:
+            rows = rows[:self.count]
+        self.data = rows[0] if self.single_row else rows
+        return self
+
+
+class FakeSupabase:
+    """
+    In-memory stand-in for the Supabase client.
+    calls lists the table of every executed query, plus "get_user" for auth checks.
+    """
+
+    def __init__(self, tables=None, user_id=None, access_token=None):
+        self.tables = {name: list(rows) for name, rows in (tables or {}).items()}
+        self.calls = []
+        self.user_id = user_id
+        self.access_token = access_token
+        self.auth = SimpleNamespace(get_user=self._get_user, get_session=self._get_session)
+
+    def _get_user(self):
+        self.calls.append("get_user")
+        return SimpleNamespace(user=SimpleNamespace(id=self.user_id))
+
+    def _get_session(self):
+        return SimpleNamespace(access_token=self.access_token)
+
+    def table(self, name):
+        return FakeQuery(self, name)
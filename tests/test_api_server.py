@@ -0,0 +1,62 @@
+import pytest
+from starlette.testclient import TestClient
+from api import server
+from services import ai_service
+
+
+@pytest.fixture
+def client(monkeypatch):
+    calls = []
+
+    def get_chat_response(query, context, chat_history, state=None, lock=None):
+        calls.append(state)
+        if context == "broken":
+            return False, "Error: chat unavailable"
+        state.setdefault("chat_agent", object())
+        return True, f"answer to {query}"
+
+    monkeypatch.setattr(ai_service, "init_analysis_state", lambda state: calls.append("init"))
+    monkeypatch.setattr(ai_service, "get_chat_response", get_chat_response)
+    server._chat_states.clear()
+    with TestClient(server.app) as client:
+        client.calls = calls
+        yield client
+
+
+def test_analysis_agent_is_built_at_startup(client):
+    assert client.calls == ["init"]
+
+
+def test_chat_state_is_reused_per_report(client):
+    for query in ("a", "b"):
+        response = client.post("/v1/chat", json={"query": query, "context": "report one"})
+        assert response.json() == {"answer": f"answer to {query}"}
+    client.post("/v1/chat", json={"query": "c", "context": "report two"})
+
+    first, second, other = client.calls[1:]
+    assert first is second
+    assert other is not first
+
+
+def test_chat_errors_are_not_cached(client):
+    response = client.post("/v1/chat", json={"query": "q", "context": "broken"})
+    assert response.status_code == 502
+    assert response.json() == {"success": False, "error": "Error: chat unavailable"}
+    assert len(server._chat_states) == 0
+
+
+def test_chat_validates_the_request(client):
+    assert client.post("/v1/chat", json={"query": ""}).status_code == 400
+    assert client.post("/v1/chat", content=b"not json").status_code == 400
+
+
+def test_empty_context_is_keyed_by_the_analysis_in_the_history(client):
+    def history(analysis):
+        return [{"role": "assistant", "content": analysis * 50}]
+
+    for analysis in ("first report. ", "second report. ", "first report. "):
+        client.post("/v1/chat", json={"query": "q", "chat_history": history(analysis)})
+
+    first, second, first_again = client.calls[1:]
+    assert first is first_again
+    assert second is not first
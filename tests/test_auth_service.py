@@ -0,0 +1,66 @@
+import time
+from types import SimpleNamespace
+from helpers import FakeSupabase
+from auth.auth_service import AuthService
+from utils.cache import LRUCache
+
+
+class FakeVerifier:
+    def __init__(self, claims):
+        self.claims = claims
+
+    def verify(self, token):
+        return self.claims
+
+
+def make_service(claims, user_row):
+    service = AuthService.__new__(AuthService)
+    service.supabase = FakeSupabase({"users": [user_row]}, user_id=user_row["id"])
+    service._token_verifier = FakeVerifier(claims)
+    service._last_remote_check = time.time()
+    service._read_caches = {"token": LRUCache(8), "user": LRUCache(8)}
+    service._rerun_stats = service._empty_stats()
+    service.last_rerun_stats = service._empty_stats()
+    service.total_stats = service._empty_stats()
+    return service
+
+
+def test_locally_verified_token_counts_one_read():
+    row = {"id": "u1", "name": "Ada"}
+    service = make_service({"sub": "u1", "exp": time.time() + 3600}, row)
+
+    assert service._session_user_data("token") == row
+    assert service._session_user_data("token") == row
+
+    assert service.supabase.calls == ["users"]
+    assert service.total_stats == {"hits": 1, "misses": 1, "round_trips_saved": 2}
+
+
+def test_token_near_expiry_is_checked_remotely():
+    row = {"id": "u1"}
+    service = make_service({"sub": "u1", "exp": time.time() + 5}, row)
+
+    assert service._session_user_data("token") == row
+    assert service.supabase.calls == ["get_user", "users"]
+
+
+def test_rejected_token_makes_no_calls():
+    service = make_service(False, {"id": "u1"})
+    assert service._session_user_data("token") is None
+    assert service.supabase.calls == []
+
+
+def test_async_client_uses_the_current_session_token():
+    from utils.async_runner import run_sync
+
+    tokens = []
+    service = make_service(None, {"id": "u1"})
+    service.access_token = "expired"
+    service._async_lock = None
+    service._async_supabase = SimpleNamespace(postgrest=SimpleNamespace(auth=tokens.append))
+    service.supabase.access_token = "refreshed"
+
+    run_sync(service._get_async_client())
+
+    assert tokens == ["refreshed"]
+    assert service.access_token == "refreshed"
@@ -0,0 +1,84 @@
+import json
+from services.batch_service import analyze_batch
+
+
+class FakeModelManager:
+    def __init__(self):
+        self.calls = 0
+
+    def generate_analysis(self, data, prompt):
+        self.calls += 1
+        return {"success": True, "content": f"analysis of {data['report']}", "model_used": "fake"}
+
+
+class FakeAgent:
+    def __init__(self):
+        self.model_manager = FakeModelManager()
+
+    def check_rate_limit(self):
+        return True, None
+
+    def prepare_request(self, data, system_prompt):
+        return {"data": data, "prompt": system_prompt}
+
+    def record_result(self, request, result):
+        pass
+
+
+ITEMS = [{"id": name, "report": f"report {name}"} for name in ("a", "b", "c")]
+
+
+def read_records(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_batch_writes_one_record_per_item(tmp_path):
+    output = tmp_path / "results.jsonl"
+    summary = analyze_batch(ITEMS, str(output), system_prompt="prompt", agent=FakeAgent())
+
+    assert (summary["total"], summary["succeeded"], summary["failed"]) == (3, 3, 0)
+    assert sorted(record["id"] for record in read_records(output)) == ["a", "b", "c"]
+
+
+def test_resume_after_a_torn_last_line(tmp_path):
+    output = tmp_path / "results.jsonl"
+    finished = json.dumps({"id": "a", "success": True})
+    output.write_text(finished + '\n{"id": "b", "succ', encoding="utf-8")
+
+    agent = FakeAgent()
+    summary = analyze_batch(ITEMS, str(output), system_prompt="prompt", agent=agent)
+
+    assert summary["skipped"] == 1 and agent.model_manager.calls == 2
+    records = read_records(output)
+    assert [record["id"] for record in records][0] == "a"
+    assert sorted(record["id"] for record in records[1:]) == ["b", "c"]
+
+    # A second resume finds every item done
+    agent = FakeAgent()
+    assert analyze_batch(ITEMS, str(output), system_prompt="prompt", agent=agent)["skipped"] == 3
+    assert agent.model_manager.calls == 0
+
+
+def test_record_missing_only_its_newline_is_rerun(tmp_path):
+    output = tmp_path / "results.jsonl"
+    output.write_text(json.dumps({"id": "a", "success": True}), encoding="utf-8")
+
+    agent = FakeAgent()
+    analyze_batch(ITEMS[:1], str(output), system_prompt="prompt", agent=agent)
+
+    assert agent.model_manager.calls == 1
+    assert [record["id"] for record in read_records(output)] == ["a"]
+
+
+def test_retry_failed_reruns_only_failures(tmp_path):
+    output = tmp_path / "results.jsonl"
+    output.write_text(
+        json.dumps({"id": "a", "success": True}) + "\n" + json.dumps({"id": "b", "success": False}) + "\n",
+        encoding="utf-8",
+    )
+
+    agent = FakeAgent()
+    summary = analyze_batch(ITEMS[:2], str(output), system_prompt="prompt", retry_failed=True, agent=agent)
+
+    assert summary["skipped"] == 1 and agent.model_manager.calls == 1
@@ -0,0 +1,39 @@
+import pytest
+from agents.chat_agent import ChatAgent
+
+HISTORY = [
+    {"role": "user", "content": "Is my LDL cholesterol high?"},
+    {"role": "assistant", "content": "Your LDL of 160 mg/dL is above the 100 mg/dL target."},
+]
+
+
+@pytest.fixture
+def agent():
+    # needs_contextualization uses no client or embeddings
+    return ChatAgent.__new__(ChatAgent)
+
+
+@pytest.mark.parametrize("query", [
+    "Why is a high LDL cholesterol level dangerous for the heart?",
+    "Tell me more about how triglycerides are measured in blood tests",
+    "Should I fast before the next lipid panel is drawn?",
+    "Which other foods help lower cholesterol naturally?",
+    "Can you explain the thyroid results again in simple terms?",
+])
+def test_self_contained_questions_are_used_as_is(agent, query):
+    assert not agent.needs_contextualization(query, HISTORY)
+
+
+@pytest.mark.parametrize("query", [
+    "Is it something I should worry about?",
+    "What about my HDL?",
+    "and the triglycerides?",
+    "Why?",
+    "How do I bring those numbers down?",
+])
+def test_follow_ups_are_rewritten(agent, query):
+    assert agent.needs_contextualization(query, HISTORY)
+
+
+def test_first_question_is_never_rewritten(agent):
+    assert not agent.needs_contextualization("Is it normal?", [])
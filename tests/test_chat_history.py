@@ -0,0 +1,68 @@
+from helpers import FakeSupabase
+from services.chat_history import ChatHistory
+
+
+def add_messages(db, *contents, session_id="s1"):
+    rows = db.tables.setdefault("chat_messages", [])
+    for content in contents:
+        seq = len(rows) + 1
+        rows.append({"id": f"m{seq}", "session_id": session_id, "role": "user", "content": content, "seq": seq})
+
+
+def contents(history):
+    return [row["content"] for row in history.messages]
+
+
+def test_refresh_loads_newest_page_then_only_new_rows():
+    db = FakeSupabase()
+    add_messages(db, *"abcde")
+    history = ChatHistory(db, "s1", page_size=3)
+
+    history.refresh()
+    assert contents(history) == ["c", "d", "e"]
+    assert history.has_older
+
+    add_messages(db, "f", "g")
+    add_messages(db, "other", session_id="s2")
+    history.mark_stale()
+    history.refresh()
+    assert contents(history) == ["c", "d", "e", "f", "g"]
+
+
+def test_refresh_is_skipped_until_stale():
+    db = FakeSupabase()
+    history = ChatHistory(db, "s1")
+    history.refresh()
+    add_messages(db, "a")
+    history.refresh()
+
+    assert len(db.calls) == 1
+    assert history.messages == []
+
+
+def test_load_older_prepends_pages():
+    db = FakeSupabase()
+    add_messages(db, *"abcdefg")
+    history = ChatHistory(db, "s1", page_size=3)
+    history.refresh()
+
+    assert history.load_older() == 3
+    assert contents(history) == list("bcdefg")
+    assert history.load_older() == 1
+    assert contents(history) == list("abcdefg")
+    assert not history.has_older
+
+
+def test_locally_queued_rows_take_the_fetched_seq():
+    db = FakeSupabase()
+    add_messages(db, "a")
+    history = ChatHistory(db, "s1")
+    history.refresh()
+
+    history.append_local([{"id": "m2", "role": "user", "content": "b"}])
+    add_messages(db, "b")
+    history.mark_stale()
+    history.refresh()
+
+    assert contents(history) == ["a", "b"]
+    assert history.messages[-1]["seq"] == 2
@@ -0,0 +1,72 @@
+import time
+from agents.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def make_breaker(**kwargs):
+    options = dict(window_seconds=60, min_calls=3, failure_rate=0.5, cooldown_seconds=30, probe_timeout_seconds=120)
+    options.update(kwargs)
+    return CircuitBreaker("test", **options)
+
+
+def half_open(breaker):
+    breaker.record_failure(rate_limited=True)
+    breaker._open_until = time.monotonic() - 1
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+
+
+def test_opens_at_failure_rate_after_min_calls():
+    breaker = make_breaker()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+
+
+def test_rate_limit_opens_immediately_for_retry_after():
+    breaker = make_breaker(cooldown_seconds=1)
+    breaker.record_failure(rate_limited=True, retry_after=50)
+    assert breaker.state == OPEN
+    assert breaker.snapshot()["open_for_seconds"] > 40
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = make_breaker()
+    half_open(breaker)
+    assert not breaker.allow_request()
+
+
+def test_probe_success_closes_and_failure_reopens():
+    breaker = make_breaker()
+    half_open(breaker)
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+    half_open(breaker)
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+
+def test_cancelled_probe_is_released():
+    breaker = make_breaker()
+    half_open(breaker)
+    breaker.record_cancelled()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_probe_that_never_reports_expires():
+    breaker = make_breaker(probe_timeout_seconds=0.05)
+    half_open(breaker)
+    assert not breaker.allow_request()
+    time.sleep(0.06)
+    assert breaker.allow_request()
+
+
+def test_cancel_outside_half_open_changes_nothing():
+    breaker = make_breaker()
+    breaker.record_cancelled()
+    assert breaker.state == CLOSED
+    assert breaker.allow_request()
@@ -0,0 +1,68 @@
+import numpy as np
+from services.embedding_service import SharedEmbeddings
+from utils.embedding_cache import ChunkEmbeddingCache
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[len(text) + 0.1234567, 1 / 3] for text in texts]
+
+
+def test_memory_tier_holds_arrays_in_cache_dtype():
+    cache = ChunkEmbeddingCache("model")
+    cache.set_many(["a"], [[0.1, 0.2]])
+
+    stored = cache._memory.get(cache.key("a"))
+    assert isinstance(stored, np.ndarray) and stored.dtype == np.float16
+    assert cache.get_many(["a", "b"]) == [np.float16([0.1, 0.2]).astype(np.float32).tolist(), None]
+
+
+def test_disk_tier_survives_a_new_process(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    ChunkEmbeddingCache("model", path=path).set_many(["a"], [[0.5, 0.25]])
+
+    cache = ChunkEmbeddingCache("model", path=path)
+    assert cache.get_many(["a"]) == [[0.5, 0.25]]
+    assert cache.stats()["hits"] == 1
+    assert ChunkEmbeddingCache("other-model", path=path).get_many(["a"]) == [None]
+
+
+def test_fresh_and_cached_vectors_match(tmp_path):
+    model = FakeModel()
+    embeddings = SharedEmbeddings(model=model, chunk_cache=ChunkEmbeddingCache("model"))
+
+    fresh = embeddings.embed_documents(["one", "three"])
+    cached = embeddings.embed_documents(["three", "one", "five"])
+
+    assert cached[:2] == fresh[::-1]
+    assert model.calls == [["one", "three"], ["five"]]
+    assert fresh[0] == np.float16([3.1234567, 1 / 3]).astype(np.float32).tolist()
+
+
+def test_disk_tier_evicts_least_recently_read(tmp_path):
+    cache = ChunkEmbeddingCache("model", path=str(tmp_path / "embeddings.sqlite3"), max_entries=20, memory_entries=1)
+    cache.set_many([f"t{i}" for i in range(20)], [[float(i)] for i in range(20)])
+    cache.get_many(["t0"])  # read again, so it outlives newer rows
+    for i in range(20, 30):
+        cache.set_many([f"t{i}"], [[float(i)]])
+
+    assert cache.stats()["entries"] <= 20 + cache._evict_every
+    assert cache.get_many(["t0", "t1", "t29"]) == [[0.0], None, [29.0]]
+
+
+def test_files_without_accessed_at_are_migrated(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "embeddings.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE chunk_embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+    conn.commit()
+    conn.close()
+
+    cache = ChunkEmbeddingCache("model", path=path)
+    cache.set_many(["a"], [[1.0]])
+    assert ChunkEmbeddingCache("model", path=path).get_many(["a"]) == [[1.0]]
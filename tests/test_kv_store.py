@@ -0,0 +1,40 @@
+import time
+from utils.kv_store import MemoryStore, SQLiteStore
+
+
+def test_sqlite_round_trip_and_ttl(tmp_path):
+    store = SQLiteStore(str(tmp_path / "kv.sqlite"), max_entries=10)
+    store.set("a", {"x": [1, 2]})
+    store.set("b", 1, ttl_seconds=0.01)
+    time.sleep(0.02)
+    assert store.get("a") == {"x": [1, 2]}
+    assert store.get("b") is None
+    assert store.stats()["hits"] == 1
+
+
+def test_sqlite_evicts_least_recently_read(tmp_path):
+    store = SQLiteStore(str(tmp_path / "kv.sqlite"), max_entries=40)
+    for i in range(40):
+        store.set(f"k{i}", i)
+    store.get("k0")  # recently read, so it survives
+    for i in range(40, 60):
+        store.set(f"k{i}", i)
+
+    assert store.stats()["entries"] <= 40 + store._evict_every
+    assert store.get("k0") == 0
+    assert store.get("k1") is None
+    assert store.get("k59") == 59
+
+
+def test_sqlite_eviction_uses_accessed_at_index(tmp_path):
+    store = SQLiteStore(str(tmp_path / "kv.sqlite"), table="cache")
+    plan = store._conn.execute("EXPLAIN QUERY PLAN SELECT key FROM cache ORDER BY accessed_at LIMIT 5").fetchall()
+    assert any("cache_accessed_at" in row[-1] for row in plan)
+
+
+def test_incr_is_shared_by_sqlite_connections(tmp_path):
+    path = str(tmp_path / "kv.sqlite")
+    first, second = SQLiteStore(path), SQLiteStore(path)
+    assert first.incr("count") == 1
+    assert second.incr("count", 2) == 3
+    assert MemoryStore().incr("count") == 1
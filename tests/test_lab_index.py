@@ -0,0 +1,30 @@
+from helpers import LAB_REPORT
+from utils.lab_index import build_lab_index
+
+
+def names(index, query):
+    return [index.table.analytes[i] for i in index.lookup(query)]
+
+
+def test_analyte_words_are_weighted_by_rarity():
+    index = build_lab_index(LAB_REPORT)
+
+    assert names(index, "What is my LDL cholesterol?") == ["LDL Cholesterol"]
+    assert names(index, "cholesterol") == ["Total Cholesterol", "LDL Cholesterol", "HDL Cholesterol"]
+    assert names(index, "white blood cells") == ["White Blood Cells"]
+
+
+def test_panels_and_abnormal_questions():
+    index = build_lab_index(LAB_REPORT)
+
+    assert names(index, "how is my cbc") == ["Hemoglobin", "White Blood Cells", "Platelets"]
+    assert names(index, "anything abnormal?") == ["Hemoglobin", "Total Cholesterol", "LDL Cholesterol"]
+    assert index.lookup("what's the weather like") == []
+
+
+def test_rows_render_as_report_lines_under_their_panel():
+    index = build_lab_index(LAB_REPORT)
+
+    assert index.format_rows(index.lookup("ldl")) == "LIPID PANEL\nLDL Cholesterol 160 mg/dL H 0 - 100"
+    assert build_lab_index(LAB_REPORT) is index
+    assert len(build_lab_index("")) == 0
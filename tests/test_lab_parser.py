@@ -0,0 +1,56 @@
+import math
+from helpers import LAB_REPORT
+from utils.lab_parser import FLAG_HIGH, FLAG_LOW, FLAG_NORMAL, FLAG_UNKNOWN, parse_lab_report
+
+
+def test_rows_are_parsed_with_panels_ranges_and_flags():
+    table = parse_lab_report(LAB_REPORT)
+
+    assert table.analytes == [
+        "Hemoglobin", "White Blood Cells", "Platelets",
+        "Total Cholesterol", "LDL Cholesterol", "HDL Cholesterol", "Vitamin D",
+    ]
+    hemoglobin = table.find("hemoglobin")
+    assert hemoglobin.panel == "COMPLETE BLOOD COUNT"
+    assert (hemoglobin.value, hemoglobin.unit, hemoglobin.ref_low, hemoglobin.ref_high) == (11.2, "g/dL", 12.0, 15.5)
+    assert hemoglobin.flag == FLAG_LOW
+    assert table.find("White Blood Cells").value == 7200.0
+
+
+def test_open_ranges_and_explicit_flags():
+    table = parse_lab_report(LAB_REPORT)
+
+    total = table.find("total cholesterol")
+    assert (total.ref_low, total.ref_high, total.flag) == (None, 200.0, FLAG_HIGH)
+    hdl = table.find("hdl cholesterol")
+    assert (hdl.ref_low, hdl.ref_high, hdl.flag) == (40.0, None, FLAG_NORMAL)
+    assert table.find("vitamin d").flag == FLAG_UNKNOWN
+    assert math.isnan(table.ref_low[table.analytes.index("Vitamin D")])
+
+
+def test_columns_and_lookups():
+    table = parse_lab_report(LAB_REPORT)
+
+    assert len(table) == len(list(table)) == 7
+    assert [row.analyte for row in table.abnormal_rows()] == ["Hemoglobin", "Total Cholesterol", "LDL Cholesterol"]
+    assert table.find("wbc").analyte == "White Blood Cells"
+    assert table.mentions("ldl") and not table.mentions("glucose")
+    assert table.find("glucose") is None
+    assert LAB_REPORT.splitlines()[table.line_numbers[0]].startswith("Hemoglobin")
+
+
+def test_non_lab_lines_are_ignored():
+    assert len(parse_lab_report("Date: 15/03/2024\nPage 1 of 2\nPatient: Jane Doe")) == 0
+    assert len(parse_lab_report(None)) == 0
+
+
+def test_strict_bounds_exclude_the_limit():
+    table = parse_lab_report(
+        "LDL Cholesterol: 100 mg/dL (Reference: <100)\n"
+        "Triglycerides: 150 mg/dL (Reference: <150)\n"
+        "HDL Cholesterol: 40 mg/dL (Reference: >40)\n"
+        "Glucose: 100 mg/dL (Reference: <=100)\n"
+        "Sodium: 145 mmol/L (Reference: 135-145)"
+    )
+
+    assert [row.flag for row in table] == [FLAG_HIGH, FLAG_HIGH, FLAG_LOW, FLAG_NORMAL, FLAG_NORMAL]
@@ -0,0 +1,98 @@
+import pytest
+from services import message_writer
+from services.message_writer import MessageWriter, build_message_rows
+
+
+class FakeAuthService:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.saved = []
+        self.local = []
+
+    async def asave_chat_messages(self, rows):
+        if self.failures:
+            self.failures -= 1
+            return False, "connection reset"
+        self.saved.extend(rows)
+        return True, rows
+
+    async def asave_report(self, session_id, report_text):
+        return True, None
+
+    def add_local_messages(self, session_id, rows):
+        self.local.extend(rows)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(message_writer, "MESSAGE_WRITER_RETRY_SECONDS", 0)
+
+
+def test_rows_leave_timestamps_to_the_database():
+    rows = build_message_rows("s1", [("hi", "user"), ("hello", "assistant")])
+    assert [row["role"] for row in rows] == ["user", "assistant"]
+    assert all("created_at" not in row for row in rows)
+    assert rows[0]["id"] != rows[1]["id"]
+
+
+def test_write_behind_retries_until_saved():
+    auth = FakeAuthService(failures=2)
+    writer = MessageWriter(auth, write_behind=True)
+
+    assert writer.write("s1", [("q", "user"), ("a", "assistant")]) == (True, None)
+    assert writer.flush(timeout=5)
+
+    assert [row["content"] for row in auth.saved] == ["q", "a"]
+    assert len(auth.local) == 2
+    stats = writer.stats()
+    assert (stats["requests"], stats["retries"], stats["rows"], stats["dropped"]) == (3, 2, 2, 0)
+    assert writer.take_errors() == []
+
+
+def test_write_behind_drops_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(message_writer, "MESSAGE_WRITER_MAX_ATTEMPTS", 2)
+    writer = MessageWriter(FakeAuthService(failures=10), write_behind=True)
+
+    writer.write("s1", [("q", "user")])
+    assert writer.flush(timeout=5)
+
+    assert writer.stats()["dropped"] == 1
+    assert writer.take_errors() == ["1 chat message(s) could not be saved: connection reset"]
+    assert writer.take_errors() == []
+
+
+def test_blocking_write_reports_failure():
+    writer = MessageWriter(FakeAuthService(failures=1), write_behind=False)
+
+    assert writer.write("s1", [("q", "user")]) == (False, "connection reset")
+    assert writer.take_errors() == ["Your messages could not be saved: connection reset"]
+    assert writer.write("s1", [("q", "user")]) == (True, None)
+
+
+def test_write_soon_overlaps_and_later_rows_follow_it():
+    auth = FakeAuthService()
+    writer = MessageWriter(auth, write_behind=False)
+
+    question_saved = writer.write_soon("s1", [("q", "user")])
+    assert writer.write("s1", [("a", "assistant")], after=question_saved) == (True, None)
+
+    assert question_saved.result() == (True, None)
+    assert [row["content"] for row in auth.saved] == ["q", "a"]
+    assert writer.stats()["requests"] == 2
+
+
+def test_failed_write_soon_is_reported():
+    writer = MessageWriter(FakeAuthService(failures=1), write_behind=False)
+
+    assert writer.write_soon("s1", [("q", "user")]).result() == (False, "connection reset")
+    assert writer.take_errors() == ["Your messages could not be saved: connection reset"]
+
+
+def test_write_soon_queues_in_write_behind_mode():
+    auth = FakeAuthService()
+    writer = MessageWriter(auth, write_behind=True)
+
+    assert writer.write_soon("s1", [("q", "user")]).result() == (True, None)
+    writer.write("s1", [("a", "assistant")])
+    assert writer.flush(timeout=5)
+    assert [row["content"] for row in auth.saved] == ["q", "a"]
@@ -0,0 +1,166 @@
+import threading
+import time
+import pytest
+from agents import circuit_breaker, model_manager
+from agents.model_manager import ModelManager, ModelTier
+
+DATA = {"patient_name": "Test", "age": 40, "gender": "Female", "report": "Hemoglobin: 13.5 g/dL (Reference: 12.0-15.5)"}
+HEDGE_DELAY = 0.05
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    circuit_breaker._breakers.clear()
+    monkeypatch.setattr(model_manager, "HEDGING_ENABLED", True)
+    yield
+    circuit_breaker._breakers.clear()
+
+
+def model(tier):
+    return ModelManager.MODEL_CONFIG[tier]["model"]
+
+
+def make_manager(behaviour):
+    """
+    behaviour maps a tier to a callable run in place of the model call;
+    it returns the answer text or raises.
+    """
+    manager = ModelManager.__new__(ModelManager)
+    manager.clients = {"groq": object()}
+    manager.response_cache = None
+    manager.calls = []
+    by_model = {model(tier): run for tier, run in behaviour.items()}
+
+    def complete(provider, model_config, data, system_prompt):
+        manager.calls.append(model_config["model"])
+        content = by_model[model_config["model"]]()
+        return {"success": True, "content": content, "model_used": f"{provider}/{model_config['model']}"}
+
+    manager._complete = complete
+    manager._hedge_delay = lambda tier: HEDGE_DELAY
+    return manager
+
+
+def answer(text, after=0.0, gate=None):
+    def run():
+        if gate is not None:
+            assert gate.wait(5)
+        time.sleep(after)
+        return text
+    return run
+
+
+def fail(message="server error", after=0.0, gate=None):
+    def run():
+        if gate is not None:
+            assert gate.wait(5)
+        time.sleep(after)
+        raise RuntimeError(message)
+    return run
+
+
+def breaker(tier):
+    config = ModelManager.MODEL_CONFIG[tier]
+    return circuit_breaker.get_breaker(f"{config['provider']}/{config['model']}")
+
+
+def wait_for_calls(tier, count):
+    deadline = time.monotonic() + 5
+    while breaker(tier).snapshot()["calls"] < count:
+        assert time.monotonic() < deadline, "loser's outcome was never recorded"
+        time.sleep(0.01)
+    return breaker(tier).snapshot()
+
+
+def test_fast_primary_is_not_hedged():
+    manager = make_manager({ModelTier.PRIMARY: answer("primary"), ModelTier.SECONDARY: answer("secondary")})
+
+    result = manager.generate_analysis(DATA, "prompt")
+    assert result["content"] == "primary"
+    assert "hedged" not in result
+    assert manager.calls == [model(ModelTier.PRIMARY)]
+
+
+def test_hedge_fires_after_delay_and_wins():
+    gate = threading.Event()
+    manager = make_manager({ModelTier.PRIMARY: answer("primary", gate=gate), ModelTier.SECONDARY: answer("secondary")})
+
+    started = time.monotonic()
+    result = manager.generate_analysis(DATA, "prompt")
+    gate.set()
+    assert time.monotonic() - started >= HEDGE_DELAY
+    assert result["content"] == "secondary"
+    assert result["hedged"] is True
+    assert manager.calls == [model(ModelTier.PRIMARY), model(ModelTier.SECONDARY)]
+
+
+def test_first_success_wins_even_from_primary():
+    gate = threading.Event()
+    manager = make_manager({
+        ModelTier.PRIMARY: answer("primary", after=HEDGE_DELAY * 2),
+        ModelTier.SECONDARY: answer("secondary", gate=gate),
+    })
+
+    result = manager.generate_analysis(DATA, "prompt")
+    gate.set()
+    assert result["content"] == "primary"
+    assert result["hedged"] is True
+
+
+def test_failed_primary_waits_for_hedge_success():
+    manager = make_manager({
+        ModelTier.PRIMARY: fail(after=HEDGE_DELAY * 2),
+        ModelTier.SECONDARY: answer("secondary", after=HEDGE_DELAY * 4),
+    })
+
+    result = manager.generate_analysis(DATA, "prompt")
+    assert result["content"] == "secondary"
+    assert breaker(ModelTier.PRIMARY).snapshot()["error_rate"] == 1.0
+
+
+def test_loser_success_is_recorded_on_its_breaker():
+    gate = threading.Event()
+    manager = make_manager({ModelTier.PRIMARY: answer("primary", gate=gate), ModelTier.SECONDARY: answer("secondary")})
+
+    assert manager.generate_analysis(DATA, "prompt")["content"] == "secondary"
+    assert breaker(ModelTier.PRIMARY).snapshot()["calls"] == 0
+
+    gate.set()
+    snapshot = wait_for_calls(ModelTier.PRIMARY, 1)
+    assert snapshot["error_rate"] == 0.0
+
+
+def test_loser_failure_is_recorded_on_its_breaker():
+    gate = threading.Event()
+    manager = make_manager({
+        ModelTier.PRIMARY: fail("rate limit exceeded", gate=gate),
+        ModelTier.SECONDARY: answer("secondary"),
+    })
+
+    assert manager.generate_analysis(DATA, "prompt")["content"] == "secondary"
+
+    gate.set()
+    snapshot = wait_for_calls(ModelTier.PRIMARY, 1)
+    assert snapshot["error_rate"] == 1.0
+    assert snapshot["state"] == circuit_breaker.OPEN
+
+
+def test_all_hedged_calls_failing_falls_through_to_next_tier():
+    manager = make_manager({
+        ModelTier.PRIMARY: fail(after=HEDGE_DELAY * 2),
+        ModelTier.SECONDARY: fail(),
+        ModelTier.TERTIARY: answer("tertiary"),
+        ModelTier.FALLBACK: answer("fallback"),
+    })
+
+    result = manager.generate_analysis(DATA, "prompt")
+    assert result["content"] == "tertiary"
+    # The hedge tier is consumed, not retried on its own
+    assert manager.calls == [model(ModelTier.PRIMARY), model(ModelTier.SECONDARY), model(ModelTier.TERTIARY)]
+
+
+def test_all_tiers_failing_reports_failure():
+    manager = make_manager({tier: fail() for tier in ModelTier})
+
+    result = manager.generate_analysis(DATA, "prompt")
+    assert result == {"success": False, "error": "Analysis failed with all available models"}
@@ -0,0 +1,63 @@
+import time
+from types import SimpleNamespace
+import pytest
+from agents import circuit_breaker
+from agents.circuit_breaker import HALF_OPEN
+from agents.model_manager import ModelManager, ModelTier
+
+DATA = {"patient_name": "Test", "age": 40, "gender": "Female", "report": "Hemoglobin: 13.5 g/dL (Reference: 12.0-15.5)"}
+
+
+class FakeCompletions:
+    def __init__(self, deltas):
+        self.deltas = deltas
+
+    def create(self, **kwargs):
+        for delta in self.deltas:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers():
+    circuit_breaker._breakers.clear()
+    yield
+    circuit_breaker._breakers.clear()
+
+
+def make_manager(deltas):
+    manager = ModelManager.__new__(ModelManager)
+    manager.clients = {"groq": SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(deltas)))}
+    manager.response_cache = None
+    return manager
+
+
+def primary_breaker(manager):
+    return manager._prepare_request(ModelTier.PRIMARY, DATA, "prompt")["breaker"]
+
+
+def test_stream_collects_content_and_closes_probe():
+    manager = make_manager(["All ", "good."])
+    breaker = primary_breaker(manager)
+    breaker.record_failure(rate_limited=True)
+    breaker._open_until = time.monotonic() - 1
+
+    stream = manager.stream_analysis(DATA, "prompt")
+    assert "".join(stream) == "All good."
+    assert stream.success
+    assert breaker.state == "closed"
+
+
+def test_abandoned_stream_releases_half_open_probe():
+    manager = make_manager(["one ", "two ", "three"])
+    breaker = primary_breaker(manager)
+    breaker.record_failure(rate_limited=True)
+    breaker._open_until = time.monotonic() - 1
+
+    stream = manager.stream_analysis(DATA, "prompt")
+    iterator = iter(stream)
+    next(iterator)
+    assert breaker.state == HALF_OPEN and not breaker.allow_request()
+
+    iterator.close()  # what a Streamlit rerun does to st.write_stream's generator
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
@@ -0,0 +1,38 @@
+from concurrent.futures.process import BrokenProcessPool
+from helpers import LAB_PAGE, build_pdf
+from utils import pdf_extractor
+
+
+class BrokenPool:
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, *args):
+        raise BrokenProcessPool("worker killed")
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+def test_broken_pool_is_discarded_and_extraction_falls_back_to_serial(monkeypatch):
+    pdf = build_pdf([LAB_PAGE + [f"Page {i}"] for i in range(4)])
+    broken = BrokenPool()
+    monkeypatch.setattr(pdf_extractor, "_process_pool", broken)
+
+    texts = pdf_extractor.extract_pages_parallel(pdf, 1, 4, workers=2)
+
+    assert [text.splitlines()[-1] for text in texts] == ["Page 1", "Page 2", "Page 3"]
+    assert broken.shut_down
+    assert pdf_extractor._process_pool is None
+
+
+def test_parallel_extraction_keeps_page_order():
+    pdf = build_pdf([LAB_PAGE + [f"Page {i}"] for i in range(6)])
+    try:
+        texts = pdf_extractor.extract_pages_parallel(pdf, 0, 6, workers=2)
+    finally:
+        pool = pdf_extractor._process_pool
+        pdf_extractor._process_pool = None
+        if pool:
+            pool.shutdown()
+    assert [text.splitlines()[-1] for text in texts] == [f"Page {i}" for i in range(6)]
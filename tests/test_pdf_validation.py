@@ -0,0 +1,40 @@
+from helpers import FILLER_PAGE, LAB_PAGE, build_pdf
+from utils.pdf_extractor import _extract_and_validate
+from utils.validators import MedicalContentScorer, validate_pdf_content
+
+
+def test_scorer_accepts_once_enough_terms_are_seen():
+    scorer = MedicalContentScorer()
+    assert scorer.feed(" ".join(FILLER_PAGE)) is None
+    assert scorer.feed("\n".join(LAB_PAGE)) == MedicalContentScorer.ACCEPT
+    assert scorer.result() == (True, None)
+
+
+def test_scorer_rejects_early_only_when_opted_in():
+    scorer = MedicalContentScorer(reject_after_pages=2)
+    assert scorer.feed(" ".join(FILLER_PAGE)) is None
+    assert scorer.feed(" ".join(FILLER_PAGE)) == MedicalContentScorer.REJECT
+
+    scorer = MedicalContentScorer()
+    for _ in range(10):
+        assert scorer.feed(" ".join(FILLER_PAGE)) is None
+    assert not scorer.result()[0]
+
+
+def test_medical_terms_after_page_five_are_accepted():
+    pdf = build_pdf([FILLER_PAGE] * 6 + [LAB_PAGE])
+    success, text = _extract_and_validate(pdf, "serial")
+    assert success
+    assert "Hemoglobin" in text
+    assert text.count("Lorem ipsum") == 30
+
+
+def test_non_medical_document_is_rejected():
+    success, error = _extract_and_validate(build_pdf([FILLER_PAGE] * 3), "serial")
+    assert not success
+    assert "doesn't appear to be a medical report" in error
+
+
+def test_validate_pdf_content_matches_baseline_messages():
+    assert validate_pdf_content("short")[1].startswith("Extracted text is too short")
+    assert validate_pdf_content("\n".join(LAB_PAGE)) == (True, None)
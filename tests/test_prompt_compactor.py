@@ -0,0 +1,56 @@
+from helpers import LAB_REPORT
+from agents.prompt_compactor import (
+    TRUNCATION_MARKER,
+    compact_report,
+    count_tokens,
+    fit_to_budget,
+    render_analysis_input,
+)
+
+DATA = {"patient_name": "Jane", "age": 40, "gender": "F", "report": LAB_REPORT}
+PROMPT = "You are a physician.\n    Explain the results.\n    Be concise."
+
+
+def test_compact_report_keeps_findings_and_drops_boilerplate():
+    compacted = compact_report(LAB_REPORT)
+
+    assert compacted.startswith("Out-of-range results:\n- Hemoglobin 11.2 g/dL (ref 12-15.5) [L]")
+    assert "- LIPID PANEL: HDL Cholesterol 55 mg/dL" in compacted
+    assert "- Vitamin D 32 ng/mL" in compacted
+    assert "Page 1 of 1" not in compacted and "Date:" not in compacted
+
+
+def test_fit_to_budget_strips_prompt_indentation():
+    data, prompt, usage = fit_to_budget(DATA, PROMPT, budget=3000)
+
+    assert prompt == "You are a physician.\nExplain the results.\nBe concise."
+    assert data["patient_name"] == "Jane"
+    assert usage["compacted_tokens"] == count_tokens(prompt) + count_tokens(render_analysis_input(data))
+
+
+def test_fit_to_budget_truncates_after_out_of_range_results():
+    data, prompt, usage = fit_to_budget(DATA, PROMPT, budget=70)
+
+    assert usage["compacted_tokens"] <= 70
+    assert usage["saved_tokens"] == usage["original_tokens"] - usage["compacted_tokens"]
+    assert data["report"].startswith("Out-of-range results:\n- Hemoglobin")
+    assert data["report"].endswith(TRUNCATION_MARKER)
+
+
+def test_fit_to_budget_leaves_non_report_data_alone():
+    data, _, usage = fit_to_budget("free text", PROMPT, budget=10)
+    assert data == "free text"
+    assert usage["saved_tokens"] >= 0
+
+
+def test_compact_report_drops_signature_lines():
+    compacted = compact_report(LAB_REPORT + "\nDr. Smith, MD\nPathologist: A. Jones\nDrowsiness reported by patient\n")
+
+    assert "Dr. Smith" not in compacted and "Pathologist" not in compacted
+    assert "Drowsiness reported by patient" in compacted
+
+
+def test_compact_report_keeps_range_of_values_on_a_strict_bound():
+    compacted = compact_report("LDL Cholesterol: 100 mg/dL (Reference: <100)\nSodium: 140 mmol/L (Reference: 135-145)")
+
+    assert "- LDL Cholesterol 100 mg/dL (ref <100) [H]" in compacted
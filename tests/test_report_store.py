@@ -0,0 +1,36 @@
+from helpers import FakeSupabase
+from services.report_store import ReportStore, compress_report, decompress_report
+from utils.message_format import parse_report_metadata
+
+REPORT = "Hemoglobin 13.5 g/dL 12.0-16.0\nGlucose 90 mg/dL 70-100\n"
+
+
+def test_reports_round_trip_compressed():
+    assert decompress_report(compress_report(REPORT)) == REPORT
+
+    db = FakeSupabase()
+    ReportStore(db).save("s1", REPORT)
+    report = ReportStore(db).get("s1")
+    assert report.text == REPORT
+    assert [row["analyte"] for row in report.analytes] == ["Hemoglobin", "Glucose"]
+
+
+def test_missing_report_is_remembered_until_saved():
+    db = FakeSupabase()
+    store = ReportStore(db)
+
+    assert store.get("s1") is None
+    assert store.get("s1") is None
+    assert db.calls == ["session_reports", "chat_messages"]
+
+    store.save("s1", REPORT)
+    assert store.get("s1").text == REPORT
+
+
+def test_legacy_report_is_migrated():
+    legacy = f"__REPORT_TEXT__\n{REPORT}\n__END_REPORT_TEXT__"
+    db = FakeSupabase({"chat_messages": [{"session_id": "s1", "role": "system", "content": legacy, "created_at": "2024-03-15T10:00:00"}]})
+
+    assert parse_report_metadata(legacy) == REPORT
+    assert ReportStore(db).get("s1").text == REPORT
+    assert db.tables["session_reports"][0]["session_id"] == "s1"
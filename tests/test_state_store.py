@@ -0,0 +1,59 @@
+from utils.kv_store import MemoryStore
+from utils.state_store import KVStateStore, MappingStateStore, as_state_store
+
+
+class FailingStore:
+    """Backend that raises like a Redis client whose server is down."""
+
+    def __init__(self):
+        self.down = True
+        self.data = MemoryStore()
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError("Connection refused")
+
+    def get(self, key):
+        self._check()
+        return self.data.get(key)
+
+    def set(self, key, value, ttl_seconds=None):
+        self._check()
+        self.data.set(key, value)
+
+    def incr(self, key, amount=1):
+        self._check()
+        return self.data.incr(key, amount)
+
+
+def test_namespaces_share_a_backend():
+    backend = MemoryStore()
+    alice, bob = KVStateStore(backend, "user:a"), KVStateStore(backend, "user:b")
+    alice.incr("analysis_count")
+    alice.setdefault("limit", 3)
+    alice.setdefault("limit", 5)
+
+    assert alice.get("analysis_count") == 1
+    assert alice.get("limit") == 3
+    assert bob.get("analysis_count", 0) == 0
+
+
+def test_backend_errors_fall_back_to_local_state():
+    backend = FailingStore()
+    session = {}
+    store = KVStateStore(backend, "user:a", fallback=session)
+
+    assert store.incr("analysis_count") == 1
+    store.setdefault("knowledge_base", {"x": 1})
+    assert session == {"analysis_count": 1, "knowledge_base": {"x": 1}}
+    assert store.get("missing", "default") == "default"
+
+    backend.down = False
+    assert store.incr("analysis_count") == 1
+    assert store._degraded is False
+
+
+def test_as_state_store_wraps_mappings_only():
+    store = KVStateStore(MemoryStore(), "ns")
+    assert as_state_store(store) is store
+    assert isinstance(as_state_store({}), MappingStateStore)
@@ -0,0 +1,65 @@
+import time
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec
+from auth import token_verifier
+from auth.token_verifier import TokenVerifier
+
+SECRET = "test-secret-with-at-least-32-bytes!!"
+
+
+def make_token(key=SECRET, algorithm="HS256", **overrides):
+    claims = {"sub": "user-1", "aud": "authenticated", "exp": int(time.time()) + 3600}
+    claims.update(overrides)
+    return jwt.encode({k: v for k, v in claims.items() if v is not None}, key, algorithm=algorithm)
+
+
+def test_valid_hs256_token_returns_claims():
+    claims = TokenVerifier("https://project.supabase.co", SECRET).verify(make_token())
+    assert claims["sub"] == "user-1"
+
+
+@pytest.mark.parametrize("overrides", [
+    {"exp": int(time.time()) - 60},
+    {"aud": "anon"},
+    {"sub": None},
+])
+def test_invalid_claims_are_rejected(overrides):
+    assert TokenVerifier("https://project.supabase.co", SECRET).verify(make_token(**overrides)) is False
+
+
+def test_bad_signature_and_garbage_are_rejected():
+    verifier = TokenVerifier("https://project.supabase.co", SECRET)
+    assert verifier.verify(make_token(key="another-secret-with-at-least-32-bytes")) is False
+    assert verifier.verify("not-a-jwt") is False
+
+
+def test_hs256_without_secret_is_left_to_the_server():
+    assert TokenVerifier("https://project.supabase.co").verify(make_token()) is None
+
+
+def test_asymmetric_tokens_use_the_shared_jwks_client(monkeypatch):
+    private_key = ec.generate_private_key(ec.SECP256R1())
+
+    class FakeJWKSClient:
+        def get_signing_key_from_jwt(self, token):
+            return jwt.PyJWK.from_dict(jwt.algorithms.ECAlgorithm.to_jwk(private_key.public_key(), as_dict=True))
+
+    monkeypatch.setattr(token_verifier, "_jwks_clients", {
+        "https://project.supabase.co/auth/v1/.well-known/jwks.json": FakeJWKSClient(),
+    })
+    verifier = TokenVerifier("https://project.supabase.co/")
+
+    assert verifier.verify(make_token(private_key, "ES256"))["sub"] == "user-1"
+
+
+def test_unreachable_jwks_is_left_to_the_server(monkeypatch):
+    class FailingJWKSClient:
+        def get_signing_key_from_jwt(self, token):
+            raise jwt.PyJWKClientConnectionError("timed out")
+
+    monkeypatch.setattr(token_verifier, "_jwks_clients", {
+        "https://project.supabase.co/auth/v1/.well-known/jwks.json": FailingJWKSClient(),
+    })
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    assert TokenVerifier("https://project.supabase.co").verify(make_token(private_key, "ES256")) is None
@@ -0,0 +1,35 @@
+import os
+import time
+from utils import vector_store_cache
+from utils.vector_store_cache import prune_disk_cache
+
+
+def write_entry(directory, key, size, age):
+    mtime = time.time() - age
+    for ext in (".faiss", ".json"):
+        path = directory / f"{key}{ext}"
+        path.write_bytes(b"x" * size)
+        os.utime(path, (mtime, mtime))
+
+
+def keys(directory):
+    return sorted({os.path.splitext(name)[0] for name in os.listdir(directory)})
+
+
+def test_disk_tier_is_off_unless_configured(monkeypatch):
+    monkeypatch.setattr(vector_store_cache, "VECTOR_STORE_CACHE_DIR", None)
+    assert vector_store_cache.load_vector_store("missing", embeddings=None) is None
+    assert vector_store_cache.get_vector_store_cache_stats()["disk"]["enabled"] is False
+
+
+def test_prune_removes_old_entries_then_least_recently_read(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store_cache, "VECTOR_STORE_CACHE_DIR", str(tmp_path))
+    write_entry(tmp_path, "expired", 10, age=3600)
+    write_entry(tmp_path, "older", 100, age=30)
+    write_entry(tmp_path, "newer", 100, age=20)
+    write_entry(tmp_path, "newest", 100, age=10)
+    (tmp_path / "notes.txt").write_text("left alone")
+
+    prune_disk_cache(max_bytes=450, max_age_seconds=600)
+
+    assert keys(tmp_path) == ["newer", "newest", "notes"]